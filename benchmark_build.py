@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from build_forest import PROFILE_METRICS_NAME
+from generate_synthetic_org import MAX_EMPLOYEES, MIN_EMPLOYEES, generate_synthetic_org, write_synthetic_org
+
+# --- Configuration ---
+BENCHMARK_SIZES = [1_000, 10_000, 100_000]
+BENCHMARK_REPEAT = 3                    # Runs per size; each stage keeps its fastest run
+BENCHMARK_RESULTS_PATH = 'bench_results.json'
+BENCHMARK_LOG_PATH = 'bench_output.txt' # build_forest.py console output of every run
+BENCHMARK_FORMAT_VERSION = 1
+REGRESSION_THRESHOLD = 0.20             # Fail when a stage's throughput drops more than this below the baseline
+MIN_STAGE_SECONDS = 0.05                # Stages faster than this in the baseline are too noisy to gate on
+END_TO_END_STAGE = 'end_to_end'
+BUILD_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build_forest.py')
+
+# --- 1. Benchmark Runs ---
+def run_build(input_path, work_dir, workers=1, log_file=None):
+    """
+    Runs build_forest.py end to end on `input_path` with stage metrics on (timings only, no
+    tracemalloc) and every export enabled. Returns the stage metrics dict, or None when the run fails.
+    """
+    output_path = os.path.join(work_dir, 'forest.json')
+    command = [sys.executable, BUILD_SCRIPT_PATH, '--input', input_path, '--output', output_path, '--no-cache',
+               '--workers', str(workers), '--node-table', os.path.join(work_dir, 'forest_table.json'),
+               '--shards', os.path.join(work_dir, 'forest_shards'), '--profile', '--no-trace-memory']
+    result = subprocess.run(command, stdout=log_file or subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    metrics_path = os.path.join(work_dir, PROFILE_METRICS_NAME)
+    if result.returncode != 0 or not os.path.exists(metrics_path):
+        print(f"Error: build_forest.py failed on '{input_path}' (exit code {result.returncode}).")
+        return None
+    with open(metrics_path) as f:
+        metrics = json.load(f)
+    os.remove(metrics_path)
+    if not any(stage['stage'] == 'export_json' for stage in metrics['stages']):
+        print(f"Error: build_forest.py stopped before exporting '{input_path}'; see {BENCHMARK_LOG_PATH}.")
+        return None
+    return metrics
+
+def benchmark_size(employees, work_dir, repeat=BENCHMARK_REPEAT, workers=1, seed=0, log_file=None):
+    """
+    Generates a synthetic org of `employees` rows and builds it `repeat` times.
+    Returns {stage: {'wall_seconds', 'rows', 'rows_per_second'}} from each stage's fastest run
+    (plus END_TO_END_STAGE for the whole process), or None when generation or a run fails.
+    """
+    df, summary = generate_synthetic_org(employees, seed=seed)
+    if df is None:
+        for error in summary['errors']:
+            print(f"Error: {error}")
+        return None
+    input_path = os.path.join(work_dir, f"synthetic_{employees}.csv")
+    if not write_synthetic_org(df, input_path):
+        return None
+
+    best = {}
+    for run in range(repeat):
+        if log_file:
+            log_file.write(f"\n=== {employees} employees, run {run + 1}/{repeat} ===\n")
+            log_file.flush()
+        metrics = run_build(input_path, work_dir, workers, log_file)
+        if metrics is None:
+            return None
+        timings = [(stage['stage'], stage['wall_seconds'], stage['rows']) for stage in metrics['stages']]
+        timings.append((END_TO_END_STAGE, metrics['total_wall_seconds'], employees))
+        for stage, wall_seconds, rows in timings:
+            if stage not in best or wall_seconds < best[stage]['wall_seconds']:
+                best[stage] = {
+                    'wall_seconds': wall_seconds,
+                    'rows': rows,
+                    'rows_per_second': round(rows / wall_seconds, 1) if rows and wall_seconds > 0 else None,
+                    'peak_rss_bytes': metrics['peak_rss_bytes']
+                }
+    return best
+
+# --- 2. Regression Check ---
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD, min_seconds=MIN_STAGE_SECONDS):
+    """
+    Compares each stage's throughput against the baseline results at the same size.
+    Returns a list of {'size', 'stage', 'baseline_rows_per_second', 'rows_per_second', 'change'}
+    for every stage that dropped by more than `threshold`.
+    """
+    regressions = []
+    for size, stages in results['sizes'].items():
+        baseline_stages = baseline.get('sizes', {}).get(size, {})
+        for stage, current in stages.items():
+            previous = baseline_stages.get(stage)
+            if not previous or not previous.get('rows_per_second') or not current.get('rows_per_second'):
+                continue
+            if previous['wall_seconds'] < min_seconds:
+                continue
+            change = current['rows_per_second'] / previous['rows_per_second'] - 1
+            if change < -threshold:
+                regressions.append({
+                    'size': size,
+                    'stage': stage,
+                    'baseline_rows_per_second': previous['rows_per_second'],
+                    'rows_per_second': current['rows_per_second'],
+                    'change': round(change, 4)
+                })
+    return regressions
+
+def print_benchmark_table(results):
+    """Prints wall time and throughput per stage for every size."""
+    print("\n--- Build Benchmark ---")
+    for size, stages in results['sizes'].items():
+        print(f"{size} employees:")
+        for stage, timing in stages.items():
+            throughput = f"{timing['rows_per_second']:>12,.0f} rows/s" if timing['rows_per_second'] else f"{'-':>19}"
+            print(f"  {stage:<24} {timing['wall_seconds']:>9.3f} s {throughput}")
+    print("-----------------------\n")
+
+# --- 3. Main Execution Flow ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark build_forest.py stage throughput on synthetic orgs.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=BENCHMARK_SIZES,
+                        help=f"Headcounts to benchmark ({MIN_EMPLOYEES} to {MAX_EMPLOYEES}).")
+    parser.add_argument('--repeat', type=int, default=BENCHMARK_REPEAT, help="Runs per size; each stage keeps its fastest run.")
+    parser.add_argument('--workers', type=int, default=1, help="Passed to build_forest.py --workers.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the synthetic orgs.")
+    parser.add_argument('--output', default=BENCHMARK_RESULTS_PATH, help="Path of the results JSON to write.")
+    parser.add_argument('--log', default=BENCHMARK_LOG_PATH, help="Where to write build_forest.py's console output.")
+    parser.add_argument('--baseline', default=None, help="Results JSON of an earlier run to check for regressions.")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Fractional throughput drop against the baseline that counts as a regression.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except Exception as e:
+            print(f"Error reading baseline '{args.baseline}': {e}")
+            sys.exit(2)
+
+    results = {
+        'format_version': BENCHMARK_FORMAT_VERSION,
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'python_version': sys.version.split()[0],
+        'workers': args.workers,
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'sizes': {}
+    }
+    with open(args.log, 'w') as log_file, tempfile.TemporaryDirectory() as work_dir:
+        for size in args.sizes:
+            print(f"Benchmarking {size} employees ({args.repeat} run(s))...")
+            stages = benchmark_size(size, work_dir, args.repeat, args.workers, args.seed, log_file)
+            if stages is None:
+                print("Benchmark aborted.")
+                sys.exit(2)
+            results['sizes'][str(size)] = stages
+
+    print_benchmark_table(results)
+    try:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Benchmark results written to '{args.output}'.")
+    except Exception as e:
+        print(f"Error writing benchmark results: {e}")
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed by more than {args.threshold:.0%} against '{args.baseline}':")
+            for regression in regressions:
+                print(f"  - {regression['size']} employees, {regression['stage']}: "
+                      f"{regression['baseline_rows_per_second']:,.0f} -> {regression['rows_per_second']:,.0f} rows/s "
+                      f"({regression['change']:+.0%})")
+            sys.exit(1)
+        print(f"No stage regressed by more than {args.threshold:.0%} against '{args.baseline}'.")
@@ -1,6 +1,25 @@
 import pandas as pd
+import numpy as np
+import argparse
+import cProfile
+import gzip
+import hashlib
 import json
+import os
+import pstats
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import unicodedata
+from datetime import datetime, timezone
 from collections import defaultdict
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
 
 # --- Configuration ---
 EXCEL_FILE_PATH = '../../Employee Input Data.xlsx'
@@ -26,6 +45,128 @@ PARTNER_LEVEL_VALUE = 'Partner'
 # Columns that are essential for the structure
 ESSENTIAL_COLUMNS = ['employee_id', 'name', 'coach_id', 'level'] # Added 'level'
 
+# --- Stage Instrumentation (--profile) ---
+PROFILE_METRICS_NAME = 'forest_metrics.json'
+PROFILE_STAGES = ('load_input', 'split_retired_partners', 'validate_data', 'assemble_forest', 'orphan_analysis',
+                  'flag_cross_offering_pods', 'pod_aggregates', 'search_index', 'build_forest_parallel', 'export_json',
+                  'export_node_table', 'export_shards')
+# Stages that run inside the worker processes of a parallel build, where nothing is measured
+WORKER_STAGES = ('assemble_forest', 'orphan_analysis', 'flag_cross_offering_pods')
+ACTIVE_PROFILE = None # Set by start_profile; stages are only measured while it is set
+
+def start_profile(profile_stage=None, profile_dump_path=None, trace_memory=True):
+    """
+    Starts recording stage metrics for this process. tracemalloc slows allocation-heavy stages,
+    so trace_memory=False records timings only (the peak memory fields are then None).
+    """
+    global ACTIVE_PROFILE
+    if trace_memory:
+        tracemalloc.start()
+    ACTIVE_PROFILE = {
+        'stages': [],
+        'trace_memory': trace_memory,
+        'open_stages': [],
+        'profile_stage': profile_stage,
+        'profile_dump_path': profile_dump_path,
+        'started_wall': time.perf_counter(),
+        'started_cpu': time.process_time()
+    }
+
+@contextmanager
+def pipeline_stage(name):
+    """
+    Measures a named pipeline stage: wall time, CPU time of this process and peak traced memory.
+    Yields a dict the caller can put a 'rows' count into. Does nothing unless profiling is on.
+    """
+    record = {'stage': name}
+    profile = ACTIVE_PROFILE
+    if profile is None:
+        yield record
+        return
+    trace_memory = profile['trace_memory']
+    if trace_memory:
+        # Fold the peak so far into the enclosing stages before resetting it for this one
+        for open_record in profile['open_stages']:
+            open_record['peak_traced_bytes'] = max(open_record['peak_traced_bytes'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        record['start_traced_bytes'] = tracemalloc.get_traced_memory()[0]
+        record['peak_traced_bytes'] = 0
+        profile['open_stages'].append(record)
+    profiler = cProfile.Profile() if profile['profile_stage'] == name else None
+    started_wall, started_cpu = time.perf_counter(), time.process_time()
+    if profiler:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler:
+            profiler.disable()
+        record['wall_seconds'] = round(time.perf_counter() - started_wall, 6)
+        record['cpu_seconds'] = round(time.process_time() - started_cpu, 6)
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            for open_record in profile['open_stages']:
+                open_record['peak_traced_bytes'] = max(open_record['peak_traced_bytes'], peak)
+            tracemalloc.reset_peak()
+            profile['open_stages'].pop()
+        profile['stages'].append({key: record.get(key) for key in ('stage', 'wall_seconds', 'cpu_seconds', 'start_traced_bytes', 'peak_traced_bytes', 'rows')})
+        if profiler:
+            profiler.dump_stats(profile['profile_dump_path'])
+            print(f"cProfile output for stage '{name}' written to '{profile['profile_dump_path']}'. Top functions:")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where the resource module is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024 # Linux reports KiB
+
+def legacy_peak_rss_bytes(build_args):
+    """
+    Runs this script with `build_args` and --legacy-representation in a subprocess, writing into a
+    temporary directory, and returns that run's peak RSS in bytes (None if it fails).
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *build_args, '--legacy-representation', '--no-cache',
+             '--profile', '--no-trace-memory', '--output', os.path.join(tmp_dir, JSON_OUTPUT_PATH)],
+            capture_output=True, text=True)
+        metrics_path = os.path.join(tmp_dir, PROFILE_METRICS_NAME)
+        if result.returncode != 0 or not os.path.exists(metrics_path):
+            print(f"Warning: The previous-representation build failed, so there is no memory baseline:\n{result.stdout[-1000:]}{result.stderr[-1000:]}")
+            return None
+        with open(metrics_path) as f:
+            return json.load(f).get('peak_rss_bytes')
+
+def finish_profile(metrics_path, run_info):
+    """Stops profiling and writes the stage metrics JSON."""
+    global ACTIVE_PROFILE
+    profile, ACTIVE_PROFILE = ACTIVE_PROFILE, None
+    if profile is None:
+        return
+    if profile['trace_memory']:
+        tracemalloc.stop()
+    metrics = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        **run_info,
+        'python_version': sys.version.split()[0],
+        'pandas_version': pd.__version__,
+        'total_wall_seconds': round(time.perf_counter() - profile['started_wall'], 6),
+        'total_cpu_seconds': round(time.process_time() - profile['started_cpu'], 6),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'trace_memory': profile['trace_memory'],
+        'stages': profile['stages']
+    }
+    try:
+        with open(metrics_path, 'w') as f:
+            json.dump(metrics, f, indent=2)
+        print(f"Stage metrics written to '{metrics_path}'.")
+    except Exception as e:
+        print(f"Error writing stage metrics: {e}")
+
 # --- 1. Data Ingestion ---
 
 # Columns to include in the employee records in the final JSON.
@@ -55,13 +196,129 @@ INCLUDED_DATA_COLUMNS = [
     # 'Department',
 ]
 
-def load_employee_data(file_path):
+# Reader used by load_employee_data. 'auto' picks by file extension and, for Excel
+# files, prefers the calamine engine (pip install python-calamine) over openpyxl.
+INPUT_READERS = ('auto', 'openpyxl', 'calamine', 'csv', 'parquet')
+INPUT_READER = 'auto'
+
+def projected_source_columns():
+    """
+    Returns the set of source (Excel/CSV/Parquet) column names the pipeline actually uses:
+    every COLUMN_MAPPING column plus the INCLUDED_DATA_COLUMNS, translated back to source names.
+    """
+    wanted = set(COLUMN_MAPPING.values())
+    for col in INCLUDED_DATA_COLUMNS:
+        wanted.add(COLUMN_MAPPING.get(col, col))
+    return wanted
+
+def resolve_input_reader(file_path, reader):
+    """Resolves the 'auto' reader to a concrete one based on the file extension."""
+    if reader != 'auto':
+        return reader
+    extension = os.path.splitext(str(file_path))[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    try:
+        import python_calamine  # noqa: F401
+        return 'calamine'
+    except ImportError:
+        return 'openpyxl'
+
+def read_input_frame(file_path, reader=INPUT_READER):
+    """
+    Reads the raw input file with the selected reader, projecting to the columns
+    returned by projected_source_columns() so unused columns are never materialized.
+    """
+    wanted = projected_source_columns()
+    reader = resolve_input_reader(file_path, reader)
+    if reader not in INPUT_READERS:
+        raise ValueError(f"Unknown input reader '{reader}'. Expected one of: {', '.join(INPUT_READERS)}.")
+
+    if reader == 'csv':
+        return pd.read_csv(file_path, usecols=lambda col: col in wanted)
+    if reader == 'parquet':
+        import pyarrow.parquet as pq
+        available = pq.ParquetFile(file_path).schema_arrow.names
+        return pd.read_parquet(file_path, columns=[col for col in available if col in wanted])
+    return pd.read_excel(file_path, engine=reader, usecols=lambda col: col in wanted)
+
+def format_id(val):
+    """Converts a single ID value to a clean string, removing '.0' from numbers read as floats."""
+    if pd.isna(val) or str(val).lower() in ['nan', 'none', '']:
+        return None
+    try:
+        # Convert to float, then to int to drop decimals, then to string
+        return str(int(float(val)))
+    except (ValueError, TypeError, OverflowError):
+        # If it can't be converted (e.g., a non-numeric string), return as is
+        return str(val).strip()
+
+ID_FAST_PATH_LIMIT = 2 ** 53
+
+def normalize_id_column(series):
+    """
+    Vectorized equivalent of series.apply(format_id).
+    Numeric values below 2**53 in magnitude (exact as floats, safe as int64) are truncated to
+    integers in one pass; everything else (e.g. alphanumeric or very large IDs) falls back to format_id.
+    """
+    numeric = pd.to_numeric(series, errors='coerce')
+    in_fast_range = (numeric.notna() & (numeric.abs() < ID_FAST_PATH_LIMIT)).fillna(False).astype(bool)
+    result = pd.Series([None] * len(series), index=series.index, dtype=object)
+    result[in_fast_range] = numeric[in_fast_range].astype('float64').astype('int64').astype(str)
+    needs_fallback = ~in_fast_range & series.notna()
+    if needs_fallback.any():
+        result[needs_fallback] = series[needs_fallback].map(format_id)
+    return result
+
+# Low-cardinality text columns are stored as categoricals (each distinct value once, shared by
+# every row and by the node records built from them) when at most this share of values is distinct.
+CATEGORICAL_COLUMNS = ['level', 'talent_group', 'Operating Unit Name', 'Location  Name', 'coach_name', 'partner_relationship_name']
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+# False restores the previous representation (object columns and one dict per node). The build's
+# --memory-baseline option runs it in a subprocess to report the compact one's peak-RSS saving.
+COMPACT_REPRESENTATION = True
+
+def categorize_columns(df, columns=CATEGORICAL_COLUMNS, max_unique_ratio=CATEGORICAL_MAX_UNIQUE_RATIO, measure=False):
+    """
+    Converts the low-cardinality columns of `df` to categoricals in place.
+    Returns (bytes_before, bytes_after) of the converted columns when `measure` is set (measuring
+    every string is slow), else (0, 0).
+    """
+    bytes_before = bytes_after = 0
+    for col in columns:
+        if col not in df.columns or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        series = df[col]
+        if series.nunique(dropna=True) > max_unique_ratio * len(series):
+            continue
+        if measure:
+            bytes_before += series.memory_usage(index=False, deep=True)
+        df[col] = series.astype('category')
+        if measure:
+            bytes_after += df[col].memory_usage(index=False, deep=True)
+    return bytes_before, bytes_after
+
+def as_str_column(series):
     """
-    Loads employee data from the specified Excel file.
+    series.astype(str) that keeps a categorical column categorical: only the categories are
+    converted, and missing values become 'nan' as they do with astype(str).
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(str)
+    labels = [str(category) for category in series.cat.categories] + ['nan']
+    categories = pd.Index(labels).unique()
+    codes = categories.get_indexer(labels)[series.cat.codes.to_numpy()] # Code -1 (missing) picks 'nan'
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=series.index, name=series.name)
+
+def load_employee_data(file_path, reader=INPUT_READER):
+    """
+    Loads employee data from the specified Excel, CSV or Parquet file.
     Renames columns based on COLUMN_MAPPING.
     """
     try:
-        df = pd.read_excel(file_path, engine='openpyxl')
+        df = read_input_frame(file_path, reader)
 
         # All employees will be loaded. Filtering/categorization will happen later.
         # Rename columns for internal consistency
@@ -79,21 +336,11 @@ def load_employee_data(file_path):
                              f"Please check COLUMN_MAPPING and Excel file.")
                              
         # Convert ID columns to clean strings, removing '.0' from numbers read as floats
-        def format_id(val):
-            if pd.isna(val) or str(val).lower() in ['nan', 'none', '']:
-                return None
-            try:
-                # Convert to float, then to int to drop decimals, then to string
-                return str(int(float(val)))
-            except (ValueError, TypeError):
-                # If it can't be converted (e.g., a non-numeric string), return as is
-                return str(val).strip()
-
-        df['employee_id'] = df['employee_id'].apply(format_id)
+        df['employee_id'] = normalize_id_column(df['employee_id'])
         if 'coach_id' in df.columns:
-            df['coach_id'] = df['coach_id'].apply(format_id)
+            df['coach_id'] = normalize_id_column(df['coach_id'])
         if 'partner_relationship_id' in df.columns:
-            df['partner_relationship_id'] = df['partner_relationship_id'].apply(format_id)
+            df['partner_relationship_id'] = normalize_id_column(df['partner_relationship_id'])
 
         # Clean name columns
         if 'partner_relationship_name' in df.columns:
@@ -101,23 +348,298 @@ def load_employee_data(file_path):
         if 'coach_name' in df.columns:
             df['coach_name'] = df['coach_name'].astype(str).replace(['nan', 'None', '', pd.NA], None)
 
+        if COMPACT_REPRESENTATION:
+            bytes_before, bytes_after = categorize_columns(df, measure=ACTIVE_PROFILE is not None)
+            if bytes_before:
+                print(f"Stored low-cardinality columns as categoricals: {bytes_before / 2**20:.1f} MiB -> {bytes_after / 2**20:.1f} MiB.")
+
         return df
     except FileNotFoundError:
         print(f"Error: The file '{file_path}' was not found.")
         return None
     except Exception as e:
-        print(f"Error loading or processing Excel file: {e}")
+        print(f"Error loading or processing input file: {e}")
         return None
 
+# On-disk cache of the normalized frame returned by load_employee_data, keyed on the
+# input file's content hash plus COLUMN_MAPPING. Entries are uncompressed Feather files
+# (requires pyarrow) loaded memory-mapped on a hit. Set PARSE_CACHE_DIR to None to disable.
+PARSE_CACHE_DIR = '.forest_cache'
+PARSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PARSE_CACHE_MAX_AGE_DAYS = 30
+PARSE_CACHE_VERSION = 2 # Bump when load_employee_data's normalization changes
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """Returns the hex SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def parse_cache_key(file_path):
+    """Cache key for an input file: its content hash, COLUMN_MAPPING and the cache format version."""
+    key_source = json.dumps({
+        'file_sha256': file_sha256(file_path),
+        'column_mapping': COLUMN_MAPPING,
+        'version': PARSE_CACHE_VERSION
+    }, sort_keys=True)
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+def evict_parse_cache(cache_dir, max_bytes=PARSE_CACHE_MAX_BYTES, max_age_days=PARSE_CACHE_MAX_AGE_DAYS):
+    """Removes cache entries older than max_age_days, then the least recently used ones beyond max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.feather'):
+            path = os.path.join(cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    total_bytes = 0
+    for mtime, size, path in sorted(entries, reverse=True): # Most recently used first
+        total_bytes += size
+        if mtime < cutoff or total_bytes > max_bytes:
+            for stale_path in (path, path[:-len('.feather')] + '.json'):
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+
+def load_employee_data_cached(file_path, reader=INPUT_READER, cache_dir=PARSE_CACHE_DIR):
+    """
+    load_employee_data with a content-addressed parse cache.
+    A hit is only used when the cached frame holds every column projected_source_columns()
+    asks for now, so adding columns to INCLUDED_DATA_COLUMNS re-parses, but removing them does not.
+    """
+    if not cache_dir:
+        return load_employee_data(file_path, reader)
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        print("Parse cache disabled: pyarrow is not installed.")
+        return load_employee_data(file_path, reader)
+
+    try:
+        key = parse_cache_key(file_path)
+    except FileNotFoundError:
+        print(f"Error: The file '{file_path}' was not found.")
+        return None
+
+    data_path = os.path.join(cache_dir, f"{key}.feather")
+    meta_path = os.path.join(cache_dir, f"{key}.json")
+    wanted = projected_source_columns()
+
+    if os.path.exists(data_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path) as f:
+                cached_columns = set(json.load(f).get('projected_columns', []))
+            if wanted <= cached_columns:
+                df = feather.read_table(data_path, memory_map=True).to_pandas()
+                df = df[[col for col in df.columns if COLUMN_MAPPING.get(col, col) in wanted]]
+                os.utime(data_path) # Mark as recently used for eviction
+                print(f"Loaded parsed data from cache '{data_path}'.")
+                return df
+        except Exception as e:
+            # A corrupt entry is a miss: drop it, then re-parse and rewrite it below
+            print(f"Warning: Discarding unreadable parse cache entry '{data_path}': {e}")
+            for stale_path in (data_path, meta_path):
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+
+    df = load_employee_data(file_path, reader)
+    if df is None:
+        return None
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+        feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, data_path)
+        with open(f"{meta_path}.{os.getpid()}.tmp", 'w') as f:
+            json.dump({'source': str(file_path), 'projected_columns': sorted(wanted), 'created': time.time()}, f)
+        os.replace(f"{meta_path}.{os.getpid()}.tmp", meta_path)
+        evict_parse_cache(cache_dir)
+    except Exception as e:
+        print(f"Warning: Could not write parse cache entry: {e}")
+    return df
+
 # --- 2. Data Validation ---
-def validate_data(df):
+
+# Validation engine used by validate_data. 'vectorized' evaluates every check with
+# column-wide masks; 'rows' is the original row-by-row scan, kept for parity checks.
+VALIDATION_MODES = ('vectorized', 'rows')
+VALIDATION_MODE = 'vectorized'
+
+def scan_coach_integrity_rows(df, all_employee_ids, has_coach_id_col):
+    """
+    Row-by-row partner identification and coach_id integrity check.
+    Returns (partner IDs, non-partners missing a coach, orphan coach messages).
+    """
+    partners_identified_by_level = []
+    non_partners_missing_coach = []
+    orphan_coach_messages = []
+    for index, row in df.iterrows():
+        employee_id = row['employee_id']
+        # Use internal 'level' column for partner check
+        is_partner = str(row['level']).strip() == PARTNER_LEVEL_VALUE
+
+        if is_partner:
+            partners_identified_by_level.append(employee_id)
+        else:
+            # This is a non-Partner
+            if not has_coach_id_col: # If coach_id col itself is missing
+                non_partners_missing_coach.append(employee_id)
+                continue # Skip to next employee
+
+            coach_id = row.get('coach_id') # Use .get() for safety, though has_coach_id_col is checked
+            if not coach_id: # Coach_id is None or empty after standardization
+                non_partners_missing_coach.append(employee_id)
+            elif coach_id not in all_employee_ids:
+                orphan_coach_messages.append(f"Non-Partner Employee '{employee_id}' has unknown coach '{coach_id}'")
+    return partners_identified_by_level, non_partners_missing_coach, orphan_coach_messages
+
+def scan_coach_integrity_vectorized(df, all_employee_ids, has_coach_id_col):
+    """
+    Column-wise equivalent of scan_coach_integrity_rows.
+    Results keep the DataFrame's row order so the summary matches the row-by-row scan.
+    """
+    is_partner = df['level'].str.strip() == PARTNER_LEVEL_VALUE
+    partners_identified_by_level = df.loc[is_partner, 'employee_id'].tolist()
+    non_partners = df.loc[~is_partner]
+
+    if not has_coach_id_col:
+        return partners_identified_by_level, non_partners['employee_id'].tolist(), []
+
+    coach_ids = non_partners['coach_id']
+    missing_coach = coach_ids.isna() | (coach_ids == '')
+    unknown_coach = ~missing_coach & ~coach_ids.isin(all_employee_ids)
+    orphan_coach_messages = [
+        f"Non-Partner Employee '{employee_id}' has unknown coach '{coach_id}'"
+        for employee_id, coach_id in zip(non_partners.loc[unknown_coach, 'employee_id'], coach_ids[unknown_coach])
+    ]
+    return partners_identified_by_level, non_partners.loc[missing_coach, 'employee_id'].tolist(), orphan_coach_messages
+
+def pod_relationship_status_rows(df, all_employee_ids):
+    """Row-by-row pod relationship status: 'valid' only when the pod ID is an active Partner."""
+    partner_ids = set(df[df['level'] == PARTNER_LEVEL_VALUE]['employee_id'])
+    status = pd.Series("valid", index=df.index, dtype=object)
+
+    for index, row in df.iterrows():
+        pod_id = row['partner_relationship_id']
+        if pd.notna(pod_id):
+            if pod_id not in all_employee_ids or pod_id not in partner_ids:
+                status.loc[index] = "error_invalid_id"
+        else:
+            status.loc[index] = "error_invalid_id"
+    return status
+
+def pod_relationship_status_vectorized(df):
+    """Column-wise equivalent of pod_relationship_status_rows (Partner IDs are a subset of all IDs)."""
+    partner_ids = df.loc[df['level'] == PARTNER_LEVEL_VALUE, 'employee_id']
+    pod_ids = df['partner_relationship_id']
+    is_valid = pod_ids.notna() & pod_ids.isin(partner_ids)
+    return pd.Series(np.where(is_valid, "valid", "error_invalid_id"), index=df.index, dtype=object)
+
+def coach_adjacency_rows(df, all_employee_ids):
+    """Row-by-row coach -> coachees adjacency for non-Partners whose coach exists."""
+    adj = defaultdict(list)
+    for _, row in df.iterrows():
+        employee_id = str(row['employee_id'])
+        is_partner = str(row['level']).strip() == PARTNER_LEVEL_VALUE
+
+        if not is_partner:
+            coach_id = row['coach_id']
+            if coach_id and coach_id in all_employee_ids: # Only add edge if coach is valid and employee is not partner
+                adj[coach_id].append(employee_id)
+    return adj
+
+def coach_adjacency_vectorized(df, all_employee_ids):
+    """Column-wise equivalent of coach_adjacency_rows; coachee lists keep row order."""
+    is_partner = df['level'].str.strip() == PARTNER_LEVEL_VALUE
+    coach_ids = df['coach_id']
+    has_valid_coach = ~is_partner & coach_ids.notna() & coach_ids.isin(all_employee_ids)
+    adj = defaultdict(list)
+    for coach_id, employee_id in zip(coach_ids[has_valid_coach], df.loc[has_valid_coach, 'employee_id'].astype(str)):
+        adj[coach_id].append(employee_id)
+    return adj
+
+def find_coaching_cycles(adj):
+    """
+    Finds every coaching cycle in a coach -> coachees adjacency map.
+    Uses an iterative Tarjan strongly-connected-components pass, so it runs in
+    O(employees + coaching links) and is safe on chains thousands of levels deep.
+    Returns a list of cycles, each the list of member IDs in order (each coaches the next).
+    """
+    index_of = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    cycles = []
+
+    for start_id in list(adj): # Only coaches can sit on a cycle
+        if start_id in index_of:
+            continue
+        index_of[start_id] = lowlink[start_id] = len(index_of)
+        stack.append(start_id)
+        on_stack.add(start_id)
+        work = [(start_id, iter(adj.get(start_id, ())))]
+
+        while work:
+            node, neighbours = work[-1]
+            descended = False
+            for neighbour in neighbours:
+                if neighbour not in index_of:
+                    index_of[neighbour] = lowlink[neighbour] = len(index_of)
+                    stack.append(neighbour)
+                    on_stack.add(neighbour)
+                    work.append((neighbour, iter(adj.get(neighbour, ()))))
+                    descended = True
+                    break
+                if neighbour in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[neighbour])
+            if descended:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] != index_of[node]:
+                continue
+
+            # `node` is the root of a strongly connected component: pop it off the stack.
+            component = set()
+            while True:
+                member = stack.pop()
+                on_stack.discard(member)
+                component.add(member)
+                if member == node:
+                    break
+            if len(component) > 1 or node in adj.get(node, ()):
+                # Walk the coaching links inside the component to recover the member path.
+                path = [node]
+                seen = {node}
+                next_id = next(c for c in adj[node] if c in component)
+                while next_id not in seen:
+                    path.append(next_id)
+                    seen.add(next_id)
+                    next_id = next(c for c in adj[next_id] if c in component)
+                cycles.append(path)
+
+    return cycles
+
+def validate_data(df, mode=None):
     """
     Validates the DataFrame for unique IDs, coach_id integrity, and cycles.
     Returns a DataFrame (or None if critical errors) and a validation summary.
+    `mode` selects the validation engine ('vectorized' or 'rows') and defaults to VALIDATION_MODE.
     """
     if df is None:
         return None, {"errors": ["Data loading failed."], "critical_errors": True}
 
+    mode = mode or VALIDATION_MODE
+    if mode not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode '{mode}'. Expected one of: {', '.join(VALIDATION_MODES)}.")
+
     summary = {
         "total_employees_read": len(df),
         "partners_found": 0,
@@ -125,6 +647,7 @@ def validate_data(df):
         "orphan_coach_ids": [],
         "invalid_pod_ids": [],
         "cycles_detected": [],
+        "cycle_members": [],
         "errors": [],
         "warnings": [],
         "critical_errors": False
@@ -146,7 +669,7 @@ def validate_data(df):
 
     # Ensure 'level' column is string type for comparison, if it exists
     if 'level' in df.columns:
-        df['level'] = df['level'].astype(str)
+        df['level'] = as_str_column(df['level'])
 
     # Convert employee_id to string
     df['employee_id'] = df['employee_id'].astype(str)
@@ -171,24 +694,13 @@ def validate_data(df):
 
     # Iterate and validate based on 'level'
     if 'level' in df.columns: # Proceed only if 'level' column exists
-        for index, row in df.iterrows():
-            employee_id = row['employee_id']
-            # Use internal 'level' column for partner check
-            is_partner = str(row['level']).strip() == PARTNER_LEVEL_VALUE
-
-            if is_partner:
-                partners_identified_by_level.append(employee_id)
-            else:
-                # This is a non-Partner
-                if not has_coach_id_col: # If coach_id col itself is missing
-                    non_partners_missing_coach.append(employee_id)
-                    continue # Skip to next employee
-
-                coach_id = row.get('coach_id') # Use .get() for safety, though has_coach_id_col is checked
-                if not coach_id: # Coach_id is None or empty after standardization
-                    non_partners_missing_coach.append(employee_id)
-                elif coach_id not in all_employee_ids:
-                    summary["orphan_coach_ids"].append(f"Non-Partner Employee '{employee_id}' has unknown coach '{coach_id}'")
+        if mode == 'rows':
+            partners_identified_by_level, non_partners_missing_coach, orphan_coach_messages = \
+                scan_coach_integrity_rows(df, all_employee_ids, has_coach_id_col)
+        else:
+            partners_identified_by_level, non_partners_missing_coach, orphan_coach_messages = \
+                scan_coach_integrity_vectorized(df, all_employee_ids, has_coach_id_col)
+        summary["orphan_coach_ids"].extend(orphan_coach_messages)
     else: # 'level' column is missing, cannot determine partners correctly
         summary["errors"].append("Cannot determine Partners or validate coach structure as 'level' column is missing.")
         summary["critical_errors"] = True
@@ -206,17 +718,10 @@ def validate_data(df):
 
     # C. Pod Relationship Validation
     if 'partner_relationship_id' in df.columns:
-        partner_ids = set(df[df['level'] == PARTNER_LEVEL_VALUE]['employee_id'])
-        df['pod_relationship_status'] = "valid"
-
-        for index, row in df.iterrows():
-            pod_id = row['partner_relationship_id']
-            if pd.notna(pod_id):
-                if pod_id not in all_employee_ids or pod_id not in partner_ids:
-                    df.loc[index, 'pod_relationship_status'] = "error_invalid_id"
-            else:
-                df.loc[index, 'pod_relationship_status'] = "error_invalid_id"
-
+        if mode == 'rows':
+            df['pod_relationship_status'] = pod_relationship_status_rows(df, all_employee_ids)
+        else:
+            df['pod_relationship_status'] = pod_relationship_status_vectorized(df)
     else:
         summary["warnings"].append("Warning: 'Partner Job Relationships User ID' column not found. Pod feature will be disabled.")
         df['pod_relationship_status'] = "error_invalid_id"
@@ -227,48 +732,19 @@ def validate_data(df):
     # D. Cycle Detection (Build adjacency list only for non-Partners with valid coaches)
     adj = defaultdict(list)
     if has_coach_id_col and 'level' in df.columns and not summary["critical_errors"]: # Proceed if data is coherent enough
-        for _, row in df.iterrows():
-            employee_id = str(row['employee_id'])
-            is_partner = str(row['level']).strip() == PARTNER_LEVEL_VALUE
-
-            if not is_partner:
-                coach_id = row['coach_id']
-                if coach_id and coach_id in all_employee_ids: # Only add edge if coach is valid and employee is not partner
-                    adj[coach_id].append(employee_id)
-
-    visited_dfs = set() # For general DFS traversal tracking
-    recursion_stack = set() # For tracking nodes in current recursion path for cycle detection
-
-    def detect_cycle_util(node):
-        visited_dfs.add(node)
-        recursion_stack.add(node)
-
-        for neighbour in adj.get(node, []):
-            if neighbour not in visited_dfs:
-                if detect_cycle_util(neighbour):
-                    # Cycle detected downstream, propagate True
-                    # Check if this node is part of the cycle before adding
-                    # This part needs refinement to capture the actual cycle path
-                    return True 
-            elif neighbour in recursion_stack:
-                # Cycle detected
-                # Attempt to trace back the cycle (simplified, might not get full path easily here)
-                # For now, just record the node where cycle is re-entered and the one causing it.
-                summary["cycles_detected"].append(f"Cycle detected involving {neighbour} (re-entered) from {node}")
-                return True
-        
-        recursion_stack.remove(node)
-        return False
+        if mode == 'rows':
+            adj = coach_adjacency_rows(df, all_employee_ids)
+        else:
+            adj = coach_adjacency_vectorized(df, all_employee_ids)
 
     if has_coach_id_col:
-        all_nodes_in_adj = set(adj.keys()) | set(e for coachees in adj.values() for e in coachees)
-        for node_id in all_nodes_in_adj: # Iterate over all unique IDs involved in relationships
-            if node_id not in visited_dfs:
-                if detect_cycle_util(node_id):
-                    summary["errors"].append(f"Validation Error: Coaching cycles detected. Check 'cycles_detected' list.")
-                    summary["critical_errors"] = True # Cycles are critical for tree structure
-                    # No need to continue cycle detection if one is found and it's critical
-                    break 
+        for cycle in find_coaching_cycles(adj):
+            summary["cycle_members"].append(cycle)
+            summary["cycles_detected"].append(
+                f"Coaching cycle of {len(cycle)} employee(s): {' -> '.join(cycle + [cycle[0]])} (each coaches the next)")
+        if summary["cycles_detected"]:
+            summary["errors"].append(f"Validation Error: Coaching cycles detected. Check 'cycles_detected' list.")
+            summary["critical_errors"] = True # Cycles are critical for tree structure
     
     if summary["errors"]: # If any errors were logged
         print("\n--- Validation Issues ---")
@@ -285,7 +761,7 @@ def validate_data(df):
         if summary["duplicate_ids"]:
              print(f"Duplicate Employee IDs: {summary['duplicate_ids']}")
         if summary["cycles_detected"] and summary["critical_errors"]:
-            print("Cycles Found (may be partial list if detection stopped early):")
+            print(f"Cycles Found ({len(summary['cycles_detected'])}):")
             for cycle_info in summary["cycles_detected"]:
                 print(f"  - {cycle_info}")
         print("-------------------------\n")
@@ -318,7 +794,7 @@ def print_validation_summary(summary):
         print("Orphan coach IDs: None found.")
 
     if summary.get("cycles_detected"):
-        print(f"Coaching cycles detected: {summary['cycles_detected']}")
+        print(f"Coaching cycles detected: {len(summary['cycles_detected'])} (see Validation Issues above for member paths)")
     else:
         print("Coaching cycles: None detected.")
 
@@ -339,49 +815,370 @@ def print_validation_summary(summary):
     print("-----------------------------\n")
 
 # --- 4. Tree Construction ---
-# (Commented out 'build_coaching_forest' function and related comments removed as per user request)
-# --- 5. JSON Export ---
-def export_to_json(data_to_export, output_path):
-    """Exports the structured data to a JSON file."""
-    try:
-        with open(output_path, 'w') as f:
-            json.dump(data_to_export, f, indent=2)
-        print(f"Successfully exported data to '{output_path}'")
-    except Exception as e:
-        print(f"Error exporting to JSON: {e}")
+class MissingField:
+    """Marks a field a ForestNode does not have. Pickles by name, so it survives worker processes."""
+    __slots__ = ()
+    def __repr__(self):
+        return 'MISSING_FIELD'
+    def __reduce__(self):
+        return 'MISSING_FIELD'
+
+MISSING_FIELD = MissingField()
+
+class ForestNode(MutableMapping):
+    """
+    Compact employee record: a values list laid out by a schema ({field: position}) shared by every
+    node of a build, instead of one dict per node. Behaves like the node dict it replaces
+    (node['name'], node.get(...), node['depth'] = ...); fields set for the first time are appended
+    to the shared schema. Written to JSON as a plain object through forest_json_default.
+    """
+    __slots__ = ('schema', 'values')
+
+    def __init__(self, schema, values):
+        self.schema = schema
+        self.values = values
+
+    def __getitem__(self, key):
+        position = self.schema.get(key)
+        if position is not None and position < len(self.values):
+            value = self.values[position]
+            if value is not MISSING_FIELD:
+                return value
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        position = self.schema.get(key)
+        if position is None:
+            position = self.schema[key] = len(self.schema)
+        if position >= len(self.values):
+            self.values.extend([MISSING_FIELD] * (position + 1 - len(self.values)))
+        self.values[position] = value
+
+    def __delitem__(self, key):
+        self[key] # KeyError when missing
+        self.values[self.schema[key]] = MISSING_FIELD
+
+    def __iter__(self):
+        for key, value in zip(self.schema, self.values):
+            if value is not MISSING_FIELD:
+                yield key
+
+    def __len__(self):
+        return sum(value is not MISSING_FIELD for value in self.values)
+
+    def __contains__(self, key):
+        position = self.schema.get(key)
+        return position is not None and position < len(self.values) and self.values[position] is not MISSING_FIELD
+
+    def get(self, key, default=None):
+        position = self.schema.get(key)
+        if position is not None and position < len(self.values):
+            value = self.values[position]
+            if value is not MISSING_FIELD:
+                return value
+        return default
+
+    def copy(self):
+        """Shallow copy sharing the schema (and the children list, like dict.copy)."""
+        return ForestNode(self.schema, list(self.values))
+
+    def to_dict(self):
+        return {key: value for key, value in zip(self.schema, self.values) if value is not MISSING_FIELD}
+
+    def __repr__(self):
+        return f"ForestNode({self.to_dict()!r})"
+
+def forest_json_default(value):
+    """
+    json.dump `default` hook: writes ForestNodes as plain JSON objects. A node's whole subtree is
+    converted at once (one tree at a time is held as dicts), which keeps the encoder's generator
+    nesting as shallow as for plain dicts.
+    """
+    if not isinstance(value, ForestNode):
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    root = value.to_dict()
+    stack = [root]
+    while stack:
+        record = stack.pop()
+        if record.get('children'):
+            record['children'] = [child.to_dict() if isinstance(child, ForestNode) else child for child in record['children']]
+            stack.extend(child for child in record['children'] if 'children' in child)
+    return root
+
+def split_retired_partners(employee_df):
+    """
+    Separates Retired Partners from the active employees.
+    Returns (active_df, retired_partners_map) where the map is {employee_id: {'name': ...}}.
+    """
+    if 'level' not in employee_df.columns:
+        return employee_df, {}
+    retired_mask = employee_df['level'] == 'Retired Partner'
+    retired_df = employee_df[retired_mask]
+    # Create a map of retired partners by their ID for later reference
+    retired_partners_map = {str(emp_id): {'name': name} for emp_id, name in zip(retired_df['employee_id'], retired_df['name'])}
+    return employee_df[~retired_mask], retired_partners_map
+
+def gather_children(frontier, child_offsets, child_rows):
+    """Returns the children of every row in `frontier`, concatenated, using the CSR child arrays."""
+    lengths = child_offsets[frontier + 1] - child_offsets[frontier]
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    starts = np.repeat(child_offsets[frontier] - np.cumsum(lengths) + lengths, lengths)
+    return child_rows[starts + np.arange(total)]
+
+def deduplicate_employee_ids(validated_df):
+    """
+    One row per employee ID, behaving like a dict keyed by ID: each ID keeps its first-seen
+    position and its last row's values. Returns a frame with a fresh RangeIndex.
+    """
+    ids = validated_df['employee_id'].astype(str)
+    if ids.duplicated().any():
+        is_last = ~ids.duplicated(keep='last')
+        frame = validated_df[is_last].set_axis(ids[is_last], axis=0).loc[ids.drop_duplicates(keep='first')]
+    else:
+        frame = validated_df
+    return frame.reset_index(drop=True)
 
-# --- Helper function to count descendants (can be defined globally or within main) ---
-def count_all_descendants(node_dict):
-    count = 0
-    if node_dict.get('children'):
-        count += len(node_dict['children']) # Direct children
-        for child in node_dict['children']:
-            count += count_all_descendants(child) # Indirect children (recursive)
-    return count
+def assemble_forest(validated_df):
+    """
+    Builds the coaching forest from the validated frame without recursion.
+    Coach IDs become integer parent indices, and a breadth-first (topological) order from the
+    roots drives one vectorized pass per depth level for counts and root Partner IDs.
+    Returns a dict holding the node records and the arrays behind them:
+      'nodes'           {employee_id: ForestNode} in input order (the last row wins for duplicate IDs)
+      'ids'             employee ID of each row
+      'parent'          parent row of each row; -1 for Partners and employees without a valid coach
+      'order'           rows in topological (breadth-first) order; rows stuck in cycles are left out
+      'depth'           distance of each row from its root (-1 when unreachable)
+      'child_offsets', 'child_rows'
+                        children of row r are child_rows[child_offsets[r]:child_offsets[r + 1]]
+      'direct_counts', 'indirect_counts'
+                        direct coachees and all descendants of each row
+      'root_rows'       row of the Partner whose tree holds each row (-1 outside every Partner tree)
+      'interval_start', 'interval_end'
+                        pre-order interval of each row within its tree (see is_under)
+      'partner_rows'    rows of Partners, in input order
+      'orphan_rows'     rows of non-Partners outside every Partner tree, in input order
+      'partner_trees'   Partner ForestNodes with nested 'children' (the forest.json shape)
+      'frame'           the de-duplicated frame the rows refer to
+    """
+    frame = deduplicate_employee_ids(validated_df)
+    ids = frame['employee_id'].astype(str).tolist()
+    n = len(ids)
+
+    # 1. Parent indices: Partners are always roots, everyone else hangs off a coach that exists
+    is_partner = (frame['level'] == PARTNER_LEVEL_VALUE).to_numpy()
+    if 'coach_id' in frame.columns:
+        parent = pd.Index(ids).get_indexer(frame['coach_id']).astype(np.int64)
+    else:
+        parent = np.full(n, -1, dtype=np.int64)
+    parent[is_partner] = -1
+
+    has_parent = parent >= 0
+    direct_counts = np.bincount(parent[has_parent], minlength=n)
+    child_offsets = np.concatenate(([0], np.cumsum(direct_counts))).astype(np.int64)
+    child_rows = np.flatnonzero(has_parent)[np.argsort(parent[has_parent], kind='stable')]
+
+    # 2. Breadth-first levels from the roots give a topological order
+    depth = np.full(n, -1, dtype=np.int64)
+    levels = []
+    frontier = np.flatnonzero(~has_parent)
+    while frontier.size:
+        depth[frontier] = len(levels)
+        levels.append(frontier)
+        frontier = gather_children(frontier, child_offsets, child_rows)
+    order = np.concatenate(levels) if levels else np.empty(0, dtype=np.int64)
+
+    # 3. Post-order accumulation (deepest level first) and top-down root propagation
+    indirect_counts = np.zeros(n, dtype=np.int64)
+    for level in reversed(levels[1:]):
+        np.add.at(indirect_counts, parent[level], indirect_counts[level] + 1)
+    root_rows = np.full(n, -1, dtype=np.int64)
+    if levels:
+        partner_roots = levels[0][is_partner[levels[0]]]
+        root_rows[partner_roots] = partner_roots
+    for level in levels[1:]:
+        root_rows[level] = root_rows[parent[level]]
+
+    # 4. Pre-order intervals: a child starts right after its parent plus the subtrees of its
+    #    earlier siblings, and a subtree spans its descendant count
+    subtree_sizes = indirect_counts + 1
+    sibling_sizes = np.cumsum(subtree_sizes[child_rows])
+    group_base = np.concatenate(([0], sibling_sizes))[child_offsets[parent[child_rows]]]
+    start_offsets = np.zeros(n, dtype=np.int64)
+    start_offsets[child_rows] = 1 + sibling_sizes - subtree_sizes[child_rows] - group_base
+    interval_start = np.zeros(n, dtype=np.int64)
+    for level in levels[1:]:
+        interval_start[level] = interval_start[parent[level]] + start_offsets[level]
+    interval_end = interval_start + indirect_counts
+
+    # 5. Node records, built column by column: the included columns (missing values left out),
+    #    then counts, tree membership and labels. Children are linked in row order within each coach.
+    in_tree = root_rows >= 0
+    def tree_only(values):
+        return np.where(in_tree, values, MISSING_FIELD).tolist()
+    included_columns = [col for col in INCLUDED_DATA_COLUMNS if col in frame.columns]
+    columns = {}
+    for col in included_columns:
+        values = frame[col].to_numpy(dtype=object)
+        columns[col] = np.where(pd.notna(values), values, MISSING_FIELD).tolist()
+    root_ids = tree_only(np.array(ids, dtype=object)[root_rows])
+    if 'coaching_tree_partner_id' in columns:
+        columns['coaching_tree_partner_id'] = [root_id if root_id is not MISSING_FIELD else value
+                                               for root_id, value in zip(root_ids, columns['coaching_tree_partner_id'])]
+    children_lists = [[] for _ in range(n)]
+    columns['id'] = ids
+    columns['children'] = children_lists
+    columns['indirect_coachee_count'] = indirect_counts.tolist()
+    columns.setdefault('coaching_tree_partner_id', root_ids)
+    columns['direct_coachee_count'] = direct_counts.tolist()
+    columns['interval_root_id'] = root_ids
+    columns['interval_start'] = tree_only(interval_start.astype(object))
+    columns['interval_end'] = tree_only(interval_end.astype(object))
+    columns['depth'] = tree_only(depth.astype(object))
+    schema = {col: position for position, col in enumerate(columns)}
+    if COMPACT_REPRESENTATION:
+        node_list = [ForestNode(schema, list(values)) for values in zip(*columns.values())]
+    else:
+        node_list = [{col: value for col, value in zip(schema, values) if value is not MISSING_FIELD}
+                     for values in zip(*columns.values())]
+    nodes = dict(zip(ids, node_list))
+    for child_row, parent_row in zip(child_rows.tolist(), parent[child_rows].tolist()):
+        children_lists[parent_row].append(node_list[child_row])
+
+    partner_rows = np.flatnonzero(is_partner)
+    orphan_rows = np.flatnonzero((root_rows < 0) & ~is_partner)
+    return {
+        'nodes': nodes,
+        'ids': ids,
+        'parent': parent,
+        'order': order,
+        'depth': depth,
+        'child_offsets': child_offsets,
+        'child_rows': child_rows,
+        'direct_counts': direct_counts,
+        'indirect_counts': indirect_counts,
+        'root_rows': root_rows,
+        'interval_start': interval_start,
+        'interval_end': interval_end,
+        'partner_rows': partner_rows,
+        'orphan_rows': orphan_rows,
+        'partner_trees': [node_list[row] for row in partner_rows.tolist()],
+        'frame': frame
+    }
 
-def stamp_root_partner_id(node, root_id):
-    """Recursively add the root partner's ID to each node in a tree."""
-    node['coaching_tree_partner_id'] = root_id
-    for child in node.get('children', []):
-        stamp_root_partner_id(child, root_id)
+def is_under(node, ancestor):
+    """
+    True when `node` is a (strict) descendant of `ancestor` in the Partner forest.
+    Uses the interval labels from assemble_forest: within one tree, a node's subtree is
+    exactly the nodes whose interval_start lies in (interval_start, interval_end].
+    """
+    return (node.get('interval_root_id') is not None
+            and node.get('interval_root_id') == ancestor.get('interval_root_id')
+            and ancestor['interval_start'] < node['interval_start'] <= ancestor['interval_end'])
 
-def find_broken_chain_root_cause(employee_id, all_nodes, all_ids_set, retired_partners_map):
+def shift_interval_labels(root, threshold, delta, contains=None, skip=None):
+    """
+    Adds `delta` to every interval_start above `threshold` in the tree under `root`, and to the
+    interval_end of the nodes whose interval contains `contains` (their subtree grew or shrank).
+    Subtrees entirely before the threshold, and the `skip` subtree, are left alone.
+    """
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node is skip:
+            continue
+        if node['interval_start'] > threshold:
+            node['interval_start'] += delta
+            node['interval_end'] += delta
+        elif contains is not None and node['interval_start'] <= contains <= node['interval_end']:
+            node['interval_end'] += delta
+        elif node['interval_end'] <= threshold:
+            continue
+        stack.extend(node.get('children', []))
+
+def relabel_subtree_move(moved_node, old_root, new_root, new_coach):
+    """
+    Updates the interval labels after `moved_node` has been re-parented under `new_coach`
+    (removed from its old coach's children and appended to `new_coach`'s children).
+    Only the old and new trees are touched; every other tree keeps its labels.
+    Pass old_root=None when the subtree comes from outside the Partner trees (it has no labels
+    yet) and new_root=None when it leaves them (its labels are removed).
+    """
+    # The moved subtree in pre-order, with each node's parent position
+    subtree = []
+    stack = [(moved_node, -1)]
+    while stack:
+        node, parent_pos = stack.pop()
+        subtree.append((node, parent_pos))
+        position = len(subtree) - 1
+        stack.extend((child, position) for child in reversed(node.get('children', [])))
+    size = len(subtree)
+
+    # Close the gap the subtree left behind in its old tree
+    if old_root is not None:
+        shift_interval_labels(old_root, moved_node['interval_end'], -size, contains=moved_node['interval_start'], skip=moved_node)
+
+    if new_root is None:
+        for node, _ in subtree:
+            for key in ('interval_root_id', 'interval_start', 'interval_end', 'depth'):
+                node.pop(key, None)
+        return
+
+    # Open a gap after the new coach's current subtree (the moved subtree is its last child)
+    insert_at = new_coach['interval_end'] + 1
+    shift_interval_labels(new_root, insert_at - 1, size, contains=new_coach['interval_start'], skip=moved_node)
+
+    subtree_sizes = [1] * size
+    for position in range(size - 1, 0, -1):
+        subtree_sizes[subtree[position][1]] += subtree_sizes[position]
+    depths = [new_coach['depth'] + 1] * size
+    for position, (node, parent_pos) in enumerate(subtree):
+        if parent_pos >= 0:
+            depths[position] = depths[parent_pos] + 1
+        node['interval_root_id'] = new_root['id']
+        node['interval_start'] = insert_at + position
+        node['interval_end'] = insert_at + position + subtree_sizes[position] - 1
+        node['depth'] = depths[position]
+
+def find_broken_chain_root_cause(employee_id, all_nodes, all_ids_set, retired_partners_map, cache=None):
     """
     Traces an employee's coaching chain upwards to find the root cause of why they are orphaned.
+    Pass the same `cache` dict for every orphan to resolve each chain only once: every employee
+    on a walked chain is stored as {employee_id: (reason, root_cause_id)}, and later walks stop
+    as soon as they reach an employee that already has a verdict.
     """
+    if cache is None:
+        cache = {}
+    path = []
     visited_ids = set()
     current_id = employee_id
+    verdict = ("Unknown reason for being orphaned.", None) # Fallback
     
     while current_id:
+        if current_id in cache:
+            # The rest of this chain was already resolved by an earlier walk.
+            verdict = cache[current_id]
+            break
+
         if current_id in visited_ids:
-            # Cycle detected
-            return f"Coaching chain is broken due to a cycle involving employee ID {current_id}."
+            # Cycle detected. Members of the cycle are reported against themselves,
+            # everyone below the cycle against the employee where they enter it.
+            cycle_start = path.index(current_id)
+            for member_id in path[cycle_start:]:
+                cache[member_id] = (f"Coaching chain is broken due to a cycle involving employee ID {member_id}.", member_id)
+            path = path[:cycle_start]
+            verdict = cache[current_id]
+            break
         visited_ids.add(current_id)
+        path.append(current_id)
 
         current_node = all_nodes.get(current_id)
         if not current_node:
             # This case should ideally not be hit if we start from a valid employee
-            return f"Analysis error: Could not find employee ID {current_id} in the dataset."
+            verdict = (f"Analysis error: Could not find employee ID {current_id} in the dataset.", current_id)
+            break
 
         coach_id = current_node.get('coach_id')
 
@@ -390,10 +1187,11 @@ def find_broken_chain_root_cause(employee_id, all_nodes, all_ids_set, retired_pa
             # Check if this top-level person is a Partner.
             if current_node.get('level') != PARTNER_LEVEL_VALUE:
                 top_level_name = current_node.get('name', 'Unknown')
-                return f"Coaching chain terminates at '{top_level_name}' (ID: {current_id}), who is not a Partner."
+                verdict = (f"Coaching chain terminates at '{top_level_name}' (ID: {current_id}), who is not a Partner.", current_id)
             else:
                 # This should not happen for an orphan, as they would have been stamped.
-                return "This employee appears to be in a valid tree, but was marked as an orphan."
+                verdict = ("This employee appears to be in a valid tree, but was marked as an orphan.", current_id)
+            break
         
         # Now, check if the coach_id is valid
         if coach_id not in all_ids_set:
@@ -402,118 +1200,837 @@ def find_broken_chain_root_cause(employee_id, all_nodes, all_ids_set, retired_pa
             # Check if the invalid coach is a known retired partner
             if coach_id in retired_partners_map:
                 retired_coach_name = retired_partners_map[coach_id].get('name', 'Unknown')
-                return f"Coaching chain breaks at '{current_name}' (ID: {current_id}), because the listed coach '{retired_coach_name}' (ID: {coach_id}) is a Retired Partner."
+                verdict = (f"Coaching chain breaks at '{current_name}' (ID: {current_id}), because the listed coach '{retired_coach_name}' (ID: {coach_id}) is a Retired Partner.", current_id)
+                break
 
             # Otherwise, it's a truly invalid ID
             coach_name = current_node.get('coach_name', '[Name Not Found In File]')
-            return f"Coaching chain breaks at '{current_name}' (ID: {current_id}), whose listed coach '{coach_name}' (ID: {coach_id}) is invalid."
+            verdict = (f"Coaching chain breaks at '{current_name}' (ID: {current_id}), whose listed coach '{coach_name}' (ID: {coach_id}) is invalid.", current_id)
+            break
 
         # Move up the chain
         current_id = coach_id
-        
-    return "Unknown reason for being orphaned." # Fallback
+
+    # Everyone walked on the way up shares the verdict of the break point.
+    for walked_id in path:
+        cache[walked_id] = verdict
+    return cache.get(employee_id, verdict)[0]
+
+def group_orphans_by_root_cause(orphaned_employees, all_nodes):
+    """
+    Groups orphan report records by the employee whose record breaks their coaching chain,
+    so one fix can be seen to resolve many orphans. Largest groups come first.
+    """
+    groups = {}
+    for orphan in orphaned_employees:
+        root_cause_id = orphan.get('root_cause_employee_id')
+        group = groups.get(root_cause_id)
+        if group is None:
+            root_cause_node = all_nodes.get(root_cause_id) or {}
+            group = groups[root_cause_id] = {
+                'root_cause_employee_id': root_cause_id,
+                'root_cause_name': root_cause_node.get('name'),
+                'reason': orphan.get('reason_for_listing'),
+                'orphan_count': 0,
+                'orphan_ids': []
+            }
+        group['orphan_count'] += 1
+        group['orphan_ids'].append(orphan.get('id'))
+    return sorted(groups.values(), key=lambda g: -g['orphan_count'])
+
+def flag_cross_offering_pods(forest, partner_offerings=None):
+    """
+    Sets pod_relationship_status to 'warning_different_offering' on nodes whose valid
+    Pod Partner belongs to a different Operating Unit.
+    `partner_offerings` ({Partner ID: Operating Unit}) is used when the Pod Partners may lie
+    outside this forest, as in the per-OU parallel build.
+    """
+    frame = forest['frame']
+    if 'partner_relationship_id' not in frame.columns or 'Operating Unit Name' not in frame.columns:
+        return
+    offering = frame['Operating Unit Name'].to_numpy(dtype=object)
+    has_offering = (frame['Operating Unit Name'].notna() & (frame['Operating Unit Name'] != '')).to_numpy()
+    if partner_offerings is None:
+        pod_rows = pd.Index(forest['ids']).get_indexer(frame['partner_relationship_id'])
+        pod_offering = offering[pod_rows]
+        pod_has_offering = (pod_rows >= 0) & has_offering[pod_rows]
+    else:
+        pod_offering_series = frame['partner_relationship_id'].map(partner_offerings)
+        pod_offering = pod_offering_series.to_numpy(dtype=object)
+        pod_has_offering = (pod_offering_series.notna() & (pod_offering_series != '')).to_numpy()
+    is_flagged = (
+        (frame['pod_relationship_status'] == 'valid').to_numpy()
+        & has_offering & pod_has_offering
+        & (pod_offering != offering)
+    )
+    node_list = list(forest['nodes'].values())
+    for row in np.flatnonzero(is_flagged).tolist():
+        node_list[row]['pod_relationship_status'] = 'warning_different_offering'
+
+# Pod aggregates: the Partner Pods view's rosters and counts, precomputed over the same records
+# the page loads, so it renders from lookups and only updates them on a pod move.
+POD_AGGREGATES_VERSION = 1
+POD_ROSTER_STATUSES = ('valid', 'warning_different_offering') # Statuses that place an employee in their pod
+POD_STATUSES = ('valid', 'warning_different_offering', 'error_invalid_id')
+
+def iter_output_records(output_data):
+    """
+    Yields every employee record of a forest.json structure (or shard) once, in the page's order:
+    Partner trees in pre-order, then orphans, then a shard's additional employees.
+    """
+    seen = set()
+    for tree in output_data.get("all_partner_trees", []):
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if node['id'] not in seen:
+                seen.add(node['id'])
+                yield node
+            stack.extend(reversed(node.get('children', [])))
+    for key in ("all_orphaned_employees", "additional_employees"):
+        for record in output_data.get(key, []):
+            if record['id'] not in seen:
+                seen.add(record['id'])
+                yield record
+
+def build_pod_aggregates(output_data):
+    """
+    Returns the 'pod_aggregates' section of a forest.json structure:
+      pods:            {Partner ID: {'operating_unit', 'size', 'members': [IDs], 'status_counts'}}
+                       for every Partner tree; members are employees whose status places them in the pod.
+      operating_units: {OU: {'status_counts', 'pod_errors': [IDs of members not 'valid'],
+                       'pod_size_distribution': {size: number of the OU's pods of that size}}}
+    """
+    pods = {
+        tree['id']: {'operating_unit': tree.get('Operating Unit Name'), 'size': 0, 'members': [],
+                     'status_counts': dict.fromkeys(POD_ROSTER_STATUSES, 0)}
+        for tree in output_data.get("all_partner_trees", [])
+    }
+    operating_units = {}
+    for record in iter_output_records(output_data):
+        status = record.get('pod_relationship_status')
+        pod = pods.get(record.get('partner_relationship_id'))
+        if pod is not None and status in POD_ROSTER_STATUSES:
+            pod['members'].append(record['id'])
+            pod['status_counts'][status] += 1
+        operating_unit = record.get('Operating Unit Name')
+        if not operating_unit:
+            continue
+        unit = operating_units.get(operating_unit)
+        if unit is None:
+            unit = operating_units[operating_unit] = {'status_counts': dict.fromkeys(POD_STATUSES, 0), 'pod_errors': [],
+                                                      'pod_size_distribution': {}}
+        if status in unit['status_counts']:
+            unit['status_counts'][status] += 1
+        if status != 'valid':
+            unit['pod_errors'].append(record['id'])
+
+    for pod in pods.values():
+        pod['size'] = len(pod['members'])
+        if pod['operating_unit'] in operating_units:
+            distribution = operating_units[pod['operating_unit']]['pod_size_distribution']
+            distribution[pod['size']] = distribution.get(pod['size'], 0) + 1
+    for unit in operating_units.values():
+        unit['pod_size_distribution'] = {str(size): count for size, count in sorted(unit['pod_size_distribution'].items())}
+    return {'format_version': POD_AGGREGATES_VERSION, 'pods': pods, 'operating_units': operating_units}
+
+# Search index: row ids are positions in iter_output_records order (the page's employee order).
+# Posting lists are ascending row ids, so combined filters are sorted-list intersections.
+SEARCH_INDEX_VERSION = 1
+SEARCH_INDEX_FIELDS = {
+    'operating_unit': 'Operating Unit Name',
+    'location': 'Location  Name',
+    'talent_group': 'talent_group',
+    'level': 'level',
+    'pod_status': 'pod_relationship_status'
+}
+
+SEARCH_ACCENTS_PATTERN = re.compile('[\u0300-\u036f]')
+SEARCH_SEPARATOR_PATTERN = re.compile(r'[^a-z0-9]+')
+
+def search_tokens(text):
+    """Search keys of a name or ID: its distinct lowercase letter and digit runs, accents stripped (as js/data.js does)."""
+    text = str(text)
+    if text.isascii() and text.isalnum():
+        return [text.lower()]
+    if not text.isascii():
+        text = SEARCH_ACCENTS_PATTERN.sub('', unicodedata.normalize('NFKD', text))
+    return list(dict.fromkeys(token for token in SEARCH_SEPARATOR_PATTERN.split(text.lower()) if token))
+
+def build_search_index(output_data):
+    """
+    Returns the 'search_index' section of a forest.json structure (or shard):
+      ids:       employee ID of each row
+      postings:  {field: {value: [rows]}} for every SEARCH_INDEX_FIELDS field
+      name_keys: sorted name search tokens, with name_rows[i] the rows whose name holds name_keys[i]
+      id_keys:   sorted normalized IDs, with id_rows[i] the row of id_keys[i]
+    Both key lists are sorted, so the keys starting with a prefix form one contiguous range.
+    """
+    records = list(iter_output_records(output_data))
+    ids = [record['id'] for record in records]
+    postings = {}
+    for field, source in SEARCH_INDEX_FIELDS.items():
+        codes, values = pd.factorize(pd.Series([record.get(source) for record in records], dtype=object))
+        postings[field] = {str(value): np.flatnonzero(codes == code).tolist()
+                           for code, value in enumerate(values) if value != ''}
+
+    name_tokens = {} # Names repeat, so each distinct name is tokenized once
+    token_rows = defaultdict(list)
+    for row, name in enumerate(record.get('name') or '' for record in records):
+        tokens = name_tokens.get(name)
+        if tokens is None:
+            tokens = name_tokens[name] = search_tokens(name)
+        for token in tokens:
+            token_rows[token].append(row)
+    name_keys = sorted(token_rows)
+    id_keys = [''.join(search_tokens(employee_id)) for employee_id in ids]
+    id_rows = sorted(range(len(ids)), key=id_keys.__getitem__)
+    return {
+        'format_version': SEARCH_INDEX_VERSION,
+        'record_count': len(ids),
+        'ids': ids,
+        'postings': postings,
+        'name_keys': name_keys,
+        'name_rows': [token_rows[key] for key in name_keys],
+        'id_keys': [id_keys[row] for row in id_rows],
+        'id_rows': id_rows
+    }
+
+def build_forest_output(validated_df, retired_partners_map, partner_offerings=None, aggregates=True):
+    """
+    Builds the full forest.json structure from the validated frame.
+    Returns (output_data, forest) where forest is the assemble_forest result.
+    Partitions of a parallel build skip the pod aggregates and search index, which are built after the merge.
+    """
+    with pipeline_stage('assemble_forest') as stage_metrics:
+        forest = assemble_forest(validated_df)
+        stage_metrics['rows'] = len(forest['ids'])
+    all_employee_nodes = forest['nodes']
+    all_employee_ids = set(all_employee_nodes.keys()) # All valid IDs
+    ids = forest['ids']
+
+    with pipeline_stage('orphan_analysis') as stage_metrics:
+        # Identify true orphans: non-partners who aren't in any Partner's tree.
+        all_orphaned_employees = []
+        root_cause_cache = {} # Shared across orphans so each broken chain is walked once
+        for row in forest['orphan_rows'].tolist():
+            emp_id = ids[row]
+            report_node_copy = all_employee_nodes[emp_id].copy()
+            del report_node_copy['children']
+
+            reason = find_broken_chain_root_cause(emp_id, all_employee_nodes, all_employee_ids, retired_partners_map, root_cause_cache)
+
+            report_node_copy['reason_for_listing'] = reason
+            report_node_copy['root_cause_employee_id'] = root_cause_cache[emp_id][1]
+            all_orphaned_employees.append(report_node_copy)
+
+        orphan_root_causes = group_orphans_by_root_cause(all_orphaned_employees, all_employee_nodes)
+        stage_metrics['rows'] = len(all_orphaned_employees)
+
+    # Set pod relationship status for different offerings (orphan report copies keep the validated status)
+    with pipeline_stage('flag_cross_offering_pods') as stage_metrics:
+        flag_cross_offering_pods(forest, partner_offerings)
+        stage_metrics['rows'] = len(forest['ids'])
+
+    output_data = {
+        "all_partner_trees": forest['partner_trees'],
+        "all_orphaned_employees": all_orphaned_employees,
+        "orphan_root_causes": orphan_root_causes
+    }
+    if aggregates:
+        with pipeline_stage('pod_aggregates') as stage_metrics:
+            output_data["pod_aggregates"] = build_pod_aggregates(output_data)
+            stage_metrics['rows'] = len(forest['ids'])
+        with pipeline_stage('search_index') as stage_metrics:
+            output_data["search_index"] = build_search_index(output_data)
+            stage_metrics['rows'] = len(forest['ids'])
+    return output_data, forest
+
+# Parallel build: every coaching tree (and every orphaned chain) lies within one partition,
+# keyed by the Operating Unit of the employee at its top, so partitions build independently.
+BUILD_WORKERS = 1
+
+def tree_top_offerings(validated_df):
+    """
+    Returns the Operating Unit of the top of each row's coaching chain ('' when missing): the
+    Partner for rows in a Partner tree, else the highest reachable employee of an orphaned chain.
+    Employee IDs must be unique (see deduplicate_employee_ids).
+    """
+    ids = validated_df['employee_id'].astype(str)
+    n = len(ids)
+    if 'coach_id' in validated_df.columns:
+        parent = pd.Index(ids).get_indexer(validated_df['coach_id']).astype(np.int64)
+    else:
+        parent = np.full(n, -1, dtype=np.int64)
+    parent[(validated_df['level'] == PARTNER_LEVEL_VALUE).to_numpy()] = -1
+    # Pointer jumping: each pass doubles the distance covered (validated data has no cycles)
+    top = np.where(parent >= 0, parent, np.arange(n))
+    while True:
+        next_top = top[top]
+        if np.array_equal(next_top, top):
+            break
+        top = next_top
+    if 'Operating Unit Name' not in validated_df.columns:
+        return np.full(n, '', dtype=object)
+    offerings = validated_df['Operating Unit Name'].astype(object).fillna('').astype(str).to_numpy(dtype=object)
+    return offerings[top]
+
+def build_partition_output(partition_df, retired_partners_map, partner_offerings):
+    """Worker entry point: builds the forest.json structure of one partition."""
+    global ACTIVE_PROFILE
+    # Stage metrics are recorded by the parent process only (forked workers inherit its state)
+    ACTIVE_PROFILE = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    output_data, _ = build_forest_output(partition_df, retired_partners_map, partner_offerings, aggregates=False)
+    return output_data
+
+def partition_by_tree_top(validated_df):
+    """
+    Splits the validated frame into (Operating Unit, frame) partitions keyed by tree_top_offerings,
+    sorted by OU. Duplicate employee IDs are resolved first, as assemble_forest resolves them.
+    """
+    frame = deduplicate_employee_ids(validated_df)
+    partition_keys = tree_top_offerings(frame)
+    return [(key, frame[partition_keys == key]) for key in sorted(set(partition_keys.tolist()))]
+
+def firm_partner_offerings(validated_df):
+    """{Partner ID: Operating Unit} over the whole firm, for pod checks within one partition."""
+    if 'Operating Unit Name' not in validated_df.columns:
+        return {}
+    partners = validated_df[validated_df['level'] == PARTNER_LEVEL_VALUE]
+    return dict(zip(partners['employee_id'].astype(str), partners['Operating Unit Name']))
+
+def merge_partition_outputs(validated_df, results):
+    """
+    Merges per-partition forest.json structures back into input order, as a serial build orders
+    them, and builds the pod aggregates and search index over the merged forest.
+    """
+    # Each ID's first-seen position, as in the serial build's de-duplicated frame
+    employee_ids = validated_df['employee_id'].astype(str).drop_duplicates(keep='first')
+    positions = {employee_id: position for position, employee_id in enumerate(employee_ids)}
+
+    def by_position(records):
+        return sorted(records, key=lambda record: positions[record['id']])
+
+    # Serial order: groups by size, ties in order of their first orphan
+    orphan_root_causes = sorted(
+        (group for result in results for group in result["orphan_root_causes"]),
+        key=lambda group: (-group['orphan_count'], positions[group['orphan_ids'][0]])
+    )
+    output_data = {
+        "all_partner_trees": by_position(tree for result in results for tree in result["all_partner_trees"]),
+        "all_orphaned_employees": by_position(orphan for result in results for orphan in result["all_orphaned_employees"]),
+        "orphan_root_causes": orphan_root_causes
+    }
+    record_count = len(positions)
+    with pipeline_stage('pod_aggregates') as stage_metrics:
+        output_data["pod_aggregates"] = build_pod_aggregates(output_data) # Pods span partitions (cross-OU members)
+        stage_metrics['rows'] = record_count
+    with pipeline_stage('search_index') as stage_metrics:
+        output_data["search_index"] = build_search_index(output_data)
+        stage_metrics['rows'] = record_count
+    return output_data
+
+def build_forest_output_parallel(validated_df, retired_partners_map, workers=None):
+    """
+    Builds the same forest.json structure as build_forest_output, one Operating Unit per
+    worker process. Validation (the global ID, coach and pod checks) has already run on the
+    whole frame; pod offerings are checked against a Partner -> Operating Unit map of the whole firm.
+    Partitions are merged back in input order, so the output is identical to a serial build.
+    """
+    partitions = [partition_df for _, partition_df in partition_by_tree_top(validated_df)]
+    partner_offerings = firm_partner_offerings(validated_df)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(build_partition_output, partitions, repeat(retired_partners_map), repeat(partner_offerings)))
+    return merge_partition_outputs(validated_df, results)
+
+# --- 5. JSON Export ---
+# The forest is written minified by default (JSON_INDENT = 2 gives the old pretty-printed layout).
+# 'auto' serializes with orjson when it is installed (pip install orjson), else the json module.
+JSON_INDENT = None
+JSON_SERIALIZERS = ('auto', 'orjson', 'json')
+JSON_SERIALIZER = 'auto'
+JSON_GZIP_LEVEL = 6 # gzip's own default; level 9 is markedly slower for little gain on JSON
+
+def json_encoder(serializer=JSON_SERIALIZER, indent=JSON_INDENT):
+    """
+    Returns a function that encodes one value (ForestNodes included) to UTF-8 JSON bytes.
+    orjson can only pretty-print with an indent of 2; other indents use the json module. Values orjson
+    rejects (e.g. coaching chains nested past its 255-level limit) are encoded with the json module.
+    """
+    separators = None if indent else (',', ':')
+    def encode(value):
+        if isinstance(value, ForestNode):
+            # Converted up front: through `default`, every chunk of the tree would pass one more generator
+            value = forest_json_default(value)
+        return json.dumps(value, indent=indent, separators=separators, default=forest_json_default).encode('utf-8')
+
+    if serializer in ('auto', 'orjson') and indent in (None, 2):
+        try:
+            import orjson
+        except ImportError:
+            if serializer == 'orjson':
+                print("orjson is not installed; falling back to the json module.")
+        else:
+            option = orjson.OPT_INDENT_2 if indent else 0
+            def encode_orjson(value):
+                try:
+                    return orjson.dumps(value, default=forest_json_default, option=option)
+                except orjson.JSONEncodeError:
+                    return encode(value)
+            return encode_orjson
+    return encode
+
+@contextmanager
+def atomic_output(output_path, compress=False):
+    """
+    Yields a binary file (gzip-compressed when asked) that replaces `output_path` only once it has
+    been written completely, so a reader never sees a half-written file. On error the old file stays.
+    """
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as raw:
+            if compress:
+                with gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=JSON_GZIP_LEVEL, mtime=0) as f:
+                    yield f
+            else:
+                yield raw
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def write_json_stream(data, f, encode, indent=JSON_INDENT):
+    """
+    Writes a dict as JSON to the binary file `f`, one top-level list item (a Partner tree, an
+    orphan, a root-cause group) at a time. With an indent, the layout matches json.dump(indent=...).
+    """
+    if not indent:
+        f.write(b'{')
+        for position, (key, value) in enumerate(data.items()):
+            f.write(b',' if position else b'')
+            f.write(json.dumps(key).encode('utf-8') + b':')
+            if isinstance(value, list):
+                f.write(b'[')
+                for item_position, item in enumerate(value):
+                    if item_position:
+                        f.write(b',')
+                    f.write(encode(item))
+                f.write(b']')
+            else:
+                f.write(encode(value))
+        f.write(b'}')
+        return
+    # Nested values are encoded at indent level 0, then shifted right to their depth
+    step = b' ' * indent
+    def shifted(value, depth):
+        return encode(value).replace(b'\n', b'\n' + step * depth)
+    f.write(b'{')
+    for position, (key, value) in enumerate(data.items()):
+        f.write(b',' if position else b'')
+        f.write(b'\n' + step + json.dumps(key).encode('utf-8') + b': ')
+        if isinstance(value, list) and value:
+            f.write(b'[')
+            for item_position, item in enumerate(value):
+                f.write((b',' if item_position else b'') + b'\n' + step * 2 + shifted(item, 2))
+            f.write(b'\n' + step + b']')
+        else:
+            f.write(shifted(value, 1))
+    f.write(b'\n}' if data else b'}')
+
+def export_to_json(data_to_export, output_path, indent=JSON_INDENT, compress=None, serializer=JSON_SERIALIZER):
+    """
+    Exports the structured data to a JSON file: streamed tree by tree, minified unless an
+    indent is given, gzip-compressed when `compress` is set (default: when the path ends in .gz),
+    and written atomically. Returns True on success, False otherwise.
+    """
+    if compress is None:
+        compress = output_path.endswith('.gz')
+    try:
+        with atomic_output(output_path, compress) as f:
+            write_json_stream(data_to_export, f, json_encoder(serializer, indent), indent)
+        print(f"Successfully exported data to '{output_path}'")
+        return True
+    except Exception as e:
+        print(f"Error exporting to JSON: {e}")
+        return False
+
+# Flat, ID-indexed node table written alongside the nested forest. Row r's fields are
+# data[field][r]; its children are child_index[child_offsets[r]:child_offsets[r + 1]].
+NODE_TABLE_PATH = 'forest_table.json'
+NODE_TABLE_FORMAT = 'forest-node-table'
+NODE_TABLE_VERSION = 1
+
+def forest_to_node_table(output_data):
+    """
+    Flattens the nested forest.json structure into a columnar node table.
+    Rows are the Partner trees in pre-order (so every subtree is a contiguous row range)
+    followed by the orphan records. Fields a node does not have are stored as null.
+    """
+    records = []
+    parent = []
+    roots = []
+    for tree in output_data["all_partner_trees"]:
+        roots.append(len(records))
+        stack = [(tree, -1)]
+        while stack:
+            node, parent_row = stack.pop()
+            parent.append(parent_row)
+            row = len(records)
+            records.append(node)
+            stack.extend((child, row) for child in reversed(node.get('children', [])))
+    orphans = []
+    for orphan in output_data["all_orphaned_employees"]:
+        orphans.append(len(records))
+        parent.append(-1)
+        records.append(orphan)
+
+    columns = []
+    seen_columns = set()
+    for record in records:
+        for key in record:
+            if key != 'children' and key not in seen_columns:
+                seen_columns.add(key)
+                columns.append(key)
+
+    parent_array = np.asarray(parent, dtype=np.int64)
+    has_parent = parent_array >= 0
+    child_counts = np.bincount(parent_array[has_parent], minlength=len(records))
+    child_offsets = np.concatenate(([0], np.cumsum(child_counts)))
+    # Pre-order rows are already in sibling order, so a stable sort by parent keeps it
+    child_index = np.flatnonzero(has_parent)[np.argsort(parent_array[has_parent], kind='stable')]
+
+    return {
+        "format": NODE_TABLE_FORMAT,
+        "version": NODE_TABLE_VERSION,
+        "row_count": len(records),
+        "columns": columns,
+        "data": {col: [record.get(col) for record in records] for col in columns},
+        "parent": parent,
+        "child_offsets": child_offsets.tolist(),
+        "child_index": child_index.tolist(),
+        "roots": roots,
+        "orphans": orphans,
+        "id_index": {record['id']: row for row, record in enumerate(records)}
+    }
+
+def node_table_to_forest(table, root_rows=None):
+    """
+    Rebuilds the nested forest.json structure from a node table.
+    Pass `root_rows` to expand only some trees (e.g. the one being drawn); orphans are
+    only included when every tree is expanded.
+    """
+    if table.get("format") != NODE_TABLE_FORMAT or table.get("version") != NODE_TABLE_VERSION:
+        raise ValueError(f"Unsupported node table: {table.get('format')} v{table.get('version')}.")
+    columns = table["columns"]
+    data = table["data"]
+    child_offsets = table["child_offsets"]
+    child_index = table["child_index"]
+
+    def record(row):
+        return {col: data[col][row] for col in columns if data[col][row] is not None}
+
+    def expand(root_row):
+        root = record(root_row)
+        stack = [(root_row, root)]
+        while stack:
+            row, node = stack.pop()
+            node['children'] = []
+            for child_row in child_index[child_offsets[row]:child_offsets[row + 1]]:
+                child = record(child_row)
+                node['children'].append(child)
+                stack.append((child_row, child))
+        return root
+
+    output_data = {"all_partner_trees": [expand(row) for row in (table["roots"] if root_rows is None else root_rows)]}
+    if root_rows is None:
+        output_data["all_orphaned_employees"] = [record(row) for row in table["orphans"]]
+    return output_data
+
+def export_node_table(output_data, output_path=NODE_TABLE_PATH, serializer=JSON_SERIALIZER):
+    """Writes the node table for the forest as minified JSON, atomically. Returns True on success."""
+    try:
+        with atomic_output(output_path) as f:
+            f.write(json_encoder(serializer)(forest_to_node_table(output_data)))
+        print(f"Successfully exported node table to '{output_path}'")
+        return True
+    except Exception as e:
+        print(f"Error exporting node table: {e}")
+        return False
+
+# Per-Operating-Unit export: one minified shard per OU plus a manifest with content hashes.
+# Shard file names embed their hash, so the browser can cache them indefinitely.
+FOREST_SHARD_DIR = 'forest_shards'
+SHARD_MANIFEST_NAME = 'manifest.json'
+SHARD_FORMAT_VERSION = 1
+SHARD_FILE_PATTERN = re.compile(r'[a-z0-9-]+\.[0-9a-f]{12}\.json(\.gz)?') # <ou-stem>.<12 hex>.json[.gz]
+
+def shard_file_stem(operating_unit):
+    """Turns an Operating Unit name into a safe file name stem."""
+    stem = re.sub(r'[^A-Za-z0-9]+', '-', operating_unit).strip('-').lower()
+    return stem or 'unnamed'
+
+def split_forest_by_operating_unit(output_data):
+    """
+    Splits the forest.json structure into one structure per Operating Unit.
+    Each holds the OU's Partner trees and orphans, plus 'additional_employees': flat records of
+    employees the OU's views need but whose tree belongs to another OU (members of the OU who
+    sit in another OU's tree, and pod members of the OU's Partners from other OUs), and the pod
+    aggregates and search index over those records.
+    Records without an Operating Unit are never shown by the UI and are left out.
+    """
+    shards = {}
+    def shard_for(operating_unit):
+        if operating_unit not in shards:
+            shards[operating_unit] = {"all_partner_trees": [], "all_orphaned_employees": [], "additional_employees": []}
+        return shards[operating_unit]
+
+    tree_ou_of = {} # employee id -> OU of the shard that already holds them
+    flat_records = []
+    for tree in output_data["all_partner_trees"]:
+        tree_ou = tree.get('Operating Unit Name')
+        if tree_ou:
+            shard_for(tree_ou)["all_partner_trees"].append(tree)
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            tree_ou_of[node['id']] = tree_ou
+            flat_records.append(node)
+            stack.extend(node.get('children', []))
+    for orphan in output_data["all_orphaned_employees"]:
+        if orphan.get('Operating Unit Name'):
+            shard_for(orphan['Operating Unit Name'])["all_orphaned_employees"].append(orphan)
+        tree_ou_of[orphan['id']] = orphan.get('Operating Unit Name')
+        flat_records.append(orphan)
+
+    partner_ou_of = {tree['id']: tree.get('Operating Unit Name') for tree in output_data["all_partner_trees"]}
+    for record in flat_records:
+        home_ou = tree_ou_of.get(record['id'])
+        needed_by = {record.get('Operating Unit Name'), partner_ou_of.get(record.get('partner_relationship_id'))}
+        for operating_unit in needed_by:
+            if operating_unit and operating_unit != home_ou:
+                flat_copy = {key: value for key, value in record.items() if key != 'children'}
+                shard_for(operating_unit)["additional_employees"].append(flat_copy)
+
+    root_cause_names = {group['root_cause_employee_id']: {'name': group['root_cause_name']}
+                        for group in output_data.get("orphan_root_causes", [])}
+    for shard in shards.values():
+        shard["orphan_root_causes"] = group_orphans_by_root_cause(shard["all_orphaned_employees"], root_cause_names)
+        shard["pod_aggregates"] = build_pod_aggregates(shard)
+        shard["search_index"] = build_search_index(shard)
+    return shards
+
+def export_forest_shards(output_data, shard_dir=FOREST_SHARD_DIR, compress=False):
+    """
+    Writes one minified (optionally gzip-compressed) JSON shard per Operating Unit and a
+    manifest listing each shard's file, SHA-256 and size. Shards and the manifest are written
+    atomically, the manifest last; shard files (named `<ou-stem>.<12 hex>.json[.gz]`) no longer
+    referenced by it are removed. Returns True on success, False otherwise.
+    """
+    try:
+        os.makedirs(shard_dir, exist_ok=True)
+        manifest_units = []
+        written_files = set()
+        for operating_unit, shard in sorted(split_forest_by_operating_unit(output_data).items()):
+            payload = json.dumps(shard, separators=(',', ':'), default=forest_json_default).encode('utf-8')
+            digest = hashlib.sha256(payload).hexdigest()
+            file_name = f"{shard_file_stem(operating_unit)}.{digest[:12]}.json"
+            if compress:
+                payload = gzip.compress(payload, mtime=0)
+                file_name += '.gz'
+            shard_path = os.path.join(shard_dir, file_name)
+            # Content-addressed: an existing file is kept only if it really holds this payload
+            # (a crashed writer from before atomic writes could have left it truncated)
+            if not (os.path.exists(shard_path) and os.path.getsize(shard_path) == len(payload)
+                    and file_sha256(shard_path) == hashlib.sha256(payload).hexdigest()):
+                with atomic_output(shard_path) as f:
+                    f.write(payload)
+            written_files.add(file_name)
+
+            employee_count = len(shard["all_orphaned_employees"]) + len(shard["additional_employees"])
+            stack = list(shard["all_partner_trees"])
+            while stack:
+                node = stack.pop()
+                employee_count += 1
+                stack.extend(node.get('children', []))
+            manifest_units.append({
+                "name": operating_unit,
+                "file": file_name,
+                "sha256": digest,
+                "bytes": len(payload),
+                "compressed": compress,
+                "partner_count": len(shard["all_partner_trees"]),
+                "employee_count": employee_count
+            })
+
+        manifest = {
+            "format_version": SHARD_FORMAT_VERSION,
+            # The page only uses the shards while this matches the 'generated_at' of forest.json
+            "generated_at": output_data.get("generated_at") or datetime.now(timezone.utc).isoformat(),
+            "operating_units": manifest_units
+        }
+        manifest_path = os.path.join(shard_dir, SHARD_MANIFEST_NAME)
+        with atomic_output(manifest_path) as f:
+            f.write(json.dumps(manifest, indent=2).encode('utf-8'))
+
+        # Only stale shards are removed; other files sharing the directory (e.g. --shards .) are left alone
+        for name in os.listdir(shard_dir):
+            if name not in written_files and SHARD_FILE_PATTERN.fullmatch(name):
+                os.remove(os.path.join(shard_dir, name))
+        print(f"Successfully exported {len(manifest_units)} Operating Unit shards to '{shard_dir}'")
+        return True
+    except Exception as e:
+        print(f"Error exporting forest shards: {e}")
+        return False
+
+def remove_shard_manifest(shard_dir=FOREST_SHARD_DIR):
+    """
+    Removes the shard manifest left in `shard_dir` by an earlier --shards build, so the page
+    loads the new forest.json instead of the old shards. Returns True if one was removed.
+    """
+    manifest_path = os.path.join(shard_dir, SHARD_MANIFEST_NAME)
+    try:
+        os.remove(manifest_path)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        print(f"Warning: Could not remove the stale shard manifest '{manifest_path}': {e}")
+        return False
+    print(f"Removed the shard manifest '{manifest_path}' of an earlier build.")
+    return True
 
 # --- 6. Main Execution Flow ---
 if __name__ == "__main__":
-    print(f"Starting script: Reading data from '{EXCEL_FILE_PATH}'...")
+    parser = argparse.ArgumentParser(description="Validate employee data and build the coaching forest JSON.")
+    parser.add_argument('--input', default=EXCEL_FILE_PATH, help="Employee input file (.xlsx, .csv or .parquet).")
+    parser.add_argument('--reader', default=INPUT_READER, choices=INPUT_READERS, help="Input reader backend.")
+    parser.add_argument('--output', default=JSON_OUTPUT_PATH, help="Path of the forest JSON to write (gzip-compressed if it ends in .gz).")
+    parser.add_argument('--indent', type=int, default=JSON_INDENT, help="Pretty-print the forest JSON with this indent (default: minified).")
+    parser.add_argument('--gzip', action='store_true', help="Gzip-compress the forest JSON (adds .gz to --output).")
+    parser.add_argument('--json-serializer', default=JSON_SERIALIZER, choices=JSON_SERIALIZERS,
+                        help="JSON serializer for the forest and node table ('auto' uses orjson when installed).")
+    parser.add_argument('--cache-dir', default=PARSE_CACHE_DIR, help="Directory of the parsed-input cache.")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the input file, bypassing the cache.")
+    parser.add_argument('--shards', nargs='?', const=FOREST_SHARD_DIR, default=None, metavar='DIR',
+                        help=f"Also write one shard per Operating Unit plus a manifest (default directory: {FOREST_SHARD_DIR}).")
+    parser.add_argument('--gzip-shards', action='store_true', help="Gzip-compress the per-OU shards.")
+    parser.add_argument('--workers', type=int, default=BUILD_WORKERS,
+                        help="Build each Operating Unit in its own worker process when above 1.")
+    parser.add_argument('--node-table', nargs='?', const=NODE_TABLE_PATH, default=None, metavar='PATH',
+                        help=f"Also write the flat, ID-indexed node table (default path: {NODE_TABLE_PATH}).")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Record wall time, CPU time, peak memory and rows per stage into {PROFILE_METRICS_NAME} next to the output.")
+    parser.add_argument('--profile-stage', choices=PROFILE_STAGES, default=None,
+                        help="Also run this stage under cProfile and dump its stats next to the output (implies --profile).")
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help="With --profile, record timings only; tracemalloc slows allocation-heavy stages.")
+    parser.add_argument('--memory-baseline', action='store_true',
+                        help="Also build with the previous representation (object columns, one dict per node) in a subprocess "
+                             "and report the peak-RSS reduction against it. Implies --no-cache, so both runs parse the input.")
+    parser.add_argument('--legacy-representation', action='store_true',
+                        help="Build with the previous representation (used by --memory-baseline).")
+    args = parser.parse_args()
+    if args.legacy_representation:
+        COMPACT_REPRESENTATION = False
+    if args.memory_baseline:
+        args.no_cache = True
+    if args.profile_stage in WORKER_STAGES and args.workers > 1:
+        parser.error(f"--profile-stage {args.profile_stage} runs inside the worker processes when --workers > 1 "
+                     "and would never be profiled; use --workers 1 to profile it.")
+
+    if args.gzip and not args.output.endswith('.gz'):
+        args.output += '.gz'
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    if args.profile or args.profile_stage:
+        start_profile(args.profile_stage, os.path.join(output_dir, f"forest_profile_{args.profile_stage}.prof"),
+                      trace_memory=not args.no_trace_memory)
+
+    print(f"Starting script: Reading data from '{args.input}'...")
+    exports_ok = True # Set to False by a failed export, which makes the script exit non-zero
     
-    employee_df_raw = load_employee_data(EXCEL_FILE_PATH)
+    with pipeline_stage('load_input') as stage_metrics:
+        employee_df_raw = load_employee_data_cached(args.input, args.reader, None if args.no_cache else args.cache_dir)
+        stage_metrics['rows'] = len(employee_df_raw) if employee_df_raw is not None else 0
     
     if employee_df_raw is not None:
         print(f"Successfully loaded {len(employee_df_raw)} records.")
 
         # Separate Retired Partners before validation and tree building
-        retired_partners_map = {}
-        if 'level' in employee_df_raw.columns:
-            retired_mask = employee_df_raw['level'] == 'Retired Partner'
-            retired_df = employee_df_raw[retired_mask]
-            # Create a map of retired partners by their ID for later reference
-            for _, row in retired_df.iterrows():
-                retired_id = str(row['employee_id'])
-                retired_partners_map[retired_id] = {'name': row['name']}
-            
-            # Exclude retired partners from the main DataFrame for processing
-            active_employee_df = employee_df_raw[~retired_mask]
-            print(f"Identified and separated {len(retired_df)} Retired Partners.")
-        else:
-            active_employee_df = employee_df_raw
+        with pipeline_stage('split_retired_partners') as stage_metrics:
+            active_employee_df, retired_partners_map = split_retired_partners(employee_df_raw)
+            stage_metrics['rows'] = len(active_employee_df)
+        print(f"Identified and separated {len(employee_df_raw) - len(active_employee_df)} Retired Partners.")
 
         # Validate the active dataset
-        validated_df, validation_summary = validate_data(active_employee_df.copy())
+        with pipeline_stage('validate_data') as stage_metrics:
+            validated_df, validation_summary = validate_data(active_employee_df.copy())
+            stage_metrics['rows'] = len(active_employee_df)
         print_validation_summary(validation_summary)
         
         if not validation_summary.get("critical_errors", False) and validated_df is not None:
             print("Processing all employees to build full hierarchy and identify reports...")
-
-            all_employee_nodes = {}
-            all_partner_trees = []
-            
-            # 1. Populate all_employee_nodes with initial node structures
-            for _, row in validated_df.iterrows():
-                node_id = str(row['employee_id'])
-                node_data = {col: row.get(col) for col in INCLUDED_DATA_COLUMNS if pd.notna(row.get(col))}
-                if 'Location Name' in node_data: # Handle space inconsistency
-                    node_data['Location  Name'] = node_data.pop('Location Name')
-                node_data['id'] = node_id
-                node_data['children'] = []
-                all_employee_nodes[node_id] = node_data
-
-            # 2. Build full organizational trees
-            all_employees_in_trees = set()
-            for emp_id, node_dict in all_employee_nodes.items():
-                if node_dict.get('level') == PARTNER_LEVEL_VALUE:
-                    all_partner_trees.append(node_dict)
-                else:
-                    coach_id = node_dict.get('coach_id')
-                    if coach_id and coach_id in all_employee_nodes:
-                        all_employee_nodes[coach_id]['children'].append(node_dict)
-            
-            # 3. Calculate counts and stamp tree info
-            for partner_node in all_partner_trees:
-                partner_node['indirect_coachee_count'] = count_all_descendants(partner_node)
-                stamp_root_partner_id(partner_node, partner_node['id'])
-
-            for emp_id, node_data_item in all_employee_nodes.items():
-                node_data_item['direct_coachee_count'] = len(node_data_item.get('children', []))
-
-            # 4. Identify true orphans
-            all_orphaned_employees = []
-            all_employee_ids = set(all_employee_nodes.keys()) # All valid IDs
-            for emp_id, node_dict in all_employee_nodes.items():
-                # An orphan is a non-partner who wasn't stamped as belonging to a partner's tree.
-                if 'coaching_tree_partner_id' not in node_dict and node_dict.get('level') != PARTNER_LEVEL_VALUE:
-                    report_node_copy = node_dict.copy()
-                    if 'children' in report_node_copy:
-                        del report_node_copy['children']
-                    
-                    # Use the new function to find the detailed root cause.
-                    reason = find_broken_chain_root_cause(emp_id, all_employee_nodes, all_employee_ids, retired_partners_map)
-                    
-                    report_node_copy['reason_for_listing'] = reason
-                    all_orphaned_employees.append(report_node_copy)
-
-            # 5. Set pod relationship status for different offerings
-            for emp_id, node_dict in all_employee_nodes.items():
-                if node_dict.get('pod_relationship_status') == 'valid':
-                    pod_partner_id = node_dict.get('partner_relationship_id')
-                    if pod_partner_id and pod_partner_id in all_employee_nodes:
-                        pod_partner_offering = all_employee_nodes[pod_partner_id].get('Operating Unit Name')
-                        employee_offering = node_dict.get('Operating Unit Name')
-                        if pod_partner_offering and employee_offering and pod_partner_offering != employee_offering:
-                            node_dict['pod_relationship_status'] = 'warning_different_offering'
-            
-            print(f"Identified {len(all_orphaned_employees)} true orphaned employees.")
-
-            # 6. Prepare Final JSON Output
-            output_data = {
-                "all_partner_trees": all_partner_trees,
-                "all_orphaned_employees": all_orphaned_employees
-            }
+            if args.workers > 1:
+                with pipeline_stage('build_forest_parallel') as stage_metrics:
+                    output_data = build_forest_output_parallel(validated_df, retired_partners_map, args.workers)
+                    stage_metrics['rows'] = len(validated_df)
+            else:
+                output_data, _ = build_forest_output(validated_df, retired_partners_map)
+
+            # Written first in forest.json and into the shard manifest, which ties the two to one build
+            output_data = {"generated_at": datetime.now(timezone.utc).isoformat(), **output_data}
+            orphan_root_causes = output_data["orphan_root_causes"]
+            print(f"Identified {len(output_data['all_orphaned_employees'])} true orphaned employees.")
+            if orphan_root_causes:
+                print(f"Orphans trace back to {len(orphan_root_causes)} broken record(s). Largest groups:")
+                for group in orphan_root_causes[:10]:
+                    print(f"  - {group['orphan_count']} orphan(s): {group['reason']}")
             
-            export_to_json(output_data, JSON_OUTPUT_PATH)
+            with pipeline_stage('export_json') as stage_metrics:
+                exports_ok = export_to_json(output_data, args.output, args.indent, serializer=args.json_serializer)
+                stage_metrics['rows'] = len(validated_df)
+            if args.node_table:
+                with pipeline_stage('export_node_table') as stage_metrics:
+                    exports_ok = export_node_table(output_data, args.node_table, args.json_serializer) and exports_ok
+                    stage_metrics['rows'] = len(validated_df)
+            if args.shards:
+                with pipeline_stage('export_shards') as stage_metrics:
+                    exports_ok = export_forest_shards(output_data, args.shards, compress=args.gzip_shards) and exports_ok
+                    stage_metrics['rows'] = len(validated_df)
+            elif exports_ok:
+                # The page looks for shards next to forest.json
+                remove_shard_manifest(os.path.join(output_dir, FOREST_SHARD_DIR))
         else:
             print("Script aborted due to critical validation errors.")
     else:
         print("Script aborted due to data loading failure.")
 
-    print("Script finished.")
\ No newline at end of file
+    legacy_peak_rss = None
+    if args.memory_baseline and employee_df_raw is not None:
+        print("Building again with the previous representation to measure the memory baseline...")
+        baseline_args = ['--input', args.input, '--reader', args.reader, '--workers', str(args.workers),
+                         '--json-serializer', args.json_serializer]
+        if args.indent:
+            baseline_args += ['--indent', str(args.indent)]
+        if args.gzip:
+            baseline_args.append('--gzip')
+        legacy_peak_rss = legacy_peak_rss_bytes(baseline_args)
+
+    finish_profile(os.path.join(output_dir, PROFILE_METRICS_NAME), {
+        'input': args.input,
+        'input_bytes': os.path.getsize(args.input) if os.path.exists(args.input) else None,
+        'reader': args.reader,
+        'workers': args.workers,
+        'cached_input': not args.no_cache,
+        'compact_representation': COMPACT_REPRESENTATION,
+        'legacy_peak_rss_bytes': legacy_peak_rss
+    })
+    peak_rss = peak_rss_bytes()
+    if peak_rss and legacy_peak_rss:
+        print(f"Peak memory (RSS): {peak_rss / 2**20:.1f} MiB, against {legacy_peak_rss / 2**20:.1f} MiB with the previous "
+              f"representation (object columns, one dict per node): {(1 - peak_rss / legacy_peak_rss) * 100:.0f}% less.")
+    elif peak_rss:
+        print(f"Peak memory (RSS): {peak_rss / 2**20:.1f} MiB (add --memory-baseline to compare with the previous representation)")
+    print("Script finished.")
+    if not exports_ok:
+        sys.exit(1)
@@ -0,0 +1,185 @@
+import argparse
+import gzip
+import json
+from datetime import datetime, timezone
+from itertools import groupby
+
+import numpy as np
+import pandas as pd
+
+from build_forest import (
+    INPUT_READER, INPUT_READERS, PARSE_CACHE_DIR,
+    load_employee_data_cached, split_retired_partners, validate_data, build_forest_output,
+    forest_to_node_table, forest_json_default
+)
+from replay_moves import load_move_log
+
+# --- Configuration ---
+FOREST_PATCH_PATH = 'forest_patch.json'
+FOREST_PATCH_FORMAT = 'forest-patch'
+FOREST_PATCH_VERSION = 1
+
+# Fields the patch does not diff: the tree links, the interval labels (the UI relabels after
+# patching) and the orphan report fields (the patch carries the new orphan report whole)
+DERIVED_FIELDS = ['children', 'interval_root_id', 'interval_start', 'interval_end', 'depth',
+                  'reason_for_listing', 'root_cause_employee_id']
+
+# --- 1. Snapshot Loading ---
+def load_snapshot(path, reader=INPUT_READER, cache_dir=PARSE_CACHE_DIR):
+    """
+    Returns the forest.json structure of a snapshot: read directly from a built forest JSON
+    (gzip-compressed when it ends in .json.gz), or built from an employee input file
+    (.xlsx, .csv or .parquet) the way build_forest.py does.
+    Returns None when the snapshot cannot be loaded or fails validation.
+    """
+    if path.lower().endswith(('.json', '.json.gz')):
+        try:
+            with (gzip.open(path, 'rt') if path.lower().endswith('.gz') else open(path)) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading forest snapshot '{path}': {e}")
+            return None
+    employee_df_raw = load_employee_data_cached(path, reader, cache_dir)
+    if employee_df_raw is None:
+        return None
+    active_employee_df, retired_partners_map = split_retired_partners(employee_df_raw)
+    validated_df, validation_summary = validate_data(active_employee_df.copy())
+    if validation_summary.get("critical_errors", False) or validated_df is None:
+        print(f"Snapshot '{path}' failed validation.")
+        return None
+    output_data, _ = build_forest_output(validated_df, retired_partners_map)
+    return output_data
+
+def snapshot_frame(output_data):
+    """One row per employee (tree nodes and orphans), without the derived fields."""
+    table = forest_to_node_table(output_data)
+    columns = [col for col in table['columns'] if col not in DERIVED_FIELDS]
+    return pd.DataFrame({col: table['data'][col] for col in columns}, dtype=object)
+
+# --- 2. Keyed Diff ---
+def json_value(value):
+    """Plain Python value for JSON output (None for missing)."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+def diff_snapshots(previous, current, coach_moves=(), pod_moves=()):
+    """
+    Computes the patch that turns the `previous` forest.json structure into `current`.
+    The two snapshots are hash-joined on employee ID; hires and leavers come from the
+    one-sided rows, and coach, pod and field changes from a vectorized comparison of the
+    matched rows. Local move logs, when given, are checked for moves the new snapshot already contains.
+    """
+    previous_df = snapshot_frame(previous)
+    current_df = snapshot_frame(current)
+    columns = [col for col in current_df.columns if col != 'id']
+    columns += [col for col in previous_df.columns if col != 'id' and col not in columns]
+    previous_df = previous_df.reindex(columns=['id'] + columns)
+    current_df = current_df.reindex(columns=['id'] + columns)
+
+    joined = previous_df.merge(current_df, on='id', how='outer', suffixes=('_prev', '_cur'), indicator=True, sort=False)
+    hires = joined[joined['_merge'] == 'right_only']
+    leavers = joined[joined['_merge'] == 'left_only']
+    matched = joined[joined['_merge'] == 'both']
+
+    prev_values = matched[[f'{col}_prev' for col in columns]].to_numpy(dtype=object)
+    cur_values = matched[[f'{col}_cur' for col in columns]].to_numpy(dtype=object)
+    prev_missing = pd.isna(prev_values)
+    cur_missing = pd.isna(cur_values)
+    changed = (prev_missing != cur_missing) | (~prev_missing & ~cur_missing & (prev_values != cur_values))
+
+    coach_col = columns.index('coach_id') if 'coach_id' in columns else None
+    pod_col = columns.index('partner_relationship_id') if 'partner_relationship_id' in columns else None
+    matched_ids = matched['id'].tolist()
+    coach_changes, pod_changes, field_changes = [], [], []
+    changed_cells = zip(*(positions.tolist() for positions in np.nonzero(changed)))
+    for row, cells in groupby(changed_cells, key=lambda cell: cell[0]):
+        employee_id = matched_ids[row]
+        set_fields, unset_fields = {}, []
+        for _, col in cells:
+            old, new = json_value(prev_values[row, col]), json_value(cur_values[row, col])
+            if col == coach_col:
+                coach_changes.append({'id': employee_id, 'old_coach_id': old, 'new_coach_id': new})
+            elif col == pod_col:
+                pod_changes.append({'id': employee_id, 'old_partner_id': old, 'new_partner_id': new})
+            elif new is None:
+                unset_fields.append(columns[col])
+            else:
+                set_fields[columns[col]] = new
+        if set_fields or unset_fields:
+            field_changes.append({'id': employee_id, 'set': set_fields, 'unset': unset_fields})
+
+    hire_records = [
+        {col: json_value(value) for col, value in zip(['id'] + columns, record) if json_value(value) is not None}
+        for record in hires[['id'] + [f'{col}_cur' for col in columns]].itertuples(index=False, name=None)
+    ]
+
+    patch = {
+        'format': FOREST_PATCH_FORMAT,
+        'version': FOREST_PATCH_VERSION,
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'base': {'employee_count': len(previous_df)},
+        'hires': hire_records,
+        'leavers': leavers['id'].tolist(),
+        'coach_changes': coach_changes,
+        'pod_changes': pod_changes,
+        'field_changes': field_changes,
+        'partner_root_ids': [tree['id'] for tree in current['all_partner_trees']],
+        'all_orphaned_employees': current['all_orphaned_employees'],
+        'orphan_root_causes': current.get('orphan_root_causes', [])
+    }
+    if coach_moves or pod_moves:
+        patch['already_applied_moves'] = {
+            'coach': already_applied(coach_moves, 'new_coach_id', coach_changes, 'new_coach_id'),
+            'pod': already_applied(pod_moves, 'new_partner_id', pod_changes, 'new_partner_id')
+        }
+    return patch
+
+def already_applied(moves, move_key, changes, change_key):
+    """IDs of employees whose logged local move is exactly what the new snapshot changed them to."""
+    new_values = {change['id']: change[change_key] for change in changes}
+    return sorted({move['moved_employee_id'] for move in moves
+                   if move.get('moved_employee_id') in new_values and new_values[move['moved_employee_id']] == move.get(move_key)})
+
+def print_patch_summary(patch):
+    """Prints the size of each part of a patch."""
+    print("\n--- Snapshot Diff Summary ---")
+    print(f"Hires: {len(patch['hires'])}")
+    print(f"Leavers: {len(patch['leavers'])}")
+    print(f"Coach changes: {len(patch['coach_changes'])}")
+    print(f"Pod changes: {len(patch['pod_changes'])}")
+    print(f"Employees with other field changes: {len(patch['field_changes'])}")
+    if 'already_applied_moves' in patch:
+        print(f"Local moves already in the new snapshot: {len(patch['already_applied_moves']['coach'])} coach, "
+              f"{len(patch['already_applied_moves']['pod'])} pod")
+    print("-----------------------------\n")
+
+# --- 3. Main Execution Flow ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff two snapshots by employee ID and write a forest patch for the web app.")
+    parser.add_argument('--previous', required=True, help="Previous snapshot: a forest JSON (.json or .json.gz) or an employee input file.")
+    parser.add_argument('--current', required=True, help="Current snapshot: a forest JSON (.json or .json.gz) or an employee input file.")
+    parser.add_argument('--reader', default=INPUT_READER, choices=INPUT_READERS, help="Input reader backend.")
+    parser.add_argument('--cache-dir', default=PARSE_CACHE_DIR, help="Directory of the parsed-input cache.")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the input files, bypassing the cache.")
+    parser.add_argument('--coach-moves', default=None, help="Local coaching moves log to check against the new snapshot.")
+    parser.add_argument('--pod-moves', default=None, help="Local pod moves log to check against the new snapshot.")
+    parser.add_argument('--output', default=FOREST_PATCH_PATH, help="Path of the patch JSON to write.")
+    args = parser.parse_args()
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    previous = load_snapshot(args.previous, args.reader, cache_dir)
+    current = load_snapshot(args.current, args.reader, cache_dir)
+    coach_moves = load_move_log(args.coach_moves) if args.coach_moves else []
+    pod_moves = load_move_log(args.pod_moves) if args.pod_moves else []
+    if previous is None or current is None or coach_moves is None or pod_moves is None:
+        print("Diff aborted due to data loading failure.")
+    else:
+        patch = diff_snapshots(previous, current, coach_moves, pod_moves)
+        print_patch_summary(patch)
+        try:
+            with open(args.output, 'w') as f:
+                json.dump(patch, f, separators=(',', ':'), default=forest_json_default)
+            print(f"Successfully exported patch to '{args.output}'")
+        except Exception as e:
+            print(f"Error exporting patch: {e}")
@@ -0,0 +1,244 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from build_forest import COLUMN_MAPPING, PARTNER_LEVEL_VALUE
+
+# --- Configuration ---
+SYNTHETIC_OUTPUT_PATH = 'synthetic_employee_data.csv'
+MIN_EMPLOYEES = 1_000
+MAX_EMPLOYEES = 500_000
+
+DEFAULT_EMPLOYEES = 10_000
+DEFAULT_PARTNER_RATIO = 0.01       # Share of active employees at the Partner level
+DEFAULT_FAN_OUT = 4                # Mean direct coachees per coach
+DEFAULT_MAX_DEPTH = 6              # Deepest coaching level below a Partner; the last level takes everyone left
+DEFAULT_RETIRED_RATIO = 0.002      # Share of all rows that are Retired Partners
+DEFAULT_ORPHAN_RATE = 0.005        # Share of non-partners whose coach is a Retired Partner or an unknown ID
+DEFAULT_CYCLES = 0                 # Two-person coaching cycles (a critical validation error)
+DEFAULT_INVALID_POD_RATE = 0.01    # Share of non-partners whose pod partner is a Retired Partner or an unknown ID
+DEFAULT_OPERATING_UNITS = 8
+DEFAULT_LOCATIONS = 12
+DEFAULT_CROSS_OU_RATE = 0.05       # Share of employees in a different Operating Unit from their tree's Partner
+DEFAULT_SAME_LOCATION_RATE = 0.7   # Share of employees at their tree's Partner's location
+
+FIRST_ID = 100_000                 # Employee IDs are unique integers from here up
+UNKNOWN_ID_OFFSET = 90_000_000     # Dangling coach and pod IDs are drawn above this, clear of real IDs
+LEVELS_BY_DEPTH = ['Director', 'Senior Manager', 'Manager', 'Senior Consultant', 'Consultant', 'Analyst']
+TALENT_GROUPS = ['Advisory', 'Assurance', 'Consulting', 'Tax', 'Technology']
+FTE_VALUES = [1.0, 0.8, 0.6]
+FTE_WEIGHTS = [0.9, 0.07, 0.03]
+FIRST_NAMES = ['Alex', 'Blake', 'Casey', 'Dana', 'Eden', 'Finley', 'Gray', 'Harper', 'Indy', 'Jordan',
+               'Kai', 'Logan', 'Morgan', 'Noel', 'Oakley', 'Parker', 'Quinn', 'Reese', 'Sage', 'Taylor']
+LAST_NAMES = ['Adams', 'Brooks', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ito', 'Jensen',
+              'Kowalski', 'Lopez', 'Murphy', 'Nguyen', 'Okafor', 'Patel', 'Rossi', 'Silva', 'Tanaka', 'Weber']
+
+# --- 1. Hierarchy Generation ---
+def generate_levels(active_count, partner_count, fan_out, max_depth, rng):
+    """
+    Lays the active employees out level by level below the Partners. Each level holds up to
+    fan_out times the previous one, and each of its rows picks a random coach from the previous level.
+    Returns (coach_rows, depths, top_rows), indexed by active row; coach_rows is -1 for Partners.
+    """
+    coach_rows = np.full(active_count, -1, dtype=np.int64)
+    depths = np.zeros(active_count, dtype=np.int64)
+    top_rows = np.arange(active_count, dtype=np.int64)
+    prev_start, prev_end, position, depth = 0, partner_count, partner_count, 1
+    while position < active_count:
+        if depth < max_depth:
+            size = min(active_count - position, (prev_end - prev_start) * fan_out)
+        else:
+            size = active_count - position
+        parents = rng.integers(prev_start, prev_end, size)
+        coach_rows[position:position + size] = parents
+        depths[position:position + size] = depth
+        top_rows[position:position + size] = top_rows[parents]
+        prev_start, prev_end, position, depth = position, position + size, position + size, depth + 1
+    return coach_rows, depths, top_rows
+
+def random_partner_in_unit(units, partner_units, rng):
+    """For each entry of `units`, a random Partner row in that Operating Unit, or -1 where it has none."""
+    order = np.argsort(partner_units, kind='stable')
+    counts = np.bincount(partner_units, minlength=int(units.max()) + 1 if len(units) else 0)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    unit_counts = counts[units]
+    picks = starts[units] + (rng.random(len(units)) * np.maximum(unit_counts, 1)).astype(np.int64)
+    return np.where(unit_counts > 0, order[np.minimum(picks, len(order) - 1)], -1)
+
+def dangling_ids(count, retired_ids, rng):
+    """IDs that do not resolve to an active employee: half Retired Partners (when there are any), half unknown."""
+    unknown = UNKNOWN_ID_OFFSET + rng.integers(0, 10 * max(count, 1), count)
+    if len(retired_ids) == 0:
+        return unknown
+    return np.where(rng.random(count) < 0.5, retired_ids[rng.integers(0, len(retired_ids), count)], unknown)
+
+# --- 2. Synthetic Org ---
+def generate_synthetic_org(employees=DEFAULT_EMPLOYEES, partner_ratio=DEFAULT_PARTNER_RATIO, fan_out=DEFAULT_FAN_OUT,
+                           max_depth=DEFAULT_MAX_DEPTH, retired_ratio=DEFAULT_RETIRED_RATIO, orphan_rate=DEFAULT_ORPHAN_RATE,
+                           cycles=DEFAULT_CYCLES, invalid_pod_rate=DEFAULT_INVALID_POD_RATE,
+                           operating_units=DEFAULT_OPERATING_UNITS, locations=DEFAULT_LOCATIONS,
+                           cross_ou_rate=DEFAULT_CROSS_OU_RATE, seed=0):
+    """
+    Generates a synthetic employee file with the source column names build_forest.py reads
+    (COLUMN_MAPPING plus 'Operating Unit Name', 'Location  Name' and 'FTE').
+    Returns (df, summary); summary counts the planted Partners, Retired Partners, broken coach links,
+    cycles and invalid pod links. Returns (None, summary) when the parameters are out of range.
+    """
+    summary = {'errors': []}
+    if not MIN_EMPLOYEES <= employees <= MAX_EMPLOYEES:
+        summary['errors'].append(f"Headcount must be between {MIN_EMPLOYEES} and {MAX_EMPLOYEES}, got {employees}.")
+    if fan_out < 1 or max_depth < 1:
+        summary['errors'].append("Fan-out and depth must both be at least 1.")
+    if operating_units < 1 or locations < 1:
+        summary['errors'].append("There must be at least one Operating Unit and one location.")
+    for name, rate in (('partner ratio', partner_ratio), ('retired ratio', retired_ratio), ('orphan rate', orphan_rate),
+                       ('invalid pod rate', invalid_pod_rate), ('cross-OU rate', cross_ou_rate)):
+        if not 0 <= rate < 1:
+            summary['errors'].append(f"The {name} must be in [0, 1), got {rate}.")
+    if summary['errors']:
+        return None, summary
+
+    rng = np.random.default_rng(seed)
+    retired_count = int(round(employees * retired_ratio))
+    active_count = employees - retired_count
+    partner_count = min(max(1, int(round(active_count * partner_ratio))), active_count)
+    ids = FIRST_ID + rng.choice(10 * employees, size=employees, replace=False)
+    active_ids, retired_ids = ids[:active_count], ids[active_count:]
+
+    coach_rows, depths, top_rows = generate_levels(active_count, partner_count, fan_out, max_depth, rng)
+    is_partner = depths == 0
+    non_partner_rows = np.flatnonzero(~is_partner)
+
+    # Operating Units and locations follow the tree's Partner, with some spread
+    partner_units = rng.integers(0, operating_units, partner_count)
+    partner_locations = rng.integers(0, locations, partner_count)
+    units = partner_units[top_rows]
+    moved_unit = rng.random(active_count) < cross_ou_rate
+    units[moved_unit] = rng.integers(0, operating_units, int(moved_unit.sum()))
+    location_codes = np.where(rng.random(active_count) < DEFAULT_SAME_LOCATION_RATE,
+                              partner_locations[top_rows], rng.integers(0, locations, active_count))
+
+    coach_ids = np.where(is_partner, 0, active_ids[np.maximum(coach_rows, 0)])
+    first_names = rng.integers(0, len(FIRST_NAMES), employees)
+    last_names = rng.integers(0, len(LAST_NAMES), employees)
+    names = np.array([f"{FIRST_NAMES[f]} {LAST_NAMES[l]}" for f, l in zip(first_names, last_names)], dtype=object)
+    name_by_id = dict(zip(ids.tolist(), names.tolist()))
+
+    # Broken coach links: the subtree below each one is orphaned
+    orphan_rows = rng.choice(non_partner_rows, size=int(round(len(non_partner_rows) * orphan_rate)), replace=False)
+    coach_ids[orphan_rows] = dangling_ids(len(orphan_rows), retired_ids, rng)
+
+    # Two-person cycles: a coach is re-pointed at one of their own coachees
+    cycle_candidates = np.flatnonzero((depths >= 2) & ~np.isin(coach_rows, orphan_rows))
+    cycle_rows = rng.permutation(cycle_candidates)
+    _, first_per_coach = np.unique(coach_rows[cycle_rows], return_index=True)
+    cycle_rows = cycle_rows[np.sort(first_per_coach)][:cycles]
+    coach_ids[coach_rows[cycle_rows]] = active_ids[cycle_rows]
+
+    # Pods mostly sit with the tree's Partner, otherwise with another Partner in the employee's Operating Unit
+    pod_rows = np.where(rng.random(active_count) < 0.7, top_rows, random_partner_in_unit(units, partner_units, rng))
+    pod_rows = np.where(pod_rows < 0, top_rows, pod_rows)
+    pod_ids = active_ids[pod_rows]
+    invalid_pod_rows = rng.choice(non_partner_rows, size=int(round(len(non_partner_rows) * invalid_pod_rate)), replace=False)
+    pod_ids[invalid_pod_rows] = dangling_ids(len(invalid_pod_rows), retired_ids, rng)
+
+    level_names = np.array([PARTNER_LEVEL_VALUE] + LEVELS_BY_DEPTH, dtype=object)[np.minimum(depths, len(LEVELS_BY_DEPTH))]
+    unit_names = np.array([f"OU {code + 1:02d}" for code in range(operating_units)], dtype=object)
+    location_names = np.array([f"Location {code + 1:02d}" for code in range(locations)], dtype=object)
+
+    active = pd.DataFrame({
+        COLUMN_MAPPING['employee_id']: active_ids,
+        COLUMN_MAPPING['name']: names[:active_count],
+        COLUMN_MAPPING['coach_id']: pd.array(np.where(is_partner, -1, coach_ids), dtype='Int64'),
+        COLUMN_MAPPING['coach_name']: [name_by_id.get(coach_id, 'Unknown Coach') for coach_id in coach_ids.tolist()],
+        COLUMN_MAPPING['level']: level_names,
+        COLUMN_MAPPING['partner_relationship_id']: pd.array(np.where(is_partner, -1, pod_ids), dtype='Int64'),
+        COLUMN_MAPPING['partner_relationship_name']: [name_by_id.get(pod_id, 'Unknown Partner') for pod_id in pod_ids.tolist()],
+        COLUMN_MAPPING['talent_group']: np.array(TALENT_GROUPS, dtype=object)[rng.integers(0, len(TALENT_GROUPS), active_count)],
+        'Operating Unit Name': unit_names[units],
+        'Location  Name': location_names[location_codes],
+        'FTE': rng.choice(FTE_VALUES, size=active_count, p=FTE_WEIGHTS)
+    })
+    # Partners have no coach and no pod partner
+    active.loc[is_partner, [COLUMN_MAPPING['coach_id'], COLUMN_MAPPING['partner_relationship_id']]] = pd.NA
+    active.loc[is_partner, [COLUMN_MAPPING['coach_name'], COLUMN_MAPPING['partner_relationship_name']]] = None
+
+    retired = pd.DataFrame({
+        COLUMN_MAPPING['employee_id']: retired_ids,
+        COLUMN_MAPPING['name']: names[active_count:],
+        COLUMN_MAPPING['level']: 'Retired Partner',
+        COLUMN_MAPPING['talent_group']: np.array(TALENT_GROUPS, dtype=object)[rng.integers(0, len(TALENT_GROUPS), retired_count)],
+        'Operating Unit Name': unit_names[rng.integers(0, operating_units, retired_count)],
+        'Location  Name': location_names[rng.integers(0, locations, retired_count)],
+        'FTE': 1.0
+    })
+    df = pd.concat([active, retired], ignore_index=True).reindex(columns=active.columns)
+    # Source extracts are not in hierarchy order
+    df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+    summary.update({
+        'employees': employees,
+        'partners': partner_count,
+        'retired_partners': retired_count,
+        'max_depth': int(depths.max()),
+        'broken_coach_links': len(orphan_rows),
+        'cycles': len(cycle_rows),
+        'invalid_pod_links': len(invalid_pod_rows),
+        'cross_ou_employees': int(moved_unit.sum())
+    })
+    if len(cycle_rows) < cycles:
+        summary['errors'].append(f"Only {len(cycle_rows)} of {cycles} cycles could be planted; the org is too shallow.")
+    return df, summary
+
+# --- 3. Output ---
+def write_synthetic_org(df, output_path):
+    """Writes the synthetic org as .csv, .parquet or .xlsx (by extension). Returns True on success."""
+    extension = os.path.splitext(output_path)[1].lower()
+    try:
+        if extension == '.csv':
+            df.to_csv(output_path, index=False)
+        elif extension == '.parquet':
+            df.to_parquet(output_path, index=False)
+        elif extension in ('.xlsx', '.xls'):
+            df.to_excel(output_path, index=False)
+        else:
+            print(f"Error: unsupported output extension '{extension}'. Use .csv, .parquet or .xlsx.")
+            return False
+    except Exception as e:
+        print(f"Error writing synthetic org to '{output_path}': {e}")
+        return False
+    return True
+
+# --- 4. Main Execution Flow ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic employee input file for build_forest.py.")
+    parser.add_argument('--employees', type=int, default=DEFAULT_EMPLOYEES, help=f"Headcount ({MIN_EMPLOYEES} to {MAX_EMPLOYEES}).")
+    parser.add_argument('--partner-ratio', type=float, default=DEFAULT_PARTNER_RATIO, help="Share of active employees who are Partners.")
+    parser.add_argument('--fan-out', type=int, default=DEFAULT_FAN_OUT, help="Mean direct coachees per coach.")
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_MAX_DEPTH, help="Deepest coaching level below a Partner.")
+    parser.add_argument('--retired-ratio', type=float, default=DEFAULT_RETIRED_RATIO, help="Share of rows that are Retired Partners.")
+    parser.add_argument('--orphan-rate', type=float, default=DEFAULT_ORPHAN_RATE,
+                        help="Share of non-partners whose coach is a Retired Partner or an unknown ID.")
+    parser.add_argument('--cycles', type=int, default=DEFAULT_CYCLES, help="Two-person coaching cycles to plant (fails validation).")
+    parser.add_argument('--invalid-pod-rate', type=float, default=DEFAULT_INVALID_POD_RATE,
+                        help="Share of non-partners whose pod partner is a Retired Partner or an unknown ID.")
+    parser.add_argument('--operating-units', type=int, default=DEFAULT_OPERATING_UNITS, help="Number of Operating Units.")
+    parser.add_argument('--locations', type=int, default=DEFAULT_LOCATIONS, help="Number of locations.")
+    parser.add_argument('--cross-ou-rate', type=float, default=DEFAULT_CROSS_OU_RATE,
+                        help="Share of employees in a different Operating Unit from their tree's Partner.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed and options give the same file.")
+    parser.add_argument('--output', default=SYNTHETIC_OUTPUT_PATH, help="Path to write (.csv, .parquet or .xlsx).")
+    args = parser.parse_args()
+
+    df, summary = generate_synthetic_org(args.employees, args.partner_ratio, args.fan_out, args.max_depth, args.retired_ratio,
+                                         args.orphan_rate, args.cycles, args.invalid_pod_rate, args.operating_units,
+                                         args.locations, args.cross_ou_rate, args.seed)
+    for error in summary['errors']:
+        print(f"Error: {error}")
+    if df is not None and write_synthetic_org(df, args.output):
+        print(f"Wrote {len(df)} synthetic employees to '{args.output}': {summary['partners']} Partners, "
+              f"{summary['retired_partners']} Retired Partners, depth {summary['max_depth']}, "
+              f"{summary['broken_coach_links']} broken coach links, {summary['cycles']} cycles, "
+              f"{summary['invalid_pod_links']} invalid pod links.")
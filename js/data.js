@@ -1,27 +1,380 @@
-function getPodSizes(allEmployees) {
-    const podSizes = {};
-    allEmployees.forEach(emp => {
-        if (emp.partner_relationship_id) {
-            if (!podSizes[emp.partner_relationship_id]) {
-                podSizes[emp.partner_relationship_id] = 0;
-            }
-            podSizes[emp.partner_relationship_id]++;
+// --- Per-Operating-Unit shards (written by build_forest.py --shards) ---
+const FOREST_SHARD_DIR = 'forest_shards';
+let shardManifest = null;
+let currentAdditionalEmployees = [];
+// ETag of the loaded forest.json (set when it is served by serve_forest.py), compared against
+// the change notifications from its /events stream.
+let forestEtag = null;
+// id -> node object for every node in currentGlobalPartnerTrees. Coach moves only re-parent
+// nodes that are already in the trees, so the index stays valid until new data is loaded.
+let treeNodeIndex = new Map();
+let employeeIndex = new Map();
+
+// --- Pod aggregates (written by build_forest.py as 'pod_aggregates') ---
+const POD_AGGREGATES_VERSION = 1;
+const POD_ROSTER_STATUSES = ['valid', 'warning_different_offering']; // Statuses that place an employee in their pod
+const POD_STATUSES = ['valid', 'warning_different_offering', 'error_invalid_id'];
+// pods: Partner id -> { operating_unit, members: Set of ids, status_counts }
+// operatingUnits: OU -> { status_counts, pod_errors: Set of ids, pod_size_distribution: Map of size -> pod count }
+// Loaded with the forest (or computed from it) and kept current by movePodMember.
+let podAggregates = { pods: new Map(), operatingUnits: new Map() };
+
+// --- Search index (written by build_forest.py as 'search_index') ---
+const SEARCH_INDEX_VERSION = 1;
+const SEARCH_INDEX_FIELDS = {
+    operating_unit: 'Operating Unit Name',
+    location: 'Location  Name',
+    talent_group: 'talent_group',
+    level: 'level',
+    pod_status: 'pod_relationship_status'
+};
+// Rows are positions in searchIndex.ids; postings are ascending rows. The index is only used while
+// it describes exactly the loaded records: it is dropped when a patch changes them (filters then
+// scan), and pod moves keep its pod status postings current.
+let searchIndex = null;
+let searchIndexRows = new Map(); // employee id -> row
+
+async function fetchShardManifest() {
+    try {
+        // The manifest is small and changes on every build, so always revalidate it.
+        const response = await fetch(`${FOREST_SHARD_DIR}/manifest.json`, { cache: 'no-cache' });
+        return response.ok ? await response.json() : null;
+    } catch (e) {
+        console.warn("No forest shard manifest found, falling back to forest.json.", e);
+        return null;
+    }
+}
+
+async function fetchShard(operatingUnit) {
+    const entry = shardManifest.operating_units.find(unit => unit.name === operatingUnit);
+    if (!entry) return null;
+    // Shard file names embed their content hash, so the normal HTTP cache is safe to use.
+    const response = await fetch(`${FOREST_SHARD_DIR}/${entry.file}`);
+    if (!response.ok) {
+        throw new Error(`Could not load shard ${entry.file} (HTTP ${response.status}).`);
+    }
+    if (entry.compressed) {
+        return new Response(response.body.pipeThrough(new DecompressionStream('gzip'))).json();
+    }
+    return response.json();
+}
+
+// Reads just the start of forest.json: build_forest.py writes its 'generated_at' first. Returns
+// undefined when forest.json cannot be fetched, and null when it carries no build stamp.
+async function fetchForestGeneratedAt() {
+    try {
+        const response = await fetch("forest.json", { cache: 'no-cache' });
+        if (!response.ok || !response.body) return undefined;
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let head = '';
+        while (head.length < 256) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            head += decoder.decode(value, { stream: true });
         }
+        reader.cancel();
+        const match = head.match(/^\s*\{\s*"generated_at"\s*:\s*"([^"]*)"/);
+        return match ? match[1] : null;
+    } catch (e) {
+        return undefined;
+    }
+}
+
+async function loadInitialForestData() {
+    shardManifest = await fetchShardManifest();
+    if (shardManifest) {
+        // A manifest left by an earlier --shards build must not hide a newer forest.json.
+        const forestGeneratedAt = await fetchForestGeneratedAt();
+        if (forestGeneratedAt !== undefined && forestGeneratedAt !== shardManifest.generated_at) {
+            console.warn("The forest shards are from another build than forest.json; loading forest.json.");
+            shardManifest = null;
+        }
+    }
+    if (shardManifest) {
+        return fetchShard(defaultOperatingUnit(shardManifest.operating_units.map(unit => unit.name)));
+    }
+    return fetchForestJson();
+}
+
+async function fetchForestJson() {
+    // Revalidate on every load: an unchanged forest.json comes back as 304 and is read from the HTTP cache.
+    const response = await fetch("forest.json", { cache: 'no-cache' });
+    if (!response.ok) {
+        throw new Error(`Could not load forest.json (HTTP ${response.status}).`);
+    }
+    forestEtag = response.headers.get('ETag');
+    return response.json();
+}
+
+// Subscribes to serve_forest.py's change notifications; `onChange` runs when a forest other than
+// the loaded one is published. Static servers have no /events endpoint, and the stream just closes.
+function watchForestChanges(onChange) {
+    if (shardManifest || !window.EventSource || window.location.protocol === 'file:') return;
+    const source = new EventSource('events');
+    source.addEventListener('forest', event => {
+        const info = JSON.parse(event.data);
+        if (info.etag && info.etag !== forestEtag) onChange(info);
     });
-    return podSizes;
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) console.info("No forest change notifications from this server.");
+    };
 }
 
-function getUniqueEmployees() {
-    const allEmployeesMap = new Map();
-    // The tree contains the most up-to-date data after moves, so process it first.
-    flattenTree(currentGlobalPartnerTrees).forEach(emp => allEmployeesMap.set(emp.id, emp));
-    // Then add any orphans who might not be in a tree (e.g. coach_id points to non-existent employee)
+function setForestData(data) {
+    currentGlobalPartnerTrees = (data && data.all_partner_trees) ? data.all_partner_trees : [];
+    currentOrphanedReport = (data && data.all_orphaned_employees) ? data.all_orphaned_employees : [];
+    // Shards also carry flat records of employees whose coaching tree lives in another OU's shard.
+    currentAdditionalEmployees = (data && data.additional_employees) ? data.additional_employees : [];
+    rebuildTreeNodeIndex();
+    rebuildEmployeeIndex();
+    podAggregates = (data && data.pod_aggregates && data.pod_aggregates.format_version === POD_AGGREGATES_VERSION)
+        ? loadPodAggregates(data.pod_aggregates)
+        : computePodAggregates();
+    searchIndex = loadSearchIndex(data && data.search_index);
+}
+
+function rebuildTreeNodeIndex() {
+    treeNodeIndex = new Map();
+    flattenTree(currentGlobalPartnerTrees).forEach(node => treeNodeIndex.set(node.id, node));
+}
+
+// Every loaded employee record by id: tree nodes first (they carry the moves), then orphans, then a
+// shard's additional employees. Like treeNodeIndex, it is rebuilt whenever new data is loaded.
+function rebuildEmployeeIndex() {
+    employeeIndex = new Map(treeNodeIndex);
     currentOrphanedReport.forEach(emp => {
-        if (!allEmployeesMap.has(emp.id)) {
-            allEmployeesMap.set(emp.id, emp);
+        if (!employeeIndex.has(emp.id)) employeeIndex.set(emp.id, emp);
+    });
+    currentAdditionalEmployees.forEach(emp => {
+        if (!employeeIndex.has(emp.id)) employeeIndex.set(emp.id, emp);
+    });
+}
+
+function getUniqueEmployees() {
+    return Array.from(employeeIndex.values());
+}
+
+// Turns the 'pod_aggregates' section of forest.json into Maps and Sets that pod moves can update in place.
+function loadPodAggregates(aggregates) {
+    const pods = new Map(Object.entries(aggregates.pods).map(([partnerId, pod]) => [partnerId, {
+        operating_unit: pod.operating_unit,
+        members: new Set(pod.members),
+        status_counts: Object.assign({}, pod.status_counts)
+    }]));
+    const operatingUnits = new Map(Object.entries(aggregates.operating_units).map(([ou, unit]) => [ou, {
+        status_counts: Object.assign({}, unit.status_counts),
+        pod_errors: new Set(unit.pod_errors),
+        pod_size_distribution: new Map(Object.entries(unit.pod_size_distribution).map(([size, count]) => [Number(size), count]))
+    }]));
+    return { pods, operatingUnits };
+}
+
+// Same aggregates as build_forest.py's build_pod_aggregates, computed from the loaded records
+// (for files built before the aggregates existed, and after a snapshot patch).
+function computePodAggregates() {
+    const aggregates = { pods: new Map(), operatingUnits: new Map() };
+    currentGlobalPartnerTrees.forEach(partner => {
+        aggregates.pods.set(partner.id, {
+            operating_unit: partner['Operating Unit Name'],
+            members: new Set(),
+            status_counts: Object.fromEntries(POD_ROSTER_STATUSES.map(status => [status, 0]))
+        });
+    });
+    employeeIndex.forEach(emp => updatePodAggregates(aggregates, emp, 1, false));
+    aggregates.pods.forEach(pod => changePodSizeCount(aggregates, pod, pod.members.size, 1));
+    return aggregates;
+}
+
+function podOperatingUnitAggregates(aggregates, ou) {
+    if (!aggregates.operatingUnits.has(ou)) {
+        aggregates.operatingUnits.set(ou, {
+            status_counts: Object.fromEntries(POD_STATUSES.map(status => [status, 0])),
+            pod_errors: new Set(),
+            pod_size_distribution: new Map()
+        });
+    }
+    return aggregates.operatingUnits.get(ou);
+}
+
+function changePodSizeCount(aggregates, pod, size, delta) {
+    if (!pod.operating_unit) return;
+    const distribution = podOperatingUnitAggregates(aggregates, pod.operating_unit).pod_size_distribution;
+    const count = (distribution.get(size) || 0) + delta;
+    if (count > 0) {
+        distribution.set(size, count);
+    } else {
+        distribution.delete(size);
+    }
+}
+
+// Counts one employee's pod status (sign = 1) or takes it back out (sign = -1). With
+// `trackSizes`, the pod size distribution follows the roster change.
+function updatePodAggregates(aggregates, emp, sign, trackSizes) {
+    const status = emp.pod_relationship_status;
+    const pod = aggregates.pods.get(emp.partner_relationship_id);
+    if (pod && POD_ROSTER_STATUSES.includes(status)) {
+        if (trackSizes) changePodSizeCount(aggregates, pod, pod.members.size, -1);
+        if (sign > 0) {
+            pod.members.add(emp.id);
+        } else {
+            pod.members.delete(emp.id);
         }
+        pod.status_counts[status] += sign;
+        if (trackSizes) changePodSizeCount(aggregates, pod, pod.members.size, 1);
+    }
+    const ou = emp['Operating Unit Name'];
+    if (!ou) return;
+    const unit = podOperatingUnitAggregates(aggregates, ou);
+    if (status in unit.status_counts) unit.status_counts[status] += sign;
+    if (status !== 'valid') {
+        if (sign > 0) {
+            unit.pod_errors.add(emp.id);
+        } else {
+            unit.pod_errors.delete(emp.id);
+        }
+    }
+}
+
+// Moves an employee to a new Pod Partner, updating the pod aggregates and search index incrementally.
+function movePodMember(emp, newPartnerId, newPartnerName) {
+    updatePodAggregates(podAggregates, emp, -1, true);
+    const oldStatus = emp.pod_relationship_status;
+    emp.partner_relationship_id = newPartnerId;
+    emp.partner_relationship_name = newPartnerName;
+    emp.is_pod_relationship_valid = true;
+    emp.pod_relationship_status = 'valid';
+    // Add a flag to indicate the employee has been moved for UI rendering
+    emp.isMoved = true;
+    updatePodAggregates(podAggregates, emp, 1, true);
+    updateSearchIndexField(emp, 'pod_status', oldStatus, emp.pod_relationship_status);
+}
+
+function getPodSize(partnerId) {
+    const pod = podAggregates.pods.get(partnerId);
+    return pod ? pod.members.size : 0;
+}
+
+function getPodMembers(partnerId) {
+    const pod = podAggregates.pods.get(partnerId);
+    return pod ? Array.from(pod.members, id => employeeIndex.get(id)).filter(Boolean) : [];
+}
+
+// Employees of the OU whose pod relationship is not 'valid' (invalid IDs and cross-offering pods).
+function getPodErrors(ou) {
+    const unit = podAggregates.operatingUnits.get(ou);
+    return unit ? Array.from(unit.pod_errors, id => employeeIndex.get(id)).filter(Boolean) : [];
+}
+
+// The index from forest.json, or null when it is missing, from another format version or
+// built for a different set of records than the ones loaded.
+function loadSearchIndex(index) {
+    searchIndexRows = new Map();
+    if (!index || index.format_version !== SEARCH_INDEX_VERSION || index.record_count !== employeeIndex.size ||
+        !index.ids.every(id => employeeIndex.has(id))) {
+        return null;
+    }
+    index.ids.forEach((id, row) => searchIndexRows.set(id, row));
+    return index;
+}
+
+// Same normalization as build_forest.py's search_tokens: accents stripped, lowercase letter and digit runs.
+function searchTokens(text) {
+    const normalized = String(text).normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+    return Array.from(new Set(normalized.split(/[^a-z0-9]+/).filter(Boolean)));
+}
+
+// First position in the sorted array whose value is not less than `value`.
+function lowerBound(sorted, value) {
+    let low = 0, high = sorted.length;
+    while (low < high) {
+        const mid = (low + high) >>> 1;
+        if (sorted[mid] < value) {
+            low = mid + 1;
+        } else {
+            high = mid;
+        }
+    }
+    return low;
+}
+
+// Ascending, distinct rows whose name has a token starting with `token`, or whose ID starts with it.
+function searchIndexRowsForToken(token) {
+    const rows = [];
+    const nameEnd = lowerBound(searchIndex.name_keys, token + '\uffff');
+    for (let i = lowerBound(searchIndex.name_keys, token); i < nameEnd; i++) {
+        searchIndex.name_rows[i].forEach(row => rows.push(row));
+    }
+    const idEnd = lowerBound(searchIndex.id_keys, token + '\uffff');
+    for (let i = lowerBound(searchIndex.id_keys, token); i < idEnd; i++) {
+        rows.push(searchIndex.id_rows[i]);
+    }
+    const sorted = Uint32Array.from(rows).sort();
+    return sorted.filter((row, i) => i === 0 || row !== sorted[i - 1]);
+}
+
+// Intersection of ascending row lists, shortest first.
+function intersectSortedLists(lists) {
+    const [first, ...rest] = [...lists].sort((a, b) => a.length - b.length);
+    let result = Array.from(first);
+    rest.forEach(list => {
+        const kept = [];
+        let j = 0;
+        result.forEach(row => {
+            while (j < list.length && list[j] < row) j++;
+            if (list[j] === row) kept.push(row);
+        });
+        result = kept;
     });
-    return Array.from(allEmployeesMap.values());
+    return result;
+}
+
+function employeeMatchesToken(emp, token) {
+    return searchTokens(emp.name || '').some(nameToken => nameToken.startsWith(token)) ||
+        searchTokens(emp.id).join('').startsWith(token);
+}
+
+// Employees matching every filter ({SEARCH_INDEX_FIELDS key: value}; null or 'all' for any) whose
+// name or ID matches every word of `query` by prefix, in the loaded order. Intersects the search
+// index's posting lists when it is current, else scans the loaded records.
+function findEmployees(filters, query) {
+    const fields = Object.entries(filters).filter(([, value]) => value !== null && value !== undefined && value !== 'all');
+    const tokens = searchTokens(query || '');
+    if (!searchIndex) {
+        return getUniqueEmployees().filter(emp =>
+            fields.every(([field, value]) => emp[SEARCH_INDEX_FIELDS[field]] === value) &&
+            tokens.every(token => employeeMatchesToken(emp, token)));
+    }
+    const lists = fields.map(([field, value]) => searchIndex.postings[field][value] || []);
+    tokens.forEach(token => lists.push(searchIndexRowsForToken(token)));
+    const rows = lists.length > 0 ? intersectSortedLists(lists) : searchIndex.ids.map((id, row) => row);
+    return rows.map(row => employeeIndex.get(searchIndex.ids[row]));
+}
+
+// Distinct non-empty values of a SEARCH_INDEX_FIELDS field over the loaded records.
+function getEmployeeFieldValues(field) {
+    if (searchIndex) {
+        return Object.keys(searchIndex.postings[field]);
+    }
+    const source = SEARCH_INDEX_FIELDS[field];
+    return Array.from(new Set(getUniqueEmployees().map(emp => emp[source]).filter(Boolean)));
+}
+
+// Moves an employee's row between two value postings of a field after the record changed.
+function updateSearchIndexField(emp, field, oldValue, newValue) {
+    if (!searchIndex || oldValue === newValue || !searchIndexRows.has(emp.id)) return;
+    const row = searchIndexRows.get(emp.id);
+    const postings = searchIndex.postings[field];
+    const oldList = postings[oldValue];
+    if (oldList) {
+        const position = lowerBound(oldList, row);
+        if (oldList[position] === row) oldList.splice(position, 1);
+    }
+    if (newValue !== null && newValue !== undefined && newValue !== '') {
+        const newList = postings[newValue] || (postings[newValue] = []);
+        const position = lowerBound(newList, row);
+        if (newList[position] !== row) newList.splice(position, 0, row);
+    }
 }
 
 function flattenTree(nodes) {
@@ -62,22 +415,19 @@ function savePodChangeLog() {
 }
 
 function applyPodLoggedChanges() {
-    const allEmployees = getUniqueEmployees();
     Object.values(podChangeLog).forEach(log => {
-        const employee = allEmployees.find(e => e.id === log.moved_employee_id);
+        const employee = employeeIndex.get(log.moved_employee_id);
         if (employee) {
-            employee.partner_relationship_id = log.new_partner_id;
-            employee.partner_relationship_name = log.new_partner_name;
-            employee.is_pod_relationship_valid = true;
-            employee.pod_relationship_status = 'valid';
-            // Add a flag to indicate the employee has been moved for UI rendering
-            employee.isMoved = true;
+            movePodMember(employee, log.new_partner_id, log.new_partner_name);
         }
     });
 }
 
 function findNodeById(roots, nodeId) {
     if (!nodeId) return null;
+    if (roots === currentGlobalPartnerTrees) {
+        return treeNodeIndex.get(nodeId) || null;
+    }
     for (let root of roots) {
         const found = findNodeRecursive(root, nodeId);
         if (found) return found;
@@ -99,7 +449,199 @@ function findNodeRecursive(node, nodeId) {
     return null;
 }
 
+// --- Interval labels (interval_start/interval_end/depth/interval_root_id from build_forest.py) ---
+function hasIntervalLabels(node) {
+    return !!node && node.interval_root_id !== undefined;
+}
+
+function isUnder(node, ancestor) {
+    return node.interval_root_id === ancestor.interval_root_id &&
+        ancestor.interval_start < node.interval_start && node.interval_start <= ancestor.interval_end;
+}
+
+function shiftIntervalLabels(root, threshold, delta, contains, skip) {
+    const stack = [root];
+    while (stack.length > 0) {
+        const node = stack.pop();
+        if (node === skip) continue;
+        if (node.interval_start > threshold) {
+            node.interval_start += delta;
+            node.interval_end += delta;
+        } else if (contains !== null && node.interval_start <= contains && contains <= node.interval_end) {
+            node.interval_end += delta;
+        } else if (node.interval_end <= threshold) {
+            continue;
+        }
+        if (node.children) stack.push(...node.children);
+    }
+}
+
+// Call after movedNode has been re-parented (appended to newCoach.children); only the old and new trees are touched.
+function relabelSubtreeMove(movedNode, oldRoot, newRoot, newCoach) {
+    const size = movedNode.interval_end - movedNode.interval_start + 1;
+    shiftIntervalLabels(oldRoot, movedNode.interval_end, -size, movedNode.interval_start, movedNode);
+
+    const insertAt = newCoach.interval_end + 1;
+    shiftIntervalLabels(newRoot, insertAt - 1, size, newCoach.interval_start, movedNode);
+
+    const offset = insertAt - movedNode.interval_start;
+    const depthDelta = newCoach.depth + 1 - movedNode.depth;
+    const stack = [movedNode];
+    while (stack.length > 0) {
+        const node = stack.pop();
+        node.interval_root_id = newRoot.id;
+        node.interval_start += offset;
+        node.interval_end += offset;
+        node.depth += depthDelta;
+        if (node.children) stack.push(...node.children);
+    }
+}
+
+function relabelAfterMove(movedNode, newCoach) {
+    if (!hasIntervalLabels(movedNode) || !hasIntervalLabels(newCoach)) return;
+    const oldRoot = findNodeById(currentGlobalPartnerTrees, movedNode.interval_root_id);
+    const newRoot = findNodeById(currentGlobalPartnerTrees, newCoach.interval_root_id);
+    if (oldRoot && newRoot) {
+        relabelSubtreeMove(movedNode, oldRoot, newRoot, newCoach);
+    }
+}
+
+function labelForest() {
+    currentGlobalPartnerTrees.forEach(root => {
+        let position = 0;
+        const stack = [[root, 0, false]];
+        while (stack.length > 0) {
+            const [node, depth, leaving] = stack.pop();
+            if (leaving) {
+                node.interval_end = position - 1;
+                continue;
+            }
+            node.interval_root_id = root.id;
+            node.interval_start = position++;
+            node.depth = depth;
+            stack.push([node, depth, true]);
+            const children = node.children || [];
+            for (let k = children.length - 1; k >= 0; k--) {
+                stack.push([children[k], depth + 1, false]);
+            }
+        }
+    });
+}
+
+// --- Snapshot patches (written by diff_snapshots.py) ---
+const FOREST_PATCH_FORMAT = 'forest-patch';
+const FOREST_PATCH_VERSION = 1;
+const POD_PATCH_FIELDS = ['partner_relationship_name', 'pod_relationship_status'];
+const COACH_PATCH_FIELDS = ['coach_name'];
+
+// Applies a snapshot patch to the loaded (full) forest in place. Local moves still pending in the
+// logs win over the patch; logged moves the new snapshot already contains are dropped from the logs.
+function applyForestPatch(patch) {
+    if (!patch || patch.format !== FOREST_PATCH_FORMAT || patch.version !== FOREST_PATCH_VERSION) {
+        throw new Error("Unsupported or outdated forest patch file.");
+    }
+    const nodesById = new Map(getUniqueEmployees().map(node => [node.id, node]));
+    // Relinking follows the current tree order, so existing siblings keep their order
+    const linkOrder = new Set(flattenTree(currentGlobalPartnerTrees).map(node => node.id));
+
+    const pendingCoachMoves = new Map(changeLog.map(log => [log.moved_employee_id, log]));
+    const alreadyAppliedCoach = new Set(patch.coach_changes
+        .filter(change => pendingCoachMoves.has(change.id) && pendingCoachMoves.get(change.id).new_coach_id === change.new_coach_id)
+        .map(change => change.id));
+    const alreadyAppliedPod = new Set(patch.pod_changes
+        .filter(change => podChangeLog[change.id] && podChangeLog[change.id].new_partner_id === change.new_partner_id)
+        .map(change => change.id));
+    const leavers = new Set(patch.leavers);
+    changeLog = changeLog.filter(log => !alreadyAppliedCoach.has(log.moved_employee_id) && !leavers.has(log.moved_employee_id));
+    Object.keys(podChangeLog).forEach(id => {
+        if (alreadyAppliedPod.has(id) || leavers.has(id)) delete podChangeLog[id];
+    });
+    const pendingCoachIds = new Set(changeLog.map(log => log.moved_employee_id));
+    const isPending = (id, field) =>
+        ((field === 'coach_id' || COACH_PATCH_FIELDS.includes(field)) && pendingCoachIds.has(id)) ||
+        ((field === 'partner_relationship_id' || POD_PATCH_FIELDS.includes(field)) && !!podChangeLog[id]);
+    const setField = (node, field, value) => {
+        if (isPending(node.id, field)) return;
+        if (value === null || value === undefined) {
+            delete node[field];
+        } else {
+            node[field] = value;
+        }
+    };
+
+    leavers.forEach(id => nodesById.delete(id));
+    patch.hires.forEach(record => nodesById.set(record.id, Object.assign({}, record)));
+    patch.coach_changes.forEach(change => {
+        const node = nodesById.get(change.id);
+        if (node) setField(node, 'coach_id', change.new_coach_id);
+    });
+    patch.pod_changes.forEach(change => {
+        const node = nodesById.get(change.id);
+        if (node) setField(node, 'partner_relationship_id', change.new_partner_id);
+    });
+    patch.field_changes.forEach(change => {
+        const node = nodesById.get(change.id);
+        if (!node) return;
+        Object.entries(change.set).forEach(([field, value]) => setField(node, field, value));
+        change.unset.forEach(field => setField(node, field, null));
+    });
+
+    // The orphan report is replaced as a whole
+    nodesById.forEach(node => {
+        delete node.reason_for_listing;
+        delete node.root_cause_employee_id;
+    });
+    const orphans = [];
+    patch.all_orphaned_employees.forEach(record => {
+        const node = nodesById.get(record.id);
+        if (node) {
+            node.reason_for_listing = record.reason_for_listing;
+            node.root_cause_employee_id = record.root_cause_employee_id;
+            orphans.push(node);
+        }
+    });
+
+    // Relink every node under its (possibly new) coach; Partners stay roots
+    nodesById.forEach((node, id) => {
+        node.children = [];
+        linkOrder.add(id);
+    });
+    linkOrder.forEach(id => {
+        const node = nodesById.get(id);
+        if (!node || node.level === PARTNER_LEVEL_VALUE) return;
+        const coach = nodesById.get(node.coach_id);
+        if (coach) coach.children.push(node);
+    });
+
+    currentGlobalPartnerTrees = patch.partner_root_ids.map(id => nodesById.get(id)).filter(Boolean);
+    currentOrphanedReport = orphans;
+    currentAdditionalEmployees = [];
+    rebuildTreeNodeIndex();
+    rebuildEmployeeIndex();
+    podAggregates = computePodAggregates();
+    searchIndex = null; // The index rows no longer match the patched records
+    labelForest();
+    currentGlobalPartnerTrees.forEach(root => {
+        root.indirect_coachee_count = countAllDescendants(root);
+    });
+    currentGlobalPartnerTrees.forEach(updateDirectCountsRecursive);
+
+    saveChangeLog();
+    savePodChangeLog();
+    return {
+        hires: patch.hires.length,
+        leavers: patch.leavers.length,
+        coachChanges: patch.coach_changes.length,
+        podChanges: patch.pod_changes.length,
+        fieldChanges: patch.field_changes.length,
+        alreadyAppliedMoves: alreadyAppliedCoach.size + alreadyAppliedPod.size
+    };
+}
+
 function countAllDescendants(node) {
+    if (hasIntervalLabels(node)) {
+        return node.interval_end - node.interval_start;
+    }
     let count = 0;
     if (node.children && node.children.length > 0) {
         count += node.children.length; 
@@ -158,6 +700,7 @@ function applyLoggedChanges() {
                  newCoachNode.children.push(employeeNode);
             }
             employeeNode.coach_id = log.new_coach_id; 
+            relabelAfterMove(employeeNode, newCoachNode);
         } else {
             console.warn("Could not apply a logged change during initial load; employee, old coach, or new coach not found:", log);
         }
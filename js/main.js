@@ -11,6 +11,7 @@ let podChangeLog = [];
 const LOCAL_STORAGE_KEY_MOVES = 'coachingForestMovesLog';
 const LOCAL_STORAGE_KEY_POD_MOVES = 'coachingForestPodMovesLog';
 const PARTNER_LEVEL_VALUE = 'Partner';
+const EMPLOYEE_SEARCH_DELAY_MS = 200;
 
 // --- DOM Elements for Move Employee Feature & Context Menu ---
 let tempMovesLogTableBody, clearTempMovesButton;
@@ -36,7 +37,7 @@ const config = {
 const tooltip = d3.select("#metadata-tooltip");
 
 // Load data and initialize visualization
-d3.json("forest.json?" + new Date().getTime()).then(async function(data) { 
+loadInitialForestData().then(async function(data) { 
     // --- Initialize Coach Move Elements ---
     moveEmployeeModal = document.getElementById('moveEmployeeModal');
     const coachMoveCloseButton = moveEmployeeModal.querySelector('.close-button');
@@ -71,6 +72,8 @@ d3.json("forest.json?" + new Date().getTime()).then(async function(data) {
     document.getElementById('clear-pod-moves-button').onclick = clearPodMoves;
     document.getElementById('download-coaching-moves-csv').onclick = () => downloadCSV(changeLog, 'coaching_moves.csv');
     document.getElementById('download-pod-moves-csv').onclick = () => downloadCSV(Object.values(podChangeLog), 'pod_moves.csv');
+    document.getElementById('import-pod-moves-input').onchange = (event) => importPodChangeLog(event.target.files[0]);
+    document.getElementById('forest-patch-input').onchange = (event) => importForestPatch(event.target.files[0]);
     document.getElementById('download-all-employees-csv').onclick = downloadAllEmployeesCSV;
 
     contextMenuMoveItem.onclick = function() {
@@ -102,11 +105,8 @@ d3.json("forest.json?" + new Date().getTime()).then(async function(data) {
     if (!data || !data.all_partner_trees || data.all_partner_trees.length === 0) {
         console.error("No 'all_partner_trees' data found in forest.json or it is empty.");
         d3.select("#chart-container").text("Error: No Partner tree data to display. Check forest.json.");
-        currentOrphanedReport = (data && data.all_orphaned_employees) ? data.all_orphaned_employees : [];
-    } else {
-         currentGlobalPartnerTrees = (data && data.all_partner_trees) ? data.all_partner_trees : [];
-         currentOrphanedReport = (data && data.all_orphaned_employees) ? data.all_orphaned_employees : [];
     }
+    setForestData(data);
 
     // --- Apply Changes and Render ---
     loadChangeLog();
@@ -114,41 +114,52 @@ d3.json("forest.json?" + new Date().getTime()).then(async function(data) {
     applyLoggedChanges();
     applyPodLoggedChanges();
 
-    populateOUSelector(currentGlobalPartnerTrees); 
+    populateOUSelector(currentGlobalPartnerTrees, shardManifest ? shardManifest.operating_units.map(unit => unit.name) : null); 
     currentSelectedOU = d3.select("#ou-selector").property("value"); 
     filterAndDisplayData(); 
 
     updateOrphanedReportDisplay();
-    const allEmployees = getUniqueEmployees();
-    renderPartnerPods(allEmployees, currentGlobalPartnerTrees);
+    renderPartnerPods(currentGlobalPartnerTrees);
     
     // --- New "All Employees" Tab Logic ---
-    const locations = new Set(allEmployees.map(e => e['Location  Name']).filter(Boolean));
-    const talentGroups = new Set(allEmployees.map(e => e.talent_group).filter(Boolean));
-    populateFilter("#location-filter", locations, "All Locations");
-    populateFilter("#talent-group-filter", talentGroups, "All Talent Groups");
-    renderAllEmployeesList(allEmployees, currentGlobalPartnerTrees);
+    populateEmployeeFilters();
+    renderAllEmployeesList(currentGlobalPartnerTrees);
 
     d3.select("#filter-employees-button").on("click", () => {
-        renderAllEmployeesList(getUniqueEmployees(), currentGlobalPartnerTrees);
+        renderAllEmployeesList(currentGlobalPartnerTrees);
     });
      d3.select("#clear-filters-button").on("click", () => {
         d3.select("#location-filter").property("value", "all");
         d3.select("#talent-group-filter").property("value", "all");
-        renderAllEmployeesList(getUniqueEmployees(), currentGlobalPartnerTrees);
+        d3.select("#level-filter").property("value", "all");
+        d3.select("#pod-status-filter").property("value", "all");
+        d3.select("#employee-search").property("value", "");
+        renderAllEmployeesList(currentGlobalPartnerTrees);
+    });
+    // Search as you type, once typing pauses
+    let employeeSearchTimer = null;
+    d3.select("#employee-search").on("input", () => {
+        clearTimeout(employeeSearchTimer);
+        employeeSearchTimer = setTimeout(() => renderAllEmployeesList(currentGlobalPartnerTrees), EMPLOYEE_SEARCH_DELAY_MS);
     });
     // --- End New Logic ---
 
     renderChangeLogTable();
     renderPodChangeLogTable();
 
-    d3.select("#ou-selector").on("change", function() {
+    d3.select("#ou-selector").on("change", async function() {
         currentSelectedOU = d3.select(this).property("value");
+        if (shardManifest) {
+            // Only the selected OU's shard is in memory: swap it in and replay the logs on it.
+            setForestData(await fetchShard(currentSelectedOU));
+            applyLoggedChanges();
+            applyPodLoggedChanges();
+            populateEmployeeFilters();
+        }
         filterAndDisplayData();
         updateOrphanedReportDisplay();
-        const allEmployees = getUniqueEmployees();
-        renderPartnerPods(allEmployees, currentGlobalPartnerTrees);
-        renderAllEmployeesList(allEmployees, currentGlobalPartnerTrees); // Update on OU change
+        renderPartnerPods(currentGlobalPartnerTrees);
+        renderAllEmployeesList(currentGlobalPartnerTrees); // Update on OU change
     });
     
     d3.select("#tree-selector").on("change", function() {
@@ -161,6 +172,9 @@ d3.json("forest.json?" + new Date().getTime()).then(async function(data) {
         }
     });
 
+    // When served by serve_forest.py, pick up rebuilt data as soon as it is published.
+    watchForestChanges(reloadForestData);
+
 }).catch(function(error) {
     console.error("Error loading or processing forest.json:", error);
     d3.select("#partnerTreesTab").html("Error loading forest.json. See console for details.");
@@ -228,6 +242,7 @@ function confirmMove() {
     }
     
     employeeNodeInMemory.coach_id = newPartnerId;
+    relabelAfterMove(employeeNodeInMemory, newCoachNode);
 
     if (originalCoachNode) {
         originalCoachNode.direct_coachee_count = originalCoachNode.children ? originalCoachNode.children.length : 0;
@@ -288,6 +303,9 @@ function confirmMove() {
 
 function isDescendant(ancestorNode, potentialDescendant) {
     if (!ancestorNode || !potentialDescendant) return false;
+    if (hasIntervalLabels(ancestorNode) && hasIntervalLabels(potentialDescendant)) {
+        return isUnder(potentialDescendant, ancestorNode);
+    }
     if (!ancestorNode.children || ancestorNode.children.length === 0) {
         return false;
     }
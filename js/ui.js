@@ -105,14 +105,25 @@ function renderOrphanedReportTable(orphanedData) {
         .text(d_cell => d_cell.value);
 }
 
-function populateOUSelector(allPartnerData) {
+function defaultOperatingUnit(operatingUnits) {
+    const sortedOperatingUnits = Array.from(operatingUnits).sort();
+    if (sortedOperatingUnits.includes("T&T Artificial Intelligence & Data")) {
+        return "T&T Artificial Intelligence & Data";
+    }
+    return sortedOperatingUnits.length > 0 ? sortedOperatingUnits[0] : null;
+}
+
+function populateOUSelector(allPartnerData, operatingUnitNames) {
     const ouSelector = d3.select("#ou-selector");
-    const operatingUnits = new Set();
-    allPartnerData.forEach(partner => {
-        if (partner['Operating Unit Name']) {
-            operatingUnits.add(partner['Operating Unit Name']);
-        }
-    });
+    // In shard mode the manifest lists every OU, while only one OU's partners are loaded.
+    const operatingUnits = new Set(operatingUnitNames || []);
+    if (!operatingUnitNames) {
+        allPartnerData.forEach(partner => {
+            if (partner['Operating Unit Name']) {
+                operatingUnits.add(partner['Operating Unit Name']);
+            }
+        });
+    }
 
     ouSelector.selectAll("option").remove(); 
 
@@ -125,11 +136,7 @@ function populateOUSelector(allPartnerData) {
     });
 
     if (sortedOperatingUnits.length > 0) {
-        if (operatingUnits.has("T&T Artificial Intelligence & Data")) {
-            ouSelector.property("value", "T&T Artificial Intelligence & Data");
-        } else {
-            ouSelector.property("value", sortedOperatingUnits[0]); 
-        }
+        ouSelector.property("value", defaultOperatingUnit(sortedOperatingUnits));
     } else {
          ouSelector.append("option").text("No Operating Units Found");
     }
@@ -198,7 +205,27 @@ function updateOrphanedReportDisplay() {
     }
 }
 
-function renderPartnerPods(allEmployees, allPartners) {
+// One-line summary of the OU's pod sizes, from its pod size distribution.
+function describePodSizes(ou, podCount, errorCount) {
+    const unit = podAggregates.operatingUnits.get(ou);
+    if (!podCount || !unit) {
+        return `No Partner Pods found for ${ou}.`;
+    }
+    const sizes = Array.from(unit.pod_size_distribution.keys()).sort((a, b) => a - b);
+    let remaining = Math.floor(podCount / 2);
+    let median = sizes[sizes.length - 1];
+    for (const size of sizes) {
+        remaining -= unit.pod_size_distribution.get(size);
+        if (remaining < 0) {
+            median = size;
+            break;
+        }
+    }
+    return `${ou} has ${podCount} Partner Pods of ${sizes[0]} to ${sizes[sizes.length - 1]} members (median ${median}); ` +
+        `${errorCount} employee(s) have a pod relationship issue.`;
+}
+
+function renderPartnerPods(allPartners) {
     const container = d3.select("#pods-container");
     container.selectAll("*").remove();
 
@@ -207,33 +234,15 @@ function renderPartnerPods(allEmployees, allPartners) {
         return;
     }
 
+    // Rosters and error lists come from the pod aggregates, which pod moves keep current.
     const ouPartners = allPartners.filter(p => p['Operating Unit Name'] === currentSelectedOU);
-    const ouPartnerIds = new Set(ouPartners.map(p => p.id));
+    const errors = getPodErrors(currentSelectedOU);
+    container.append('p').text(describePodSizes(currentSelectedOU, ouPartners.length, errors.length));
 
-    const pods = {};
-    ouPartnerIds.forEach(id => pods[id] = []); // Initialize all pods for the OU
-
-    const errors = [];
-
-    allEmployees.forEach(emp => {
-        const podId = emp.partner_relationship_id;
-        const status = emp.pod_relationship_status;
-
-        // Add to a pod if their partner is in the currently selected OU
-        if ((status === 'valid' || status === 'warning_different_offering') && ouPartnerIds.has(podId)) {
-            pods[podId].push(emp);
-        }
-
-        // Add to the error list if they are FROM the current OU and have any non-valid status
-        if (emp['Operating Unit Name'] === currentSelectedOU && status !== 'valid') {
-            errors.push(emp);
-        }
-    });
-
-    ouPartners.sort((a, b) => (pods[b.id] || []).length - (pods[a.id] || []).length);
+    ouPartners.sort((a, b) => getPodSize(b.id) - getPodSize(a.id));
 
     ouPartners.forEach(partner => {
-        const podMembers = pods[partner.id] || [];
+        const podMembers = getPodMembers(partner.id);
         const podContainer = container.append('div').attr('class', 'pod-container');
         const header = podContainer.append('div').attr('class', 'pod-header');
 
@@ -498,13 +507,6 @@ function showMovePodModal(employeesToMove) {
     }
     
     const firstEmployee = employeesToMove[0];
-    const allEmployeesForPods = getUniqueEmployees();
-    const ouPartners = currentGlobalPartnerTrees.filter(p => p['Operating Unit Name'] === currentSelectedOU);
-    const ouPartnerIds = new Set(ouPartners.map(p => p.id));
-    const unassignedList = allEmployeesForPods.filter(emp => {
-        const podId = emp.partner_relationship_id;
-        return emp['Operating Unit Name'] === currentSelectedOU && emp.level !== PARTNER_LEVEL_VALUE && (podId ? !ouPartnerIds.has(podId) || !emp.is_pod_relationship_valid : true);
-    });
     const employeeLocation = firstEmployee['Location  Name'];
 
     // When moving from the "All Employees" or "Partner Pods" view, the target OU should always be the one selected in the main filter.
@@ -525,12 +527,10 @@ function showMovePodModal(employeesToMove) {
     });
 
     newPodPartnerSelector.innerHTML = '<option value="">Select New Partner...</option>';
-    const podSizes = getPodSizes(allEmployeesForPods);
-
     eligiblePartners.forEach(p => {
         const option = document.createElement('option');
         option.value = p.id;
-        const podSize = podSizes[p.id] || 0;
+        const podSize = getPodSize(p.id);
         let text = `${p.name} (${p['Location  Name']}) - Pod Size: ${podSize}`;
         if (p['Location  Name'] !== employeeLocation) {
             text += ' - Different Location';
@@ -555,8 +555,6 @@ function confirmPodMove() {
         return;
     }
 
-    const allEmployeesFromSource = getUniqueEmployees();
-
     currentEmployeeToMovePod.forEach(employeeToMove => {
         // If the employee is already in the log, we just update their final destination.
         if (podChangeLog[employeeToMove.id]) {
@@ -565,7 +563,7 @@ function confirmPodMove() {
             podChangeLog[employeeToMove.id].timestamp = new Date().toISOString();
         } else {
             // If it's a new move, we need to find their ORIGINAL partner from the source data.
-            const originalEmployeeState = allEmployeesFromSource.find(e => e.id === employeeToMove.id);
+            const originalEmployeeState = employeeIndex.get(employeeToMove.id);
             const originalPartnerId = originalEmployeeState ? originalEmployeeState.partner_relationship_id : null;
             const originalPartner = originalPartnerId ? findNodeById(currentGlobalPartnerTrees, originalPartnerId) : null;
             const originalPartnerName = originalPartner ? originalPartner.name : "N/A";
@@ -582,18 +580,13 @@ function confirmPodMove() {
         }
         
         // Apply the change visually for immediate feedback
-        employeeToMove.partner_relationship_id = newPartnerId;
-        employeeToMove.partner_relationship_name = newPartnerNode.name;
-        employeeToMove.is_pod_relationship_valid = true;
-        employeeToMove.pod_relationship_status = 'valid';
-        employeeToMove.isMoved = true;
+        movePodMember(employeeToMove, newPartnerId, newPartnerNode.name);
     });
 
     savePodChangeLog();
     renderPodChangeLogTable();
-    const allEmployees = getUniqueEmployees(); // Re-fetch to ensure current state
-    renderPartnerPods(allEmployees, currentGlobalPartnerTrees);
-    renderAllEmployeesList(allEmployees, currentGlobalPartnerTrees);
+    renderPartnerPods(currentGlobalPartnerTrees);
+    renderAllEmployeesList(currentGlobalPartnerTrees);
 
     movePodMemberModal.style.display = "none";
     currentEmployeeToMovePod = null;
@@ -628,6 +621,108 @@ function renderPodChangeLogTable() {
     });
 }
 
+// Re-renders every view after the loaded forest was replaced or patched, keeping the selected OU and tree.
+function refreshForestViews(selectedOU, selectedTreeId) {
+    populateOUSelector(currentGlobalPartnerTrees, null);
+    if (selectedOU && d3.select("#ou-selector").selectAll("option").filter(function() { return this.value === selectedOU; }).size() > 0) {
+        d3.select("#ou-selector").property("value", selectedOU);
+        currentSelectedOU = selectedOU;
+    }
+    filterAndDisplayData();
+    const selectedTree = findNodeById(currentGlobalPartnerTrees, selectedTreeId);
+    if (selectedTree && selectedTree['Operating Unit Name'] === currentSelectedOU) {
+        d3.select("#tree-selector").property("value", selectedTreeId);
+        loadTree(selectedTree);
+    }
+    updateOrphanedReportDisplay();
+    renderPartnerPods(currentGlobalPartnerTrees);
+    populateEmployeeFilters();
+    renderAllEmployeesList(currentGlobalPartnerTrees);
+    renderChangeLogTable();
+    renderPodChangeLogTable();
+}
+
+// Called when serve_forest.py publishes a rebuilt forest: refetch it and replay the local move logs on top.
+async function reloadForestData() {
+    const selectedOU = currentSelectedOU;
+    const selectedTreeId = d3.select("#tree-selector").property("value");
+    let data;
+    try {
+        data = await fetchForestJson();
+    } catch (e) {
+        console.error("Could not reload the rebuilt forest.json:", e);
+        return;
+    }
+    setForestData(data);
+    applyLoggedChanges();
+    applyPodLoggedChanges();
+    refreshForestViews(selectedOU, selectedTreeId);
+    console.info(`Reloaded forest.json (${forestEtag}).`);
+}
+
+function importForestPatch(file) {
+    if (!file) return;
+    if (shardManifest) {
+        alert("Snapshot patches apply to the full forest.json; reload the page to pick up the new shards instead.");
+        return;
+    }
+    const reader = new FileReader();
+    reader.onload = () => {
+        let patch;
+        try {
+            patch = JSON.parse(reader.result);
+        } catch (e) {
+            alert("Could not read the patch file: it is not valid JSON.");
+            return;
+        }
+        const loadedCount = getUniqueEmployees().length;
+        if (patch.base && patch.base.employee_count !== loadedCount &&
+            !confirm(`This patch was made against a snapshot of ${patch.base.employee_count} employees, but ${loadedCount} are loaded. Apply it anyway?`)) {
+            return;
+        }
+        const selectedOU = currentSelectedOU;
+        const selectedTreeId = d3.select("#tree-selector").property("value");
+        let summary;
+        try {
+            summary = applyForestPatch(patch);
+        } catch (e) {
+            alert(`Could not apply the patch: ${e.message}`);
+            return;
+        }
+
+        refreshForestViews(selectedOU, selectedTreeId);
+        alert(`Patch applied: ${summary.hires} hire(s), ${summary.leavers} leaver(s), ${summary.coachChanges} coach change(s), ` +
+              `${summary.podChanges} pod change(s), ${summary.fieldChanges} other update(s). ` +
+              `${summary.alreadyAppliedMoves} logged move(s) were already in the new snapshot and have been removed from the logs.`);
+    };
+    reader.readAsText(file);
+}
+
+// Loads a pod change log (e.g. the proposal written by rebalance_pods.py) on top of the current one.
+function importPodChangeLog(file) {
+    if (!file) return;
+    const reader = new FileReader();
+    reader.onload = () => {
+        let importedLog;
+        try {
+            importedLog = JSON.parse(reader.result);
+        } catch (e) {
+            alert("Could not read the pod moves file: it is not valid JSON.");
+            return;
+        }
+        if (!importedLog || Array.isArray(importedLog) || typeof importedLog !== 'object') {
+            alert("The pod moves file must map employee IDs to pod moves.");
+            return;
+        }
+        const moves = Object.values(importedLog).filter(log => log && log.moved_employee_id && log.new_partner_id);
+        if (!confirm(`Apply ${moves.length} proposed pod move(s)? Existing moves for the same employees will be replaced.`)) return;
+        moves.forEach(log => { podChangeLog[log.moved_employee_id] = log; });
+        savePodChangeLog();
+        window.location.reload();
+    };
+    reader.readAsText(file);
+}
+
 function clearPodMoves() {
     if (confirm("Are you sure you want to clear all temporary pod moves?")) {
         podChangeLog = {};
@@ -766,30 +861,42 @@ function downloadCSV(data, filename) {
         document.body.removeChild(link);
     }
 }
-function populateFilter(selectorId, values, defaultOptionText) {
+const POD_STATUS_LABELS = {
+    valid: 'Valid',
+    warning_different_offering: 'Different Offering',
+    error_invalid_id: 'Invalid Partner'
+};
+
+function populateEmployeeFilters() {
+    populateFilter("#location-filter", getEmployeeFieldValues('location'), "All Locations");
+    populateFilter("#talent-group-filter", getEmployeeFieldValues('talent_group'), "All Talent Groups");
+    populateFilter("#level-filter", getEmployeeFieldValues('level'), "All Levels");
+    populateFilter("#pod-status-filter", getEmployeeFieldValues('pod_status'), "All Pod Statuses", POD_STATUS_LABELS);
+}
+
+function populateFilter(selectorId, values, defaultOptionText, labels = {}) {
     const selector = d3.select(selectorId);
     selector.selectAll("option").remove();
     selector.append("option").attr("value", "all").text(defaultOptionText);
     const sortedValues = Array.from(values).sort();
     sortedValues.forEach(value => {
-        selector.append("option").attr("value", value).text(value);
+        selector.append("option").attr("value", value).text(labels[value] || value);
     });
 }
+
+// Employees of the selected OU matching the All Employees filters and search box.
+function getFilteredEmployees() {
+    return findEmployees({
+        operating_unit: currentSelectedOU,
+        location: d3.select("#location-filter").property("value"),
+        talent_group: d3.select("#talent-group-filter").property("value"),
+        level: d3.select("#level-filter").property("value"),
+        pod_status: d3.select("#pod-status-filter").property("value")
+    }, d3.select("#employee-search").property("value"));
+}
 function downloadAllEmployeesCSV() {
-    const allEmployees = getUniqueEmployees(); 
     const allPartners = currentGlobalPartnerTrees.filter(p => p.level === PARTNER_LEVEL_VALUE);
-
-    const locationFilter = d3.select("#location-filter").property("value");
-    const talentGroupFilter = d3.select("#talent-group-filter").property("value");
-
-    let filteredEmployees = allEmployees.filter(emp => emp['Operating Unit Name'] === currentSelectedOU);
-
-    if (locationFilter && locationFilter !== 'all') {
-        filteredEmployees = filteredEmployees.filter(emp => emp['Location  Name'] === locationFilter);
-    }
-    if (talentGroupFilter && talentGroupFilter !== 'all') {
-        filteredEmployees = filteredEmployees.filter(emp => emp.talent_group === talentGroupFilter);
-    }
+    const filteredEmployees = getFilteredEmployees();
 
     const headers = [
         "Employee ID", "Name", "Level", "Location", "Talent Group", "Offering",
@@ -799,7 +906,7 @@ function downloadAllEmployeesCSV() {
     ];
 
     const data = filteredEmployees.map(emp => {
-        const coach = allEmployees.find(e => e.id === emp.coach_id);
+        const coach = employeeIndex.get(emp.coach_id);
         const coachingTreeLead = allPartners.find(p => p.id === emp.coaching_tree_partner_id);
         
         const podMove = podChangeLog[emp.id];
@@ -835,7 +942,7 @@ function downloadAllEmployeesCSV() {
 let allEmployeesSortKey = 'name';
 let allEmployeesSortAsc = true;
 
-function renderAllEmployeesList(allEmployees, allPartners) {
+function renderAllEmployeesList(allPartners) {
     const container = d3.select("#all-employees-container");
     container.selectAll("*").remove();
 
@@ -844,17 +951,7 @@ function renderAllEmployeesList(allEmployees, allPartners) {
         return;
     }
 
-    const locationFilter = d3.select("#location-filter").property("value");
-    const talentGroupFilter = d3.select("#talent-group-filter").property("value");
-
-    let filteredEmployees = allEmployees.filter(emp => emp['Operating Unit Name'] === currentSelectedOU);
-
-    if (locationFilter !== 'all') {
-        filteredEmployees = filteredEmployees.filter(emp => emp['Location  Name'] === locationFilter);
-    }
-    if (talentGroupFilter !== 'all') {
-        filteredEmployees = filteredEmployees.filter(emp => emp.talent_group === talentGroupFilter);
-    }
+    const filteredEmployees = getFilteredEmployees();
 
     // Sorting logic
     filteredEmployees.sort((a, b) => {
@@ -924,7 +1021,7 @@ function renderAllEmployeesList(allEmployees, allPartners) {
                 allEmployeesSortKey = d.key;
                 allEmployeesSortAsc = true;
             }
-            renderAllEmployeesList(allEmployees, allPartners);
+            renderAllEmployeesList(allPartners);
         })
         .html(d => {
             let sortIndicator = '';
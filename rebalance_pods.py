@@ -0,0 +1,341 @@
+import argparse
+import heapq
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from build_forest import (
+    EXCEL_FILE_PATH, INPUT_READER, INPUT_READERS, PARSE_CACHE_DIR, PARTNER_LEVEL_VALUE,
+    load_employee_data_cached, split_retired_partners, validate_data, build_forest_output
+)
+
+# --- Configuration ---
+POD_CHANGE_LOG_PATH = 'pod_rebalance_moves.json'
+
+# Costs of the flow model. Filling every pod up to its minimum size dominates everything,
+# then the number of moves, then keeping people in a pod led from their own location.
+MOVE_COST = 10
+LOCATION_MISMATCH_COST = 3
+MANDATORY_SEAT_COST = -1_000_000 # Seats below a pod's minimum size (filled first)
+OVERFLOW_SEAT_COST = 1_000_000   # Seats above a pod's maximum size (used only when unavoidable)
+
+# Pods may be this many members away from their target size
+DEFAULT_SIZE_TOLERANCE = 1
+
+# --- 1. Min-Cost Flow ---
+def new_flow_graph(node_count):
+    """Returns an empty residual graph; edge e and its reverse edge e ^ 1 are stored side by side."""
+    return {'adj': [[] for _ in range(node_count)], 'to': [], 'cap': [], 'cost': []}
+
+def add_flow_edge(graph, u, v, capacity, cost):
+    """Adds an edge u -> v and returns its index (its flow is graph['cap'][index ^ 1])."""
+    index = len(graph['to'])
+    graph['adj'][u].append(index)
+    graph['adj'][v].append(index + 1)
+    graph['to'].extend((v, u))
+    graph['cap'].extend((capacity, 0))
+    graph['cost'].extend((cost, -cost))
+    return index
+
+def solve_min_cost_flow(graph, source, sink, amount):
+    """
+    Sends `amount` units from source to sink at minimum cost (primal-dual).
+    Bellman-Ford seeds the node potentials, since the model has negative edge costs. Each
+    round then runs Dijkstra on reduced costs and saturates every shortest path at once with
+    blocking flows over the zero-reduced-cost edges, so the number of Dijkstra rounds is the
+    number of distinct path costs rather than the number of augmenting paths.
+    Returns (flow sent, total cost).
+    """
+    adj, to, cap, cost = graph['adj'], graph['to'], graph['cap'], graph['cost']
+    node_count = len(adj)
+    inf = float('inf')
+
+    potential = [inf] * node_count
+    potential[source] = 0
+    for _ in range(node_count):
+        changed = False
+        for u in range(node_count):
+            if potential[u] == inf:
+                continue
+            for e in adj[u]:
+                if cap[e] > 0 and potential[u] + cost[e] < potential[to[e]]:
+                    potential[to[e]] = potential[u] + cost[e]
+                    changed = True
+        if not changed:
+            break
+    potential = [p if p != inf else 0 for p in potential]
+
+    def admissible(e, u):
+        return cap[e] > 0 and cost[e] + potential[u] - potential[to[e]] == 0
+
+    flow = 0
+    total_cost = 0
+    while flow < amount:
+        dist = [inf] * node_count
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for e in adj[u]:
+                if cap[e] <= 0:
+                    continue
+                v = to[e]
+                nd = d + cost[e] + potential[u] - potential[v]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        if dist[sink] == inf:
+            break
+        for v in range(node_count):
+            if dist[v] != inf:
+                potential[v] += dist[v]
+
+        # Blocking flows (Dinic) restricted to edges on shortest paths
+        while flow < amount:
+            level = [-1] * node_count
+            level[source] = 0
+            queue = [source]
+            for u in queue:
+                for e in adj[u]:
+                    if level[to[e]] < 0 and admissible(e, u):
+                        level[to[e]] = level[u] + 1
+                        queue.append(to[e])
+            if level[sink] < 0:
+                break
+            next_edge = [0] * node_count
+            while flow < amount:
+                path = []
+                u = source
+                while u != sink:
+                    edges = adj[u]
+                    while next_edge[u] < len(edges):
+                        e = edges[next_edge[u]]
+                        if level[to[e]] == level[u] + 1 and admissible(e, u):
+                            break
+                        next_edge[u] += 1
+                    if next_edge[u] < len(edges):
+                        path.append(edges[next_edge[u]])
+                        u = to[path[-1]]
+                    elif u == source:
+                        break
+                    else:
+                        level[u] = -1
+                        u = to[path.pop() ^ 1]
+                        next_edge[u] += 1
+                if u != sink:
+                    break
+                push = min(amount - flow, min(cap[e] for e in path))
+                for e in path:
+                    cap[e] -= push
+                    cap[e ^ 1] += push
+                    total_cost += push * cost[e]
+                flow += push
+    return flow, total_cost
+
+# --- 2. Pod Model ---
+def collect_pods_by_operating_unit(nodes):
+    """
+    Groups the forest's employees by Operating Unit.
+    Returns {ou: {'pods': {partner_id: location}, 'members': [node, ...]}}, where pods are led by
+    the OU's Partners and members are its non-Partner employees.
+    """
+    units = defaultdict(lambda: {'pods': {}, 'members': []})
+    for node in nodes.values():
+        ou = node.get('Operating Unit Name')
+        if ou is None:
+            continue
+        if node.get('level') == PARTNER_LEVEL_VALUE:
+            units[ou]['pods'][node['id']] = node.get('Location  Name')
+        else:
+            units[ou]['members'].append(node)
+    return dict(units)
+
+def pod_size_bounds(member_count, pod_count, target_size=None, tolerance=DEFAULT_SIZE_TOLERANCE):
+    """Returns the (minimum, maximum) pod size: the target (default: an even split) +/- tolerance."""
+    if target_size is None:
+        low, high = member_count // pod_count, -(-member_count // pod_count)
+    else:
+        low = high = target_size
+    return max(0, low - tolerance), high + tolerance
+
+def current_pod(member, pods):
+    """The member's pod if it is a valid pod of their own OU, else None (they must be placed)."""
+    if member.get('pod_relationship_status') != 'valid':
+        return None
+    pod_id = member.get('partner_relationship_id')
+    return pod_id if pod_id in pods else None
+
+# --- 3. Rebalancing ---
+def rebalance_operating_unit(pods, members, min_size, max_size):
+    """
+    Assigns every member of one OU to one of its pods, as a min-cost flow over
+    (current pod, location) classes:
+      class -> its own pod                 staying put (location mismatch cost only)
+      class -> location hub -> pod         moving to a pod led from the member's location
+      class -> any-location hub -> pod     moving anywhere else
+      pod -> sink                          min_size mandatory seats, then up to max_size, then overflow
+    Returns [(member node, new pod ID), ...] for the members who move.
+    """
+    classes = defaultdict(list)
+    for member in members:
+        classes[(current_pod(member, pods), member.get('Location  Name'))].append(member)
+    pod_ids = sorted(pods)
+    locations = sorted({loc for _, loc in classes} | set(pods.values()), key=str)
+    class_keys = sorted(classes, key=lambda key: (str(key[0]), str(key[1])))
+
+    # Node numbering: source, sink, one per class, per location hub, the any-location hub, per pod
+    source, sink = 0, 1
+    class_node = {key: 2 + i for i, key in enumerate(class_keys)}
+    hub_node = {loc: 2 + len(class_keys) + i for i, loc in enumerate(locations)}
+    any_hub = 2 + len(class_keys) + len(locations)
+    pod_node = {pod_id: any_hub + 1 + i for i, pod_id in enumerate(pod_ids)}
+    graph = new_flow_graph(any_hub + 1 + len(pod_ids))
+
+    stay_edges = {}
+    move_edges = {}
+    for key in class_keys:
+        pod_id, loc = key
+        size = len(classes[key])
+        add_flow_edge(graph, source, class_node[key], size, 0)
+        if pod_id is not None:
+            stay_cost = 0 if pods[pod_id] == loc else LOCATION_MISMATCH_COST
+            stay_edges[key] = add_flow_edge(graph, class_node[key], pod_node[pod_id], size, stay_cost)
+        move_edges[key] = [
+            (loc, add_flow_edge(graph, class_node[key], hub_node[loc], size, MOVE_COST)),
+            (None, add_flow_edge(graph, class_node[key], any_hub, size, MOVE_COST + LOCATION_MISMATCH_COST))
+        ]
+    hub_edges = defaultdict(list)
+    for pod_id in pod_ids:
+        hub_edges[pods[pod_id]].append((pod_id, add_flow_edge(graph, hub_node[pods[pod_id]], pod_node[pod_id], len(members), 0)))
+        hub_edges[None].append((pod_id, add_flow_edge(graph, any_hub, pod_node[pod_id], len(members), 0)))
+        add_flow_edge(graph, pod_node[pod_id], sink, min_size, MANDATORY_SEAT_COST)
+        add_flow_edge(graph, pod_node[pod_id], sink, max_size - min_size, 0)
+        add_flow_edge(graph, pod_node[pod_id], sink, len(members), OVERFLOW_SEAT_COST)
+
+    solve_min_cost_flow(graph, source, sink, len(members))
+    flow_on = lambda e: graph['cap'][e ^ 1]
+
+    # Pair the flow into each hub with the flow out of it (any pairing has the same cost)
+    arrivals = {hub: [[pod_id, flow_on(e)] for pod_id, e in edges if flow_on(e) > 0] for hub, edges in hub_edges.items()}
+    moves = []
+    for key in class_keys:
+        leaving = len(classes[key]) - (flow_on(stay_edges[key]) if key in stay_edges else 0)
+        if leaving == 0:
+            continue
+        destinations = []
+        for hub, e in move_edges[key]:
+            remaining = flow_on(e)
+            queue = arrivals.get(hub, [])
+            while remaining > 0 and queue:
+                taken = min(remaining, queue[0][1])
+                destinations.extend([queue[0][0]] * taken)
+                remaining -= taken
+                queue[0][1] -= taken
+                if queue[0][1] == 0:
+                    queue.pop(0)
+        # Prefer moving people into the pod of their own coaching tree, then by ID for stable output
+        candidates = sorted(classes[key], key=lambda m: m['id'])
+        for pod_id in destinations:
+            chosen = next((m for m in candidates if m.get('coaching_tree_partner_id') == pod_id), candidates[0])
+            candidates.remove(chosen)
+            moves.append((chosen, pod_id))
+    return moves
+
+def build_pod_change_log(moves, nodes, timestamp=None):
+    """Turns proposed moves into a change log keyed by employee ID, the shape of the UI's podChangeLog."""
+    timestamp = timestamp or datetime.now(timezone.utc).isoformat()
+    change_log = {}
+    for member, pod_id in sorted(moves, key=lambda move: move[0]['id']):
+        original_partner_id = member.get('partner_relationship_id')
+        original_partner = nodes.get(original_partner_id) if original_partner_id else None
+        change_log[member['id']] = {
+            'moved_employee_id': member['id'],
+            'moved_employee_name': member.get('name'),
+            'original_partner_id': original_partner_id,
+            'original_partner_name': original_partner['name'] if original_partner else "N/A",
+            'new_partner_id': pod_id,
+            'new_partner_name': nodes[pod_id].get('name'),
+            'timestamp': timestamp
+        }
+    return change_log
+
+def rebalance_pods(nodes, target_size=None, tolerance=DEFAULT_SIZE_TOLERANCE, operating_units=None):
+    """
+    Proposes pod reassignments for every Operating Unit (or only `operating_units`).
+    Returns (change_log, report), where report holds per-OU sizes and move counts.
+    """
+    all_moves = []
+    report = []
+    for ou, unit in sorted(collect_pods_by_operating_unit(nodes).items()):
+        if operating_units and ou not in operating_units:
+            continue
+        pods, members = unit['pods'], unit['members']
+        if not pods:
+            report.append({'operating_unit': ou, 'members': len(members), 'pods': 0, 'moves': 0,
+                           'note': "No Partners lead pods in this Operating Unit; members left as they are."})
+            continue
+        min_size, max_size = pod_size_bounds(len(members), len(pods), target_size, tolerance)
+        moves = rebalance_operating_unit(pods, members, min_size, max_size)
+        sizes_before = defaultdict(int)
+        for member in members:
+            pod_id = current_pod(member, pods)
+            if pod_id is not None:
+                sizes_before[pod_id] += 1
+        sizes_after = dict(sizes_before)
+        for member, pod_id in moves:
+            old_pod = current_pod(member, pods)
+            if old_pod is not None:
+                sizes_after[old_pod] -= 1
+            sizes_after[pod_id] = sizes_after.get(pod_id, 0) + 1
+        out_of_range = lambda sizes: sum(1 for pod_id in pods if not min_size <= sizes.get(pod_id, 0) <= max_size)
+        report.append({
+            'operating_unit': ou,
+            'members': len(members),
+            'pods': len(pods),
+            'size_range': [min_size, max_size],
+            'moves': len(moves),
+            'pods_out_of_range_before': out_of_range(sizes_before),
+            'pods_out_of_range_after': out_of_range(sizes_after)
+        })
+        all_moves.extend(moves)
+    return build_pod_change_log(all_moves, nodes), report
+
+# --- 4. Main Execution Flow ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propose pod reassignments that bring every pod to its target size.")
+    parser.add_argument('--input', default=EXCEL_FILE_PATH, help="Employee input file (.xlsx, .csv or .parquet).")
+    parser.add_argument('--reader', default=INPUT_READER, choices=INPUT_READERS, help="Input reader backend.")
+    parser.add_argument('--cache-dir', default=PARSE_CACHE_DIR, help="Directory of the parsed-input cache.")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the input file, bypassing the cache.")
+    parser.add_argument('--output', default=POD_CHANGE_LOG_PATH, help="Path of the proposed pod change log (JSON).")
+    parser.add_argument('--target-size', type=int, default=None, help="Target pod size (default: an even split per Operating Unit).")
+    parser.add_argument('--tolerance', type=int, default=DEFAULT_SIZE_TOLERANCE, help="Allowed distance from the target size.")
+    parser.add_argument('--operating-unit', action='append', default=None, help="Only rebalance this Operating Unit (repeatable).")
+    args = parser.parse_args()
+
+    employee_df_raw = load_employee_data_cached(args.input, args.reader, None if args.no_cache else args.cache_dir)
+    if employee_df_raw is None:
+        print("Rebalancing aborted due to data loading failure.")
+    else:
+        active_employee_df, retired_partners_map = split_retired_partners(employee_df_raw)
+        validated_df, validation_summary = validate_data(active_employee_df.copy())
+        if validation_summary.get("critical_errors", False) or validated_df is None:
+            print("Rebalancing aborted due to critical validation errors.")
+        else:
+            _, forest = build_forest_output(validated_df, retired_partners_map)
+            change_log, report = rebalance_pods(forest['nodes'], args.target_size, args.tolerance, args.operating_unit)
+            for unit in report:
+                if 'note' in unit:
+                    print(f"{unit['operating_unit']}: {unit['note']}")
+                    continue
+                print(f"{unit['operating_unit']}: {unit['members']} members in {unit['pods']} pods, "
+                      f"target size {unit['size_range'][0]}-{unit['size_range'][1]}, {unit['moves']} move(s); "
+                      f"pods out of range {unit['pods_out_of_range_before']} -> {unit['pods_out_of_range_after']}.")
+            try:
+                with open(args.output, 'w') as f:
+                    json.dump(change_log, f, indent=2)
+                print(f"Proposed {len(change_log)} pod move(s) written to '{args.output}'.")
+            except Exception as e:
+                print(f"Error writing pod change log: {e}")
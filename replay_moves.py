@@ -0,0 +1,274 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from build_forest import (
+    EXCEL_FILE_PATH, INPUT_READER, INPUT_READERS, PARSE_CACHE_DIR, PARTNER_LEVEL_VALUE,
+    load_employee_data_cached, split_retired_partners, validate_data, build_forest_output,
+    export_to_json, format_id, is_under, relabel_subtree_move
+)
+
+# --- Configuration ---
+WHATIF_FOREST_PATH = 'forest_whatif.json'
+REPLAY_REPORT_PATH = 'replay_report.json'
+
+# --- 1. Move Log Loading ---
+def load_move_log(path):
+    """
+    Reads a coach or pod move log exported from the web app.
+    Accepts the CSV downloads ('Download as CSV') and JSON, either a list of moves or the
+    {employee_id: move} object the pod log is stored as. Empty CSV cells become None.
+    """
+    try:
+        if path.lower().endswith('.csv'):
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                moves = [{key: (value if value != '' else None) for key, value in row.items()} for row in csv.DictReader(f)]
+        else:
+            with open(path) as f:
+                moves = json.load(f)
+            if isinstance(moves, dict):
+                moves = list(moves.values())
+    except Exception as e:
+        print(f"Error reading move log '{path}': {e}")
+        return None
+    # IDs arrive as strings, numbers or '123.0' depending on the export path
+    for move in moves:
+        for key in ('moved_employee_id', 'original_coach_id', 'new_coach_id', 'original_partner_id', 'new_partner_id'):
+            if key in move:
+                move[key] = format_id(move[key])
+    return moves
+
+# --- 2. Replay Against the In-Memory Forest ---
+def would_create_cycle(employee, new_coach, nodes):
+    """
+    True when `new_coach` is `employee` or sits below them. Inside the Partner trees this is
+    the O(1) interval check; elsewhere it walks up the coaching chain from the new coach.
+    """
+    if new_coach is employee:
+        return True
+    if 'interval_root_id' in employee and 'interval_root_id' in new_coach:
+        return is_under(new_coach, employee)
+    current = new_coach
+    seen = set()
+    while current is not None and current['id'] not in seen:
+        if current is employee:
+            return True
+        if current.get('level') == PARTNER_LEVEL_VALUE:
+            return False
+        seen.add(current['id'])
+        current = nodes.get(current.get('coach_id'))
+    return False
+
+def replay_coach_moves(nodes, moves):
+    """
+    Applies coach moves in log order to the forest's node index (re-linking children and
+    relabelling intervals as the browser would), skipping moves that cannot be applied.
+    Returns (final {employee_id: (coach_id, coach_name)}, rejected moves with reasons).
+    """
+    final_coaches = {}
+    rejected = []
+    for move in moves:
+        employee = nodes.get(move.get('moved_employee_id'))
+        new_coach = nodes.get(move.get('new_coach_id'))
+        reason = None
+        if employee is None:
+            reason = "Employee not found in the data."
+        elif new_coach is None:
+            reason = "New coach not found in the data."
+        elif employee.get('level') == PARTNER_LEVEL_VALUE:
+            reason = "Partners are the roots of their trees and cannot be given a coach."
+        elif would_create_cycle(employee, new_coach, nodes):
+            reason = f"Would create a coaching cycle: {new_coach.get('name')} is {employee.get('name')} or one of their coachees."
+        if reason:
+            rejected.append({'move': move, 'reason': reason})
+            continue
+
+        old_root = nodes.get(employee.get('interval_root_id'))
+        new_root = nodes.get(new_coach.get('interval_root_id'))
+        old_coach = nodes.get(employee.get('coach_id'))
+        if old_coach is not None:
+            siblings = old_coach['children']
+            for index, child in enumerate(siblings):
+                if child is employee:
+                    del siblings[index]
+                    break
+        new_coach['children'].append(employee)
+        employee['coach_id'] = new_coach['id']
+        employee['coach_name'] = new_coach.get('name')
+        if old_root is not None or new_root is not None:
+            relabel_subtree_move(employee, old_root, new_root, new_coach)
+        final_coaches[employee['id']] = (new_coach['id'], new_coach.get('name'))
+    return final_coaches, rejected
+
+def replay_pod_moves(nodes, moves):
+    """
+    Applies pod moves in log order; the last move for an employee wins.
+    Returns (final {employee_id: (partner_id, partner_name)}, rejected moves with reasons).
+    """
+    final_pods = {}
+    rejected = []
+    for move in moves:
+        employee = nodes.get(move.get('moved_employee_id'))
+        new_partner = nodes.get(move.get('new_partner_id'))
+        if employee is None:
+            rejected.append({'move': move, 'reason': "Employee not found in the data."})
+        elif new_partner is None or new_partner.get('level') != PARTNER_LEVEL_VALUE:
+            rejected.append({'move': move, 'reason': "New pod partner is not an active Partner."})
+        else:
+            final_pods[employee['id']] = (new_partner['id'], new_partner.get('name'))
+    return final_pods, rejected
+
+def apply_overrides(active_df, overrides, id_column, name_column):
+    """Returns a copy of the frame with `id_column`/`name_column` replaced for the given employees."""
+    frame = active_df.copy()
+    if not overrides:
+        return frame
+    ids = frame['employee_id'].astype(str)
+    moved = ids.isin(overrides)
+    frame[id_column] = frame[id_column].astype(object)
+    frame.loc[moved, id_column] = ids[moved].map(lambda employee_id: overrides[employee_id][0])
+    if name_column in frame.columns:
+        frame[name_column] = frame[name_column].astype(object)
+        frame.loc[moved, name_column] = ids[moved].map(lambda employee_id: overrides[employee_id][1])
+    return frame
+
+# --- 3. What-If Report ---
+def snapshot_nodes(nodes):
+    """Per-employee values the report compares before and after the replay."""
+    return {
+        node_id: {
+            'direct': node.get('direct_coachee_count', 0),
+            'indirect': node.get('indirect_coachee_count', 0),
+            'pod_status': node.get('pod_relationship_status'),
+            'name': node.get('name')
+        }
+        for node_id, node in nodes.items()
+    }
+
+def compare_snapshots(before, after, orphans_before, orphans_after):
+    """Lists count changes, orphan changes and pod-status changes between two snapshots."""
+    count_changes = []
+    for node_id, new in after.items():
+        old = before.get(node_id)
+        if old and (old['direct'], old['indirect']) != (new['direct'], new['indirect']):
+            count_changes.append({
+                'id': node_id, 'name': new['name'],
+                'direct_before': old['direct'], 'direct_after': new['direct'],
+                'indirect_before': old['indirect'], 'indirect_after': new['indirect']
+            })
+    count_changes.sort(key=lambda change: (-abs(change['indirect_after'] - change['indirect_before']), change['id']))
+
+    def with_status(snapshot, status):
+        return {node_id for node_id, values in snapshot.items() if values['pod_status'] == status}
+
+    def describe(node_ids, snapshot):
+        return [{'id': node_id, 'name': snapshot[node_id]['name']} for node_id in sorted(node_ids)]
+
+    warnings_before = with_status(before, 'warning_different_offering')
+    warnings_after = with_status(after, 'warning_different_offering')
+    errors_before = with_status(before, 'error_invalid_id')
+    errors_after = with_status(after, 'error_invalid_id')
+    return {
+        'count_changes': count_changes,
+        'new_orphans': describe(orphans_after - orphans_before, after),
+        'resolved_orphans': describe(orphans_before - orphans_after, before),
+        'new_cross_offering_warnings': describe(warnings_after - warnings_before, after),
+        'resolved_cross_offering_warnings': describe(warnings_before - warnings_after, before),
+        'new_pod_errors': describe(errors_after - errors_before, after),
+        'resolved_pod_errors': describe(errors_before - errors_after, before)
+    }
+
+def replay_moves(active_df, retired_partners_map, coach_moves=(), pod_moves=()):
+    """
+    Replays coach and pod move logs against the validated data and rebuilds the forest.
+    Moves are applied in order to an ID-indexed in-memory forest (so each is checked against
+    the state the earlier ones left), then the resulting coach and pod assignments are
+    validated and built exactly as build_forest.py would.
+    Returns (output_data or None when the result fails validation, report).
+    """
+    validated_df, summary = validate_data(active_df.copy())
+    if summary.get("critical_errors", False) or validated_df is None:
+        return None, {'critical_errors': summary.get('errors', []), 'stage': 'baseline'}
+    baseline_output, forest = build_forest_output(validated_df, retired_partners_map)
+    before = snapshot_nodes(forest['nodes'])
+    orphans_before = {orphan['id'] for orphan in baseline_output['all_orphaned_employees']}
+
+    final_coaches, rejected_coach_moves = replay_coach_moves(forest['nodes'], coach_moves)
+    final_pods, rejected_pod_moves = replay_pod_moves(forest['nodes'], pod_moves)
+
+    scenario_df = apply_overrides(active_df, final_coaches, 'coach_id', 'coach_name')
+    scenario_df = apply_overrides(scenario_df, final_pods, 'partner_relationship_id', 'partner_relationship_name')
+    validated_scenario_df, scenario_summary = validate_data(scenario_df)
+    report = {
+        'coach_moves': {'submitted': len(coach_moves), 'applied_employees': len(final_coaches), 'rejected': rejected_coach_moves},
+        'pod_moves': {'submitted': len(pod_moves), 'applied_employees': len(final_pods), 'rejected': rejected_pod_moves},
+        'cycles': scenario_summary.get('cycle_members', [])
+    }
+    if scenario_summary.get("critical_errors", False) or validated_scenario_df is None:
+        report['critical_errors'] = scenario_summary.get('errors', [])
+        report['stage'] = 'scenario'
+        return None, report
+
+    output_data, scenario_forest = build_forest_output(validated_scenario_df, retired_partners_map)
+    orphans_after = {orphan['id'] for orphan in output_data['all_orphaned_employees']}
+    report.update(compare_snapshots(before, snapshot_nodes(scenario_forest['nodes']), orphans_before, orphans_after))
+    return output_data, report
+
+def print_replay_report(report):
+    """Prints a short summary of a what-if replay."""
+    print("\n--- What-If Replay Summary ---")
+    for log_name in ('coach_moves', 'pod_moves'):
+        log = report.get(log_name)
+        if log is None:
+            continue
+        print(f"{log_name.replace('_', ' ').capitalize()}: {log['submitted']} submitted, "
+              f"{log['applied_employees']} employee(s) moved, {len(log['rejected'])} rejected.")
+        for rejection in log['rejected'][:10]:
+            print(f"  - {rejection['move'].get('moved_employee_id')}: {rejection['reason']}")
+    if report.get('critical_errors'):
+        print("The scenario fails validation:")
+        for error in report['critical_errors']:
+            print(f"  - {error}")
+        return
+    if report['cycles']:
+        print(f"Coaching cycles: {len(report['cycles'])}")
+    print(f"Employees with changed coachee counts: {len(report['count_changes'])}")
+    print(f"Orphans: {len(report['new_orphans'])} new, {len(report['resolved_orphans'])} resolved.")
+    print(f"Cross-offering pod warnings: {len(report['new_cross_offering_warnings'])} new, "
+          f"{len(report['resolved_cross_offering_warnings'])} resolved.")
+    print(f"Invalid pod relationships: {len(report['new_pod_errors'])} new, {len(report['resolved_pod_errors'])} resolved.")
+    print("------------------------------\n")
+
+# --- 4. Main Execution Flow ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay exported coach and pod move logs and report the resulting forest.")
+    parser.add_argument('--input', default=EXCEL_FILE_PATH, help="Employee input file (.xlsx, .csv or .parquet).")
+    parser.add_argument('--reader', default=INPUT_READER, choices=INPUT_READERS, help="Input reader backend.")
+    parser.add_argument('--cache-dir', default=PARSE_CACHE_DIR, help="Directory of the parsed-input cache.")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the input file, bypassing the cache.")
+    parser.add_argument('--coach-moves', default=None, help="Coaching moves log (CSV or JSON).")
+    parser.add_argument('--pod-moves', default=None, help="Pod moves log (CSV or JSON).")
+    parser.add_argument('--output', default=WHATIF_FOREST_PATH, help="Path of the what-if forest JSON to write.")
+    parser.add_argument('--report', default=REPLAY_REPORT_PATH, help="Path of the detailed replay report (JSON).")
+    args = parser.parse_args()
+
+    coach_moves = load_move_log(args.coach_moves) if args.coach_moves else []
+    pod_moves = load_move_log(args.pod_moves) if args.pod_moves else []
+    employee_df_raw = load_employee_data_cached(args.input, args.reader, None if args.no_cache else args.cache_dir)
+    if employee_df_raw is None or coach_moves is None or pod_moves is None:
+        print("Replay aborted due to data loading failure.")
+    else:
+        active_employee_df, retired_partners_map = split_retired_partners(employee_df_raw)
+        output_data, report = replay_moves(active_employee_df, retired_partners_map, coach_moves, pod_moves)
+        print_replay_report(report)
+        export_ok = output_data is None or export_to_json(output_data, args.output)
+        try:
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Replay report written to '{os.path.abspath(args.report)}'.")
+        except Exception as e:
+            print(f"Error writing replay report: {e}")
+        if not export_ok:
+            sys.exit(1)
@@ -0,0 +1,272 @@
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from build_forest import (
+    EXCEL_FILE_PATH, INPUT_READER, INPUT_READERS, PARSE_CACHE_DIR, JSON_GZIP_LEVEL, JSON_SERIALIZER, JSON_SERIALIZERS,
+    load_employee_data_cached, split_retired_partners, validate_data, print_validation_summary,
+    build_forest_output, partition_by_tree_top, firm_partner_offerings, merge_partition_outputs,
+    json_encoder, write_json_stream, atomic_output
+)
+
+# --- Configuration ---
+SERVE_HOST = '127.0.0.1'
+SERVE_PORT = 8000
+SERVE_ROOT = os.path.dirname(os.path.abspath(__file__)) # index.html, js/ and css/ are served from here
+WATCH_INTERVAL_SECONDS = 1.0  # How often the input file is checked; a change must also hold for one interval
+SSE_HEARTBEAT_SECONDS = 15    # Keeps idle /events connections from timing out
+FOREST_URL_PATH = '/forest.json'
+EVENTS_URL_PATH = '/events'
+# The page would prefer a shard manifest left on disk by an earlier --shards build; the served
+# forest.json is always current, so shard requests are answered with 404 instead.
+HIDDEN_URL_PREFIXES = ('/forest_shards/',)
+
+# --- 1. Incremental Rebuild ---
+def new_serve_state():
+    """Shared state of the watcher and the request handlers, guarded by state['changed']."""
+    return {
+        'changed': threading.Condition(),
+        'version': 0,          # Bumped whenever the served forest changes
+        'etag': None,
+        'payload': None,       # Minified forest.json bytes
+        'gzip_payload': None,  # Compressed on first request
+        'built_at': None,
+        'last_error': None,
+        'partitions': {}       # Operating Unit -> (partition digest, forest.json structure)
+    }
+
+def partition_digest(partition_df, context_digest):
+    """Content hash of a validated partition: every row's values in order, plus the firm-wide context."""
+    row_hashes = pd.util.hash_pandas_object(partition_df, index=False).to_numpy()
+    digest = hashlib.sha256(row_hashes.tobytes())
+    digest.update(json.dumps(list(partition_df.columns)).encode('utf-8'))
+    digest.update(context_digest)
+    return digest.hexdigest()
+
+def rebuild_forest(input_path, reader, cache_dir, state, serializer=JSON_SERIALIZER, output_path=None):
+    """
+    Rebuilds the forest from the input file and publishes it when it changed.
+    Validation always runs over the whole frame. The tree work is split into the per-Operating-Unit
+    partitions of the parallel build, and a partition whose validated rows (and the firm-wide
+    Partner offerings and Retired Partners) are unchanged reuses its previous output.
+    Returns True when a new forest was published.
+    """
+    started = time.perf_counter()
+    employee_df_raw = load_employee_data_cached(input_path, reader, cache_dir)
+    if employee_df_raw is None:
+        state['last_error'] = f"Could not load '{input_path}'."
+        return False
+    active_employee_df, retired_partners_map = split_retired_partners(employee_df_raw)
+    validated_df, validation_summary = validate_data(active_employee_df.copy())
+    if validation_summary.get("critical_errors", False) or validated_df is None:
+        print_validation_summary(validation_summary)
+        state['last_error'] = "Critical validation errors; still serving the previous forest."
+        print(state['last_error'])
+        return False
+
+    partner_offerings = firm_partner_offerings(validated_df)
+    context_digest = hashlib.sha256(json.dumps([sorted(retired_partners_map.items()), sorted(partner_offerings.items())],
+                                               default=str).encode('utf-8')).digest()
+    previous_partitions = state['partitions']
+    partitions = {}
+    results = []
+    rebuilt = 0
+    for operating_unit, partition_df in partition_by_tree_top(validated_df):
+        digest = partition_digest(partition_df, context_digest)
+        cached = previous_partitions.get(operating_unit)
+        if cached and cached[0] == digest:
+            output_data = cached[1]
+        else:
+            output_data, _ = build_forest_output(partition_df, retired_partners_map, partner_offerings, aggregates=False)
+            rebuilt += 1
+        partitions[operating_unit] = (digest, output_data)
+        results.append(output_data)
+    output_data = merge_partition_outputs(validated_df, results)
+
+    buffer = io.BytesIO()
+    write_json_stream(output_data, buffer, json_encoder(serializer))
+    payload = buffer.getvalue()
+    etag = f'"{hashlib.sha256(payload).hexdigest()[:32]}"'
+    state['partitions'] = partitions
+    state['last_error'] = None
+    print(f"Rebuilt in {time.perf_counter() - started:.2f}s: {rebuilt} of {len(partitions)} Operating Unit partition(s) "
+          f"rebuilt, {len(partitions) - rebuilt} reused.")
+    if etag == state['etag']:
+        print("Forest data is unchanged; nothing to publish.")
+        return False
+
+    if output_path:
+        with atomic_output(output_path, output_path.endswith('.gz')) as f:
+            f.write(payload)
+    with state['changed']:
+        state['payload'] = payload
+        state['gzip_payload'] = None
+        state['etag'] = etag
+        state['built_at'] = datetime.now(timezone.utc).isoformat()
+        state['version'] += 1
+        state['changed'].notify_all()
+    print(f"Published forest version {state['version']} ({len(payload) / 2**20:.1f} MiB, ETag {etag}).")
+    return True
+
+def try_rebuild_forest(input_path, reader, cache_dir, state, serializer=JSON_SERIALIZER, output_path=None):
+    """rebuild_forest that logs a failure into state['last_error'] instead of raising; the previous forest stays served."""
+    try:
+        return rebuild_forest(input_path, reader, cache_dir, state, serializer, output_path)
+    except Exception as e:
+        state['last_error'] = f"Rebuild failed: {e}"
+        print(state['last_error'])
+        return False
+
+def input_signature(input_path):
+    """(modification time, size) of the input file, or None when it does not exist."""
+    try:
+        stat = os.stat(input_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def watch_input(input_path, reader, cache_dir, state, serializer=JSON_SERIALIZER, output_path=None,
+                interval=WATCH_INTERVAL_SECONDS):
+    """Polls the input file and rebuilds once a change has held steady for one interval (saves come in several writes)."""
+    built_signature = input_signature(input_path)
+    while True:
+        time.sleep(interval)
+        signature = input_signature(input_path)
+        if signature is None or signature == built_signature:
+            continue
+        time.sleep(interval)
+        if input_signature(input_path) != signature:
+            continue # Still being written
+        built_signature = signature
+        print(f"Input '{input_path}' changed; rebuilding...")
+        try_rebuild_forest(input_path, reader, cache_dir, state, serializer, output_path)
+
+# --- 2. HTTP Server ---
+def forest_event(state):
+    """The server-sent event announcing the current forest version."""
+    data = json.dumps({'version': state['version'], 'etag': state['etag'], 'built_at': state['built_at']})
+    return f"event: forest\nid: {state['version']}\ndata: {data}\n\n".encode('utf-8')
+
+def make_handler(state):
+    """Request handler class serving the web app, the in-memory forest.json and the /events stream."""
+    class ForestRequestHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=SERVE_ROOT, **kwargs)
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == FOREST_URL_PATH:
+                self.send_forest(include_body=True)
+            elif path == EVENTS_URL_PATH:
+                self.send_events()
+            elif path.startswith(HIDDEN_URL_PREFIXES):
+                self.send_error(HTTPStatus.NOT_FOUND, "Shards are not served in watch mode; forest.json is always current.")
+            else:
+                super().do_GET()
+
+        def do_HEAD(self):
+            path = self.path.split('?', 1)[0]
+            if path == FOREST_URL_PATH:
+                self.send_forest(include_body=False)
+            elif path.startswith(HIDDEN_URL_PREFIXES) or path == EVENTS_URL_PATH:
+                self.send_error(HTTPStatus.NOT_FOUND)
+            else:
+                super().do_HEAD()
+
+        def send_forest(self, include_body):
+            use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+            with state['changed']:
+                payload, etag = state['payload'], state['etag']
+                if payload is not None and use_gzip:
+                    if state['gzip_payload'] is None:
+                        state['gzip_payload'] = gzip.compress(payload, compresslevel=JSON_GZIP_LEVEL, mtime=0)
+                    payload = state['gzip_payload']
+            if payload is None:
+                self.send_error(HTTPStatus.SERVICE_UNAVAILABLE, state['last_error'] or "The forest has not been built yet.")
+                return
+            if_none_match = self.headers.get('If-None-Match', '')
+            not_modified = etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+            self.send_response(HTTPStatus.NOT_MODIFIED if not_modified else HTTPStatus.OK)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache') # Cache, but revalidate before every use
+            self.send_header('Vary', 'Accept-Encoding')
+            if not not_modified:
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                if use_gzip:
+                    self.send_header('Content-Encoding', 'gzip')
+            self.end_headers()
+            if include_body and not not_modified:
+                self.wfile.write(payload)
+
+        def send_events(self):
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            try:
+                with state['changed']:
+                    version = state['version']
+                    event = forest_event(state) if version else None
+                if event:
+                    self.wfile.write(event)
+                    self.wfile.flush()
+                while True:
+                    with state['changed']:
+                        state['changed'].wait_for(lambda: state['version'] != version, timeout=SSE_HEARTBEAT_SECONDS)
+                        changed = state['version'] != version
+                        version = state['version']
+                        event = forest_event(state) if changed else b": keep-alive\n\n"
+                    self.wfile.write(event)
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass # The page was closed or reloaded
+
+        def log_message(self, format, *args):
+            if not self.path.startswith(EVENTS_URL_PATH):
+                super().log_message(format, *args)
+
+    return ForestRequestHandler
+
+# --- 3. Main Execution Flow ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch the employee input file, rebuild the forest when it changes and serve the web app.")
+    parser.add_argument('--input', default=EXCEL_FILE_PATH, help="Employee input file (.xlsx, .csv or .parquet) to watch.")
+    parser.add_argument('--reader', default=INPUT_READER, choices=INPUT_READERS, help="Input reader backend.")
+    parser.add_argument('--cache-dir', default=PARSE_CACHE_DIR, help="Directory of the parsed-input cache.")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the input file, bypassing the cache.")
+    parser.add_argument('--json-serializer', default=JSON_SERIALIZER, choices=JSON_SERIALIZERS, help="JSON serializer for the forest.")
+    parser.add_argument('--output', default=None, help="Also write every published forest to this path (atomically).")
+    parser.add_argument('--host', default=SERVE_HOST, help="Address to listen on.")
+    parser.add_argument('--port', type=int, default=SERVE_PORT, help="Port to listen on.")
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL_SECONDS, help="Seconds between checks of the input file.")
+    args = parser.parse_args()
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    state = new_serve_state()
+    print(f"Building the forest from '{args.input}'...")
+    if not try_rebuild_forest(args.input, args.reader, cache_dir, state, args.json_serializer, args.output):
+        print("No forest to serve yet; /forest.json answers 503 until the input file changes and rebuilds.")
+    watcher = threading.Thread(target=watch_input, args=(args.input, args.reader, cache_dir, state, args.json_serializer,
+                                                         args.output, args.interval), daemon=True)
+    watcher.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    print(f"Serving the web app at http://{args.host}:{server.server_address[1]}/ (Ctrl+C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping.")
+    finally:
+        server.server_close()
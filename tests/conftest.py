@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+# The build scripts are top-level modules next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from build_forest import load_employee_data, split_retired_partners, validate_data, build_forest_output
+from generate_synthetic_org import generate_synthetic_org, write_synthetic_org
+
+SYNTHETIC_EMPLOYEES = 1_000
+SYNTHETIC_SEED = 3
+
+def run_pipeline(input_df, input_path):
+    """
+    Writes `input_df` to `input_path` and runs it through build_forest.py's pipeline, as `__main__` does.
+    Returns a dict with the input path, the validated frame, the Retired Partners map and the forest output.
+    """
+    assert write_synthetic_org(input_df, str(input_path))
+    active_df, retired_partners_map = split_retired_partners(load_employee_data(str(input_path)))
+    validated_df, summary = validate_data(active_df.copy())
+    assert not summary.get('critical_errors')
+    output_data, _ = build_forest_output(validated_df, retired_partners_map)
+    return {
+        'input_df': input_df,
+        'input_path': str(input_path),
+        'validated_df': validated_df,
+        'retired_partners_map': retired_partners_map,
+        'output_data': output_data
+    }
+
+@pytest.fixture(scope='session')
+def build_pipeline():
+    return run_pipeline
+
+@pytest.fixture(scope='session')
+def synthetic_org(tmp_path_factory):
+    """The synthetic org (with orphans, cycles and invalid pod links) built once for the whole session."""
+    input_df, summary = generate_synthetic_org(SYNTHETIC_EMPLOYEES, seed=SYNTHETIC_SEED)
+    assert input_df is not None, summary
+    return run_pipeline(input_df, tmp_path_factory.mktemp('synthetic_org') / 'input.csv')
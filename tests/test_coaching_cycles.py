@@ -0,0 +1,66 @@
+import sys
+
+import pandas as pd
+
+from build_forest import find_coaching_cycles, validate_data
+
+def adjacency(coach_of):
+    """coach -> coachees map from an {employee: coach} map, as validate_data builds it."""
+    adj = {}
+    for employee_id, coach_id in coach_of.items():
+        if coach_id is not None:
+            adj.setdefault(coach_id, []).append(employee_id)
+    return adj
+
+def canonical(cycle):
+    """The cycle rotated to start at its smallest member, so equal cycles compare equal."""
+    start = cycle.index(min(cycle))
+    return tuple(cycle[start:] + cycle[:start])
+
+def cycles_of(coach_of):
+    cycles = find_coaching_cycles(adjacency(coach_of))
+    for cycle in cycles:
+        # Each member coaches the next one
+        for member_id, next_id in zip(cycle, cycle[1:] + cycle[:1]):
+            assert coach_of[next_id] == member_id
+    return sorted(canonical(cycle) for cycle in cycles)
+
+def test_disjoint_cycles_are_all_found():
+    coach_of = {
+        'P1': None, 'E1': 'P1',
+        'A': 'B', 'B': 'A',                 # Two-member cycle
+        'C': 'E', 'D': 'C', 'E': 'D',       # Three-member cycle
+        'T1': 'A', 'T2': 'T1', 'T3': 'D',   # Tails hanging off the cycles are not members
+    }
+    assert cycles_of(coach_of) == [('A', 'B'), ('C', 'D', 'E')]
+
+def test_self_loop_is_a_cycle():
+    coach_of = {'P1': None, 'S': 'S', 'T': 'S', 'A': 'B', 'B': 'A'}
+    assert cycles_of(coach_of) == [('A', 'B'), ('S',)]
+
+def test_acyclic_forest_has_no_cycles():
+    assert cycles_of({'P1': None, 'E1': 'P1', 'E2': 'E1', 'E3': 'E1', 'O1': 'X9'}) == []
+
+def test_chain_deeper_than_the_recursion_limit():
+    depth = sys.getrecursionlimit() * 5
+    coach_of = {'E0': None}
+    coach_of.update({f"E{level}": f"E{level - 1}" for level in range(1, depth)})
+    assert cycles_of(coach_of) == []
+
+    # Close a long cycle at the bottom of the chain, and a self-loop further down
+    coach_of['E0'] = f"E{depth - 1}"
+    coach_of['S'] = 'S'
+    assert cycles_of(coach_of) == [tuple(f"E{level}" for level in range(depth)), ('S',)]
+
+def test_validation_reports_every_cycle_member():
+    coach_of = {'P1': None, 'E1': 'P1', 'A': 'B', 'B': 'A', 'S': 'S', 'C': 'D', 'D': 'E', 'E': 'C', 'T': 'A'}
+    df = pd.DataFrame({
+        'employee_id': list(coach_of),
+        'name': list(coach_of),
+        'coach_id': list(coach_of.values()),
+        'level': ['Partner' if coach_id is None else 'Analyst' for coach_id in coach_of.values()],
+    })
+    for mode in ('vectorized', 'rows'):
+        _, summary = validate_data(df.copy(), mode=mode)
+        assert sorted(canonical(cycle) for cycle in summary['cycle_members']) == [('A', 'B'), ('C', 'E', 'D'), ('S',)]
+        assert summary['critical_errors']
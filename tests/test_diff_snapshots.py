@@ -0,0 +1,109 @@
+import gzip
+import io
+import json
+
+from build_forest import json_encoder, write_json_stream
+from diff_snapshots import diff_snapshots, load_snapshot
+
+FOREST = {
+    "all_partner_trees": [{"id": "P1", "name": "Pat", "level": "Partner", "children": [
+        {"id": "E1", "name": "Ann", "level": "Manager", "coach_id": "P1", "children": []}]}],
+    "all_orphaned_employees": [{"id": "E9", "name": "Cy", "level": "Analyst", "coach_id": "X1"}],
+}
+
+def test_load_snapshot_reads_plain_and_gzipped_forests(tmp_path):
+    buffer = io.BytesIO()
+    write_json_stream(FOREST, buffer, json_encoder('json'))
+    (tmp_path / 'forest.json').write_bytes(buffer.getvalue())
+    (tmp_path / 'forest.json.gz').write_bytes(gzip.compress(buffer.getvalue()))
+    (tmp_path / 'SNAPSHOT.JSON.GZ').write_bytes(gzip.compress(buffer.getvalue()))
+
+    for name in ('forest.json', 'forest.json.gz', 'SNAPSHOT.JSON.GZ'):
+        assert load_snapshot(str(tmp_path / name)) == json.loads(buffer.getvalue())
+
+def test_load_snapshot_reports_a_corrupt_gzip(tmp_path, capsys):
+    (tmp_path / 'forest.json.gz').write_bytes(b'not gzip')
+    assert load_snapshot(str(tmp_path / 'forest.json.gz')) is None
+    assert "Error reading forest snapshot" in capsys.readouterr().out
+
+def node(employee_id, coach_id=None, children=(), **fields):
+    return {'id': employee_id, 'name': f"Employee {employee_id}", 'coach_id': coach_id, **fields, 'children': list(children)}
+
+PREVIOUS = {
+    "all_partner_trees": [
+        node('P1', level='Partner', partner_relationship_id='P1', children=[
+            node('E1', 'P1', level='Manager', partner_relationship_id='P1', location='Leeds', talent_group='Tax'),
+            node('E2', 'P1', level='Analyst', partner_relationship_id='P1', location=float('nan'), talent_group='Tax'),
+            node('E3', 'P1', level='Analyst', partner_relationship_id='P1', location='York', talent_group=float('nan')),
+        ]),
+        node('P2', level='Partner', partner_relationship_id='P2', children=[
+            node('E4', 'P2', level='Analyst', partner_relationship_id='P2', location='York'),
+        ]),
+    ],
+    "all_orphaned_employees": [
+        {'id': 'E9', 'name': 'Employee E9', 'coach_id': 'X1', 'level': 'Analyst', 'reason_for_listing': 'Unknown coach'},
+    ],
+}
+
+CURRENT = {
+    "all_partner_trees": [
+        node('P1', level='Partner', partner_relationship_id='P1', children=[
+            # E1: promoted and moved to York; E2: NaN location now None (no change);
+            # E3: location dropped, talent group NaN now set
+            node('E1', 'P1', level='Senior Manager', partner_relationship_id='P1', location='York', talent_group='Tax'),
+            node('E2', 'P1', level='Analyst', partner_relationship_id='P1', location=None, talent_group='Tax'),
+            node('E3', 'P1', level='Analyst', partner_relationship_id='P1', location=None, talent_group='Audit', children=[
+                node('E4', 'E3', level='Analyst', partner_relationship_id='P2', location='York'),
+            ]),
+        ]),
+        node('P2', level='Partner', partner_relationship_id='P2', children=[
+            node('E5', 'P2', level='Analyst', partner_relationship_id='P1', location='Hull'),
+        ]),
+    ],
+    "all_orphaned_employees": [],
+    "orphan_root_causes": [],
+}
+
+def test_diff_reports_hires_leavers_and_changes():
+    patch = diff_snapshots(PREVIOUS, CURRENT)
+    assert [hire['id'] for hire in patch['hires']] == ['E5']
+    assert patch['hires'][0] == {'id': 'E5', 'name': 'Employee E5', 'coach_id': 'P2', 'level': 'Analyst',
+                                 'partner_relationship_id': 'P1', 'location': 'Hull'}
+    assert patch['leavers'] == ['E9']
+    assert patch['coach_changes'] == [{'id': 'E4', 'old_coach_id': 'P2', 'new_coach_id': 'E3'}]
+    assert patch['pod_changes'] == []
+    assert sorted(patch['field_changes'], key=lambda change: change['id']) == [
+        {'id': 'E1', 'set': {'level': 'Senior Manager', 'location': 'York'}, 'unset': []},
+        {'id': 'E3', 'set': {'talent_group': 'Audit'}, 'unset': ['location']},
+    ]
+    assert patch['base'] == {'employee_count': 7}
+    assert patch['partner_root_ids'] == ['P1', 'P2']
+    assert 'already_applied_moves' not in patch
+    json.dumps(patch) # Plain JSON values only: NaN never leaks into the patch
+
+def test_diff_reports_pod_changes_and_coach_unsets():
+    current = json.loads(json.dumps(PREVIOUS).replace('NaN', 'null'))
+    e1 = current['all_partner_trees'][0]['children'][0]
+    e1['partner_relationship_id'] = 'P2'
+    current['all_orphaned_employees'][0]['coach_id'] = None
+    patch = diff_snapshots(PREVIOUS, current)
+    assert patch['pod_changes'] == [{'id': 'E1', 'old_partner_id': 'P1', 'new_partner_id': 'P2'}]
+    assert patch['coach_changes'] == [{'id': 'E9', 'old_coach_id': 'X1', 'new_coach_id': None}]
+    assert patch['hires'] == [] and patch['leavers'] == [] and patch['field_changes'] == []
+
+def test_diff_flags_local_moves_already_in_the_new_snapshot():
+    coach_moves = [
+        {'moved_employee_id': 'E4', 'new_coach_id': 'E3'}, # Exactly what the snapshot did
+        {'moved_employee_id': 'E2', 'new_coach_id': 'P2'}, # Not in the snapshot
+    ]
+    pod_moves = [
+        {'moved_employee_id': 'E5', 'new_partner_id': 'P1'}, # A hire, not a pod change
+        {'moved_employee_id': 'E1', 'new_partner_id': 'P2'},
+    ]
+    patch = diff_snapshots(PREVIOUS, CURRENT, coach_moves, pod_moves)
+    assert patch['already_applied_moves'] == {'coach': ['E4'], 'pod': []}
+
+    current = json.loads(json.dumps(CURRENT))
+    current['all_partner_trees'][0]['children'][0]['partner_relationship_id'] = 'P2'
+    patch = diff_snapshots(PREVIOUS, current, coach_moves, pod_moves)
+    assert patch['already_applied_moves'] == {'coach': ['E4'], 'pod': ['E1']}
@@ -0,0 +1,63 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from build_forest import COLUMN_MAPPING, json_encoder, export_to_json
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def coaching_chain(depth):
+    """A Partner at the top of a coaching chain `depth` employees deep, one coachee per level."""
+    ids = [1000 + level for level in range(depth + 1)]
+    return pd.DataFrame({
+        COLUMN_MAPPING['employee_id']: ids,
+        COLUMN_MAPPING['name']: [f"Employee {employee_id}" for employee_id in ids],
+        COLUMN_MAPPING['coach_id']: [None] + ids[:-1],
+        COLUMN_MAPPING['coach_name']: [None] + [f"Employee {employee_id}" for employee_id in ids[:-1]],
+        COLUMN_MAPPING['level']: ['Partner'] + ['Manager'] * depth,
+        COLUMN_MAPPING['partner_relationship_id']: [ids[0]] * (depth + 1),
+        COLUMN_MAPPING['partner_relationship_name']: ['Employee 1000'] * (depth + 1),
+        COLUMN_MAPPING['talent_group']: ['Tax'] * (depth + 1),
+        'Operating Unit Name': ['Unit A'] * (depth + 1),
+    })
+
+def chain_depth(tree):
+    depth = 0
+    while tree['children']:
+        tree = tree['children'][0]
+        depth += 1
+    return depth
+
+@pytest.mark.parametrize('serializer', ['auto', 'orjson', 'json'])
+@pytest.mark.parametrize('depth', [130, 200, 400])
+@pytest.mark.parametrize('file_name', ['forest.json', 'forest.json.gz'])
+def test_export_writes_deep_coaching_chains(build_pipeline, tmp_path, serializer, depth, file_name):
+    output_data = build_pipeline(coaching_chain(depth), tmp_path / 'input.csv')['output_data']
+    output_path = str(tmp_path / file_name)
+    assert export_to_json(output_data, output_path, serializer=serializer)
+    with (gzip.open(output_path, 'rt') if file_name.endswith('.gz') else open(output_path)) as f:
+        written = json.load(f)
+    assert [chain_depth(tree) for tree in written['all_partner_trees']] == [depth]
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_orjson_encoder_falls_back_to_json_past_its_nesting_limit(indent):
+    pytest.importorskip('orjson')
+    nested = {'children': []}
+    for _ in range(300):
+        nested = {'children': [nested]}
+    assert json_encoder('orjson', indent)(nested) == json_encoder('json', indent)(nested)
+
+def test_failed_export_exits_non_zero(build_pipeline, tmp_path):
+    input_path = tmp_path / 'input.csv'
+    build_pipeline(coaching_chain(3), input_path)
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO_ROOT, 'build_forest.py'), '--input', str(input_path), '--no-cache',
+         '--output', str(tmp_path / 'missing_dir' / 'forest.json')],
+        cwd=tmp_path, capture_output=True, text=True)
+    assert "Error exporting to JSON" in result.stdout
+    assert result.returncode == 1
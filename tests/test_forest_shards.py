@@ -0,0 +1,66 @@
+import gzip
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from build_forest import export_forest_shards, FOREST_SHARD_DIR, SHARD_MANIFEST_NAME
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def forest(synthetic_org):
+    return synthetic_org['output_data']
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_export_removes_only_stale_shards(forest, tmp_path, compress):
+    suffix = '.json.gz' if compress else '.json'
+    stale = tmp_path / f'gone-unit.0123456789ab{suffix}'
+    stale.write_bytes(b'{}')
+    neighbours = ['forest.json', 'forest.json.gz', 'node_table.json', 'notes.0123456789ab.json.bak', 'Upper.0123456789ab.json']
+    for name in neighbours:
+        (tmp_path / name).write_bytes(b'{}')
+
+    export_forest_shards(forest, str(tmp_path), compress=compress)
+
+    manifest = json.loads((tmp_path / SHARD_MANIFEST_NAME).read_text())
+    shard_files = {unit['file'] for unit in manifest['operating_units']}
+    assert shard_files and all(name.endswith(suffix) for name in shard_files)
+    assert not stale.exists()
+    remaining = {path.name for path in tmp_path.iterdir()}
+    assert remaining == shard_files | set(neighbours) | {SHARD_MANIFEST_NAME}
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_export_rewrites_a_truncated_shard(forest, tmp_path, compress):
+    assert export_forest_shards(forest, str(tmp_path), compress=compress)
+    units = json.loads((tmp_path / SHARD_MANIFEST_NAME).read_text())['operating_units']
+    shard_path = tmp_path / units[0]['file']
+    shard_path.write_bytes(shard_path.read_bytes()[:10]) # As left by a writer that crashed mid-file
+
+    assert export_forest_shards(forest, str(tmp_path), compress=compress)
+    payload = shard_path.read_bytes()
+    assert len(payload) == units[0]['bytes']
+    assert hashlib.sha256(gzip.decompress(payload) if compress else payload).hexdigest() == units[0]['sha256']
+    assert not [path.name for path in tmp_path.iterdir() if path.name.endswith('.tmp')]
+
+def run_build(input_path, cwd, *extra_args):
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO_ROOT, 'build_forest.py'), '--input', input_path, '--no-cache', *extra_args],
+        cwd=cwd, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+def test_manifest_is_tied_to_its_forest(synthetic_org, tmp_path):
+    run_build(synthetic_org['input_path'], tmp_path, '--shards')
+    forest = json.loads((tmp_path / 'forest.json').read_text())
+    manifest = json.loads((tmp_path / FOREST_SHARD_DIR / SHARD_MANIFEST_NAME).read_text())
+    assert next(iter(forest)) == 'generated_at' # The page reads it from the start of the file
+    assert manifest['generated_at'] == forest['generated_at']
+
+    # A later build without --shards must not leave the old manifest in front of the new forest.json
+    run_build(synthetic_org['input_path'], tmp_path)
+    assert (tmp_path / 'forest.json').exists()
+    assert not (tmp_path / FOREST_SHARD_DIR / SHARD_MANIFEST_NAME).exists()
@@ -0,0 +1,123 @@
+import pytest
+
+from build_forest import build_forest_output, is_under, relabel_subtree_move
+
+LABEL_FIELDS = ('interval_root_id', 'interval_start', 'interval_end', 'depth')
+
+def fresh_labels(trees):
+    """Labels from a fresh pre-order DFS of every tree, as assemble_forest assigns them."""
+    labels = {}
+    for tree in trees:
+        counter = 0
+        def visit(node, depth):
+            nonlocal counter
+            start = counter
+            counter += 1
+            for child in node.get('children', []):
+                visit(child, depth + 1)
+            labels[node['id']] = (tree['id'], start, counter - 1, depth)
+        visit(tree, 0)
+    return labels
+
+def current_labels(trees):
+    labels = {}
+    stack = list(trees)
+    while stack:
+        node = stack.pop()
+        labels[node['id']] = tuple(node[field] for field in LABEL_FIELDS)
+        stack.extend(node.get('children', []))
+    return labels
+
+def walk(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.get('children', []))
+
+def parents_of(trees, orphans=()):
+    parents = {}
+    for root in list(trees) + list(orphans):
+        for node in walk(root):
+            for child in node.get('children', []):
+                parents[child['id']] = node
+    return parents
+
+def assert_labels_match_fresh_dfs(forest, moved_node):
+    trees = forest['all_partner_trees']
+    assert current_labels(trees) == fresh_labels(trees)
+    # is_under agrees with the actual ancestry of every moved node
+    parents = parents_of(trees, forest['all_orphaned_employees'])
+    tree_nodes = [node for tree in trees for node in walk(tree)]
+    for node in walk(moved_node):
+        ancestors = set()
+        current = parents.get(node['id'])
+        while current is not None and current['id'] not in ancestors:
+            ancestors.add(current['id'])
+            current = parents.get(current['id'])
+        in_tree = 'interval_root_id' in node
+        for other in tree_nodes:
+            assert is_under(node, other) == (in_tree and other['id'] in ancestors)
+
+def move(moved_node, old_coach, new_coach):
+    old_coach['children'].remove(moved_node)
+    new_coach.setdefault('children', []).append(moved_node)
+
+@pytest.fixture
+def forest(synthetic_org):
+    # A fresh build per test: the moves change the nodes in place
+    output_data, _ = build_forest_output(synthetic_org['validated_df'], synthetic_org['retired_partners_map'])
+    assert current_labels(output_data['all_partner_trees']) == fresh_labels(output_data['all_partner_trees'])
+    return output_data
+
+def deep_trees(forest):
+    return sorted(forest['all_partner_trees'], key=lambda tree: -tree['indirect_coachee_count'])
+
+def inner_node(tree):
+    """A coachee of the Partner who has coachees of their own."""
+    return next(child for child in tree['children'] if child.get('children'))
+
+def subtree_of(coach):
+    """A coachee of `coach`, preferring one with coachees so a whole subtree moves."""
+    return next((child for child in coach['children'] if child.get('children')), coach['children'][0])
+
+def test_move_within_one_tree(forest):
+    tree = deep_trees(forest)[0]
+    old_coach = inner_node(tree)
+    moved_node = subtree_of(old_coach)
+    # The new coach sits in another branch of the same tree
+    new_coach = next(node for child in tree['children'] if child is not old_coach for node in walk(child))
+    move(moved_node, old_coach, new_coach)
+    relabel_subtree_move(moved_node, tree, tree, new_coach)
+    assert_labels_match_fresh_dfs(forest, moved_node)
+    assert is_under(moved_node, new_coach) and not is_under(moved_node, old_coach)
+
+def test_move_across_trees(forest):
+    old_tree, new_tree = deep_trees(forest)[:2]
+    old_coach = inner_node(old_tree)
+    moved_node = subtree_of(old_coach)
+    new_coach = inner_node(new_tree)['children'][0]
+    move(moved_node, old_coach, new_coach)
+    relabel_subtree_move(moved_node, old_tree, new_tree, new_coach)
+    assert_labels_match_fresh_dfs(forest, moved_node)
+    assert is_under(moved_node, new_tree) and not is_under(moved_node, old_tree)
+
+def test_move_out_of_the_trees_under_an_orphan(forest):
+    old_tree = deep_trees(forest)[0]
+    old_coach = inner_node(old_tree)
+    moved_node = subtree_of(old_coach)
+    orphan = forest['all_orphaned_employees'][0]
+    move(moved_node, old_coach, orphan)
+    relabel_subtree_move(moved_node, old_tree, None, orphan)
+    assert all(field not in node for node in walk(moved_node) for field in LABEL_FIELDS)
+    assert_labels_match_fresh_dfs(forest, moved_node)
+
+def test_move_an_orphan_into_a_tree(forest):
+    orphan = forest['all_orphaned_employees'][0]
+    forest['all_orphaned_employees'].remove(orphan)
+    new_tree = deep_trees(forest)[1]
+    new_coach = inner_node(new_tree)
+    new_coach['children'].append(orphan)
+    relabel_subtree_move(orphan, None, new_tree, new_coach)
+    assert_labels_match_fresh_dfs(forest, orphan)
+    assert is_under(orphan, new_coach) and is_under(orphan, new_tree)
@@ -0,0 +1,43 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+import build_forest
+from build_forest import (
+    PROFILE_METRICS_NAME, build_forest_output, json_encoder, load_employee_data, split_retired_partners,
+    validate_data, write_json_stream
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def forest_bytes(input_path):
+    active_df, retired_partners_map = split_retired_partners(load_employee_data(input_path))
+    validated_df, _ = validate_data(active_df.copy())
+    output_data, forest = build_forest_output(validated_df, retired_partners_map)
+    buffer = io.BytesIO()
+    write_json_stream(output_data, buffer, json_encoder('json'))
+    return buffer.getvalue(), active_df, forest
+
+def test_previous_representation_builds_the_same_forest(synthetic_org, monkeypatch):
+    compact, compact_df, compact_forest = forest_bytes(synthetic_org['input_path'])
+    monkeypatch.setattr(build_forest, 'COMPACT_REPRESENTATION', False)
+    legacy, legacy_df, legacy_forest = forest_bytes(synthetic_org['input_path'])
+    assert legacy == compact
+    assert isinstance(compact_df['level'].dtype, pd.CategoricalDtype) and legacy_df['level'].dtype == object
+    assert not isinstance(next(iter(compact_forest['nodes'].values())), dict)
+    assert type(next(iter(legacy_forest['nodes'].values()))) is dict
+
+def test_build_reports_the_reduction_against_the_previous_representation(synthetic_org, tmp_path):
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO_ROOT, 'build_forest.py'), '--input', synthetic_org['input_path'],
+         '--memory-baseline', '--profile', '--no-trace-memory'],
+        cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "with the previous representation (object columns, one dict per node)" in result.stdout
+    metrics = json.loads((tmp_path / PROFILE_METRICS_NAME).read_text())
+    assert metrics['compact_representation'] is True and metrics['cached_input'] is False
+    assert metrics['legacy_peak_rss_bytes'] > 0
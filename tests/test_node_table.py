@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from build_forest import forest_to_node_table, node_table_to_forest, json_encoder
+
+def plain(value):
+    # ForestNode records and numpy scalars become the dicts and numbers forest.json holds
+    return json.loads(json_encoder('json')(value))
+
+@pytest.fixture
+def forest(synthetic_org):
+    output_data = synthetic_org['output_data']
+    assert output_data['all_partner_trees'] and output_data['all_orphaned_employees']
+    return output_data
+
+def test_node_table_round_trip(forest):
+    table = plain(forest_to_node_table(forest))
+    rebuilt = node_table_to_forest(table)
+    assert rebuilt['all_partner_trees'] == plain(forest['all_partner_trees'])
+    assert rebuilt['all_orphaned_employees'] == plain(forest['all_orphaned_employees'])
+
+def test_node_table_expands_only_requested_roots(forest):
+    table = plain(forest_to_node_table(forest))
+    trees = plain(forest['all_partner_trees'])
+    picked = [len(trees) - 1, 0, len(trees) // 2]
+    rebuilt = node_table_to_forest(table, root_rows=[table['roots'][i] for i in picked])
+    assert rebuilt == {'all_partner_trees': [trees[i] for i in picked]}
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from build_forest import format_id, normalize_id_column
+
+ID_COLUMNS = {
+    'mixed_objects': pd.Series([1.0, 2**63 + 5.0, 1e19, -1e19, np.nan, 2**53, 2**53 - 1, 'abc', ' 12 ', 'inf', None, '1e3', -5.7], dtype=object),
+    'floats': pd.Series([1.0, 2e19, np.nan, float('inf'), 2.0**53, -(2.0**63)]),
+    'int64': pd.Series([1, 2**62 + 1, -2**63, 5], dtype='int64'),
+    'nullable_int': pd.Series([1, None, 2**62 + 1], dtype='Int64'),
+    'strings': pd.Series(['1', '2', None, 'x', '18446744073709551616']),
+}
+
+@pytest.mark.parametrize('case', sorted(ID_COLUMNS))
+def test_normalize_id_column_matches_format_id(case):
+    series = ID_COLUMNS[case]
+    assert normalize_id_column(series).tolist() == series.map(format_id).tolist()
+
+def test_large_ids_do_not_wrap():
+    assert normalize_id_column(pd.Series([2.0**63, 1e19])).tolist() == ['9223372036854775808', '10000000000000000000']
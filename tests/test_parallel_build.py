@@ -0,0 +1,29 @@
+import io
+
+import pandas as pd
+
+from build_forest import build_forest_output_parallel, json_encoder, write_json_stream
+
+def forest_bytes(output_data):
+    buffer = io.BytesIO()
+    write_json_stream(output_data, buffer, json_encoder('json'))
+    return buffer.getvalue()
+
+def parallel_bytes(built):
+    return forest_bytes(build_forest_output_parallel(built['validated_df'], built['retired_partners_map'], workers=2))
+
+def test_parallel_build_matches_serial(synthetic_org):
+    assert parallel_bytes(synthetic_org) == forest_bytes(synthetic_org['output_data'])
+
+def test_parallel_build_matches_serial_with_duplicate_ids(synthetic_org, build_pipeline, tmp_path):
+    df = synthetic_org['input_df'].copy()
+    # Re-append existing rows with other values: a Partner moved to another OU, and a non-Partner
+    # moved under another coach. The last row's values win at the first row's position.
+    partner = df[df['Level'] == 'Partner'].iloc[0].copy()
+    partner['Operating Unit Name'] = df.loc[df['Operating Unit Name'] != partner['Operating Unit Name'], 'Operating Unit Name'].iloc[0]
+    member = df[df['Level'] != 'Partner'].iloc[5].copy()
+    member['Coach User Sys ID'] = df[df['Level'] == 'Partner'].iloc[1]['Employee ID']
+    df = pd.concat([df, pd.DataFrame([partner, member])], ignore_index=True)
+
+    built = build_pipeline(df, tmp_path / 'input.csv')
+    assert parallel_bytes(built) == forest_bytes(built['output_data'])
@@ -0,0 +1,39 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from build_forest import load_employee_data, load_employee_data_cached, parse_cache_key
+
+@pytest.fixture
+def input_path(synthetic_org):
+    return synthetic_org['input_path']
+
+def corrupt_feather(path):
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) // 2)
+
+def corrupt_sidecar(path):
+    with open(path, 'w') as f:
+        f.write('{"projected_columns": [')
+
+def sidecar_not_an_object(path):
+    with open(path, 'w') as f:
+        f.write('[]')
+
+@pytest.mark.parametrize('corrupt, suffix', [
+    (corrupt_feather, '.feather'), (corrupt_sidecar, '.json'), (sidecar_not_an_object, '.json')])
+def test_corrupt_cache_entry_is_a_miss(input_path, tmp_path, corrupt, suffix):
+    cache_dir = str(tmp_path / 'cache')
+    expected = load_employee_data(input_path)
+    pd.testing.assert_frame_equal(load_employee_data_cached(input_path, cache_dir=cache_dir), expected)
+
+    entry = os.path.join(cache_dir, parse_cache_key(input_path))
+    corrupt(entry + suffix)
+    pd.testing.assert_frame_equal(load_employee_data_cached(input_path, cache_dir=cache_dir), expected)
+
+    # The entry was rewritten, so the next load is a clean hit
+    assert os.path.exists(entry + '.feather') and os.path.exists(entry + '.json')
+    pd.testing.assert_frame_equal(load_employee_data_cached(input_path, cache_dir=cache_dir), expected)
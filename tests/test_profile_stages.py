@@ -0,0 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from build_forest import PROFILE_METRICS_NAME
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_build(input_path, cwd, *extra_args):
+    return subprocess.run(
+        [sys.executable, os.path.join(REPO_ROOT, 'build_forest.py'), '--input', input_path, '--no-cache', *extra_args],
+        cwd=cwd, capture_output=True, text=True)
+
+@pytest.mark.parametrize('stage', ['assemble_forest', 'orphan_analysis', 'flag_cross_offering_pods'])
+def test_worker_stages_cannot_be_profiled_in_a_parallel_build(synthetic_org, tmp_path, stage):
+    result = run_build(synthetic_org['input_path'], tmp_path, '--workers', '2', '--profile-stage', stage)
+    assert result.returncode == 2
+    assert "use --workers 1" in result.stderr
+    assert not (tmp_path / 'forest.json').exists()
+
+@pytest.mark.parametrize('stage', ['pod_aggregates', 'search_index'])
+def test_merge_stages_are_profiled_in_a_parallel_build(synthetic_org, tmp_path, stage):
+    result = run_build(synthetic_org['input_path'], tmp_path, '--workers', '2', '--profile-stage', stage, '--no-trace-memory')
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert (tmp_path / f'forest_profile_{stage}.prof').exists()
+    metrics = json.loads((tmp_path / PROFILE_METRICS_NAME).read_text())
+    assert stage in [record['stage'] for record in metrics['stages']]
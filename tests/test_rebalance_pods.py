@@ -0,0 +1,126 @@
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from build_forest import COLUMN_MAPPING, build_forest_output, load_employee_data, split_retired_partners, validate_data
+from rebalance_pods import rebalance_pods
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The keys ui.js confirmPodMove writes for each entry of podChangeLog
+POD_CHANGE_LOG_KEYS = {'moved_employee_id', 'moved_employee_name', 'original_partner_id', 'original_partner_name',
+                       'new_partner_id', 'new_partner_name', 'timestamp'}
+
+# North: PA (Leeds) holds 7 of 9 members, PB (Leeds) 1 and PC (Bath) none; N9 sits in a South pod.
+# South: PS holds 2 members, PT none, and S3/S4 sit in North's PA.
+ORG = [
+    # id, operating unit, location, level, pod partner
+    ('PA', 'North', 'Leeds', 'Partner', 'PA'),
+    ('PB', 'North', 'Leeds', 'Partner', 'PB'),
+    ('PC', 'North', 'Bath', 'Partner', 'PC'),
+    ('N1', 'North', 'Leeds', 'Analyst', 'PA'),
+    ('N2', 'North', 'Leeds', 'Analyst', 'PA'),
+    ('N3', 'North', 'Leeds', 'Analyst', 'PA'),
+    ('N4', 'North', 'Leeds', 'Analyst', 'PA'),
+    ('N5', 'North', 'Bath', 'Analyst', 'PA'),
+    ('N6', 'North', 'Bath', 'Analyst', 'PA'),
+    ('N7', 'North', 'Bath', 'Analyst', 'PA'),
+    ('N8', 'North', 'Leeds', 'Analyst', 'PB'),
+    ('N9', 'North', 'Leeds', 'Analyst', 'PS'),
+    ('PS', 'South', 'Hull', 'Partner', 'PS'),
+    ('PT', 'South', 'Hull', 'Partner', 'PT'),
+    ('S1', 'South', 'Hull', 'Analyst', 'PS'),
+    ('S2', 'South', 'Hull', 'Analyst', 'PS'),
+    ('S3', 'South', 'Hull', 'Analyst', 'PA'),
+    ('S4', 'South', 'Hull', 'Analyst', 'PA'),
+]
+
+@pytest.fixture
+def input_path(tmp_path):
+    path = tmp_path / 'input.csv'
+    pd.DataFrame({
+        COLUMN_MAPPING['employee_id']: [row[0] for row in ORG],
+        COLUMN_MAPPING['name']: [f"Employee {row[0]}" for row in ORG],
+        # Everyone is coached by the first Partner of their OU
+        COLUMN_MAPPING['coach_id']: [None if row[3] == 'Partner' else {'North': 'PA', 'South': 'PS'}[row[1]] for row in ORG],
+        COLUMN_MAPPING['coach_name']: [None] * len(ORG),
+        COLUMN_MAPPING['level']: [row[3] for row in ORG],
+        COLUMN_MAPPING['partner_relationship_id']: [row[4] for row in ORG],
+        COLUMN_MAPPING['partner_relationship_name']: [f"Employee {row[4]}" for row in ORG],
+        COLUMN_MAPPING['talent_group']: ['Tax'] * len(ORG),
+        'Operating Unit Name': [row[1] for row in ORG],
+        'Location  Name': [row[2] for row in ORG],
+    }).to_csv(path, index=False)
+    return path
+
+@pytest.fixture
+def nodes(input_path):
+    active_df, retired_partners_map = split_retired_partners(load_employee_data(str(input_path)))
+    validated_df, _ = validate_data(active_df.copy())
+    _, forest = build_forest_output(validated_df, retired_partners_map)
+    return forest['nodes']
+
+def pod_sizes_after(nodes, change_log):
+    sizes = {}
+    for node in nodes.values():
+        if node['level'] == 'Partner':
+            sizes.setdefault(node['id'], 0)
+    for node in nodes.values():
+        if node['level'] == 'Partner':
+            continue
+        move = change_log.get(node['id'])
+        if move:
+            pod_id = move['new_partner_id']
+        elif node.get('pod_relationship_status') == 'valid':
+            pod_id = node['partner_relationship_id']
+        else:
+            continue
+        sizes[pod_id] += 1
+    return sizes
+
+def test_rebalanced_pods_end_inside_the_target_range(nodes):
+    change_log, report = rebalance_pods(nodes, tolerance=0)
+    ranges = {unit['operating_unit']: unit['size_range'] for unit in report}
+    assert ranges == {'North': [3, 3], 'South': [2, 2]}
+    assert all(unit['pods_out_of_range_after'] == 0 for unit in report)
+    sizes = pod_sizes_after(nodes, change_log)
+    for pod_id, size in sizes.items():
+        low, high = ranges[nodes[pod_id]['Operating Unit Name']]
+        assert low <= size <= high, (pod_id, size)
+
+def test_moves_stay_inside_the_operating_unit(nodes):
+    change_log, _ = rebalance_pods(nodes, tolerance=0)
+    assert {'N9', 'S3', 'S4'} <= set(change_log) # Members of another OU's pod must be placed in their own
+    for employee_id, move in change_log.items():
+        assert nodes[move['new_partner_id']]['Operating Unit Name'] == nodes[employee_id]['Operating Unit Name']
+
+def test_moves_prefer_a_pod_at_the_same_location(nodes):
+    change_log, _ = rebalance_pods(nodes, tolerance=0)
+    assert len(change_log) == 7 # Four out of PA, N9 into North, S3 and S4 into South
+    for employee_id, move in change_log.items():
+        assert nodes[move['new_partner_id']]['Location  Name'] == nodes[employee_id]['Location  Name']
+    assert sorted(employee_id for employee_id, move in change_log.items() if move['new_partner_id'] == 'PC') == ['N5', 'N6', 'N7']
+
+def test_only_the_selected_operating_units_are_rebalanced(nodes):
+    change_log, report = rebalance_pods(nodes, tolerance=0, operating_units=['South'])
+    assert [unit['operating_unit'] for unit in report] == ['South']
+    assert sorted(change_log) == ['S3', 'S4']
+
+def test_written_change_log_matches_the_ui_pod_change_log(input_path, tmp_path):
+    output_path = tmp_path / 'pod_moves.json'
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO_ROOT, 'rebalance_pods.py'), '--input', str(input_path), '--no-cache',
+         '--tolerance', '0', '--output', str(output_path)],
+        cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    change_log = json.loads(output_path.read_text())
+    assert len(change_log) == 7
+    for employee_id, move in change_log.items():
+        assert set(move) == POD_CHANGE_LOG_KEYS
+        assert move['moved_employee_id'] == employee_id
+        assert move['new_partner_name'] == f"Employee {move['new_partner_id']}"
+    assert change_log['N5']['original_partner_id'] == 'PA' and change_log['N5']['original_partner_name'] == 'Employee PA'
@@ -0,0 +1,114 @@
+import pandas as pd
+import pytest
+
+from build_forest import COLUMN_MAPPING, build_forest_output, load_employee_data, split_retired_partners, validate_data
+from replay_moves import replay_coach_moves, replay_moves, replay_pod_moves, would_create_cycle
+
+# Two Partner trees, plus an orphaned chain (O1 has an unknown coach, O2 is coached by O1):
+# P1 -> M1 -> (A1, A2); P2 -> B1; X9 (missing) -> O1 -> O2
+ORG = [
+    # id, coach, level, pod partner
+    ('P1', None, 'Partner', 'P1'),
+    ('M1', 'P1', 'Manager', 'P1'),
+    ('A1', 'M1', 'Analyst', 'P1'),
+    ('A2', 'M1', 'Analyst', 'P1'),
+    ('P2', None, 'Partner', 'P2'),
+    ('B1', 'P2', 'Manager', 'P2'),
+    ('O1', 'X9', 'Analyst', 'P2'),
+    ('O2', 'O1', 'Analyst', 'P2'),
+]
+
+@pytest.fixture
+def active_df(tmp_path):
+    path = tmp_path / 'input.csv'
+    pd.DataFrame({
+        COLUMN_MAPPING['employee_id']: [row[0] for row in ORG],
+        COLUMN_MAPPING['name']: [f"Employee {row[0]}" for row in ORG],
+        COLUMN_MAPPING['coach_id']: [row[1] for row in ORG],
+        COLUMN_MAPPING['coach_name']: [f"Employee {row[1]}" if row[1] else None for row in ORG],
+        COLUMN_MAPPING['level']: [row[2] for row in ORG],
+        COLUMN_MAPPING['partner_relationship_id']: [row[3] for row in ORG],
+        COLUMN_MAPPING['partner_relationship_name']: [f"Employee {row[3]}" for row in ORG],
+        COLUMN_MAPPING['talent_group']: ['Tax'] * len(ORG),
+        'Operating Unit Name': ['Unit A'] * len(ORG),
+    }).to_csv(path, index=False)
+    active_df, _ = split_retired_partners(load_employee_data(str(path)))
+    return active_df
+
+@pytest.fixture
+def nodes(active_df):
+    validated_df, _ = validate_data(active_df.copy())
+    _, forest = build_forest_output(validated_df, {})
+    return forest['nodes']
+
+def coach_move(employee_id, new_coach_id):
+    return {'moved_employee_id': employee_id, 'new_coach_id': new_coach_id}
+
+def pod_move(employee_id, new_partner_id):
+    return {'moved_employee_id': employee_id, 'new_partner_id': new_partner_id}
+
+def rejection_reasons(rejected):
+    return {rejection['move']['moved_employee_id']: rejection['reason'] for rejection in rejected}
+
+def test_would_create_cycle(nodes):
+    # Inside the trees (interval check) and along the orphaned chain (walk up the coaches)
+    assert would_create_cycle(nodes['M1'], nodes['A1'], nodes)
+    assert would_create_cycle(nodes['M1'], nodes['M1'], nodes)
+    assert would_create_cycle(nodes['O1'], nodes['O2'], nodes)
+    assert not would_create_cycle(nodes['A1'], nodes['A2'], nodes)
+    assert not would_create_cycle(nodes['O2'], nodes['B1'], nodes)
+    assert not would_create_cycle(nodes['B1'], nodes['O2'], nodes)
+
+def test_moves_that_would_create_a_cycle_are_rejected(nodes):
+    final_coaches, rejected = replay_coach_moves(nodes, [coach_move('M1', 'A1'), coach_move('O1', 'O2'), coach_move('A2', 'A2')])
+    assert final_coaches == {}
+    reasons = rejection_reasons(rejected)
+    assert sorted(reasons) == ['A2', 'M1', 'O1']
+    assert all(reason.startswith("Would create a coaching cycle") for reason in reasons.values())
+    assert nodes['M1']['coach_id'] == 'P1' and [child['id'] for child in nodes['M1']['children']] == ['A1', 'A2']
+
+def test_moves_to_an_unknown_coach_are_rejected(nodes):
+    final_coaches, rejected = replay_coach_moves(nodes, [coach_move('A1', 'Z99'), coach_move('Z98', 'M1'), coach_move('P1', 'P2')])
+    assert final_coaches == {}
+    assert rejection_reasons(rejected) == {
+        'A1': "New coach not found in the data.",
+        'Z98': "Employee not found in the data.",
+        'P1': "Partners are the roots of their trees and cannot be given a coach.",
+    }
+    assert nodes['A1']['coach_id'] == 'M1'
+
+def test_invalid_pod_partner_moves_are_rejected(nodes):
+    final_pods, rejected = replay_pod_moves(nodes, [pod_move('A1', 'M1'), pod_move('A2', 'Z99'), pod_move('Z98', 'P1')])
+    assert final_pods == {}
+    assert rejection_reasons(rejected) == {
+        'A1': "New pod partner is not an active Partner.",
+        'A2': "New pod partner is not an active Partner.",
+        'Z98': "Employee not found in the data.",
+    }
+
+def test_valid_moves_are_applied(nodes):
+    # A later move sees the state the earlier ones left: A2 joins B1, then A1 joins A2
+    final_coaches, rejected = replay_coach_moves(nodes, [coach_move('A2', 'B1'), coach_move('A1', 'A2'), coach_move('O1', 'M1')])
+    assert rejected == []
+    assert final_coaches == {'A2': ('B1', 'Employee B1'), 'A1': ('A2', 'Employee A2'), 'O1': ('M1', 'Employee M1')}
+    assert [child['id'] for child in nodes['B1']['children']] == ['A2']
+    assert [child['id'] for child in nodes['M1']['children']] == ['O1']
+    assert nodes['A1']['interval_root_id'] == 'P2' and nodes['O2']['interval_root_id'] == 'P1'
+
+    final_pods, rejected = replay_pod_moves(nodes, [pod_move('A1', 'P1'), pod_move('A1', 'P2')])
+    assert rejected == [] and final_pods == {'A1': ('P2', 'Employee P2')} # The last move wins
+
+def test_replay_rebuilds_the_forest_with_the_applied_moves(active_df):
+    output_data, report = replay_moves(active_df, {}, [coach_move('A2', 'B1'), coach_move('M1', 'A1'), coach_move('O1', 'M1')],
+                                       [pod_move('A2', 'P2'), pod_move('A1', 'M1')])
+    assert report['coach_moves']['applied_employees'] == 2 and len(report['coach_moves']['rejected']) == 1
+    assert report['pod_moves']['applied_employees'] == 1 and len(report['pod_moves']['rejected']) == 1
+    assert {orphan['id'] for orphan in report['resolved_orphans']} == {'O1', 'O2'}
+    assert output_data['all_orphaned_employees'] == []
+
+    trees = {tree['id']: tree for tree in output_data['all_partner_trees']}
+    b1 = trees['P2']['children'][0]
+    assert [child['id'] for child in b1['children']] == ['A2']
+    assert b1['children'][0]['partner_relationship_id'] == 'P2'
+    m1 = trees['P1']['children'][0]
+    assert sorted(child['id'] for child in m1['children']) == ['A1', 'O1']
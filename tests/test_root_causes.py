@@ -0,0 +1,57 @@
+import sys
+
+from build_forest import build_forest_output, find_broken_chain_root_cause
+
+def employee(employee_id, coach_id, level='Analyst', **fields):
+    return {'id': employee_id, 'name': f"Employee {employee_id}", 'coach_id': coach_id, 'level': level, **fields}
+
+def root_causes(employee_ids, all_nodes, retired_partners_map, cache=None):
+    """{employee_id: (reason, root cause ID)}; a fresh cache per employee when `cache` is None."""
+    verdicts = {}
+    for employee_id in employee_ids:
+        walk_cache = {} if cache is None else cache
+        reason = find_broken_chain_root_cause(employee_id, all_nodes, set(all_nodes), retired_partners_map, walk_cache)
+        assert walk_cache[employee_id][0] == reason
+        verdicts[employee_id] = walk_cache[employee_id]
+    return verdicts
+
+def assert_memoized_matches_unmemoized(all_nodes, retired_partners_map, employee_ids):
+    unmemoized = root_causes(employee_ids, all_nodes, retired_partners_map)
+    for order in (employee_ids, list(reversed(employee_ids))):
+        assert root_causes(order, all_nodes, retired_partners_map, cache={}) == unmemoized
+    return unmemoized
+
+def test_each_kind_of_break():
+    nodes = {node['id']: node for node in [
+        employee('R1', 'RP', coach_name='Retired'), employee('R2', 'R1'),         # Coached by a Retired Partner
+        employee('I1', 'X9', coach_name='Ghost'), employee('I2', 'I1'),           # Invalid coach ID
+        employee('N1', None), employee('N2', 'N1'),                               # Chain tops out at a non-Partner
+        employee('A', 'B'), employee('B', 'A'), employee('T1', 'A'), employee('T2', 'T1'), # Cycle with a tail
+        employee('S', 'S'), employee('U', 'S'),                                   # Self-loop with a coachee
+    ]}
+    verdicts = assert_memoized_matches_unmemoized(nodes, {'RP': {'name': 'Retired'}}, sorted(nodes))
+    assert {employee_id: root_cause_id for employee_id, (_, root_cause_id) in verdicts.items()} == {
+        'R1': 'R1', 'R2': 'R1', 'I1': 'I1', 'I2': 'I1', 'N1': 'N1', 'N2': 'N1',
+        'A': 'A', 'B': 'B', 'T1': 'A', 'T2': 'A', 'S': 'S', 'U': 'S',
+    }
+    assert "Retired Partner" in verdicts['R2'][0] and "is invalid" in verdicts['I2'][0]
+    assert "who is not a Partner" in verdicts['N2'][0] and "cycle involving employee ID A" in verdicts['T2'][0]
+
+def test_chain_deeper_than_the_recursion_limit():
+    depth = sys.getrecursionlimit() * 5
+    nodes = {'E0': employee('E0', 'X9', coach_name='Ghost')}
+    nodes.update({f"E{level}": employee(f"E{level}", f"E{level - 1}") for level in range(1, depth)})
+    deepest = f"E{depth - 1}"
+    cache = {}
+    find_broken_chain_root_cause(deepest, nodes, set(nodes), {}, cache)
+    assert len(cache) == depth and all(verdict[1] == 'E0' for verdict in cache.values())
+    assert root_causes([deepest, 'E5'], nodes, {}) == root_causes([deepest, 'E5'], nodes, {}, cache={})
+
+def test_memoized_root_causes_match_on_the_synthetic_org(synthetic_org):
+    output_data, forest = build_forest_output(synthetic_org['validated_df'], synthetic_org['retired_partners_map'])
+    orphan_ids = [orphan['id'] for orphan in output_data['all_orphaned_employees']]
+    assert len(orphan_ids) > 10
+    verdicts = assert_memoized_matches_unmemoized(forest['nodes'], synthetic_org['retired_partners_map'], orphan_ids)
+    # The build shares one cache across orphans; its report must equal the independent walks
+    assert {orphan['id']: (orphan['reason_for_listing'], orphan['root_cause_employee_id'])
+            for orphan in output_data['all_orphaned_employees']} == verdicts
@@ -0,0 +1,128 @@
+import pandas as pd
+import pytest
+
+from build_forest import COLUMN_MAPPING, categorize_columns, load_employee_data, validate_data
+
+# Internal-column frames as load_employee_data hands them to validate_data (IDs already strings or None)
+EDGE_CASES = {
+    'clean': {
+        'employee_id': ['P1', 'P2', 'E1', 'E2', 'E3'],
+        'name': ['Pat', 'Sam', 'Ann', 'Bob', 'Cy'],
+        'coach_id': [None, None, 'P1', 'E1', 'P2'],
+        'level': ['Partner', 'Partner', 'Manager', 'Analyst', 'Manager'],
+        'partner_relationship_id': ['P1', 'P2', 'P1', 'P2', 'P1'],
+    },
+    'duplicate_ids': {
+        'employee_id': ['P1', 'E1', 'E1', 'E2', 'E2', 'E2'],
+        'name': ['Pat', 'Ann', 'Ann again', 'Bob', 'Bob 2', 'Bob 3'],
+        'coach_id': [None, 'P1', 'P1', 'E1', 'P1', 'E1'],
+        'level': ['Partner', 'Manager', 'Manager', 'Analyst', 'Analyst', 'Analyst'],
+        'partner_relationship_id': ['P1', 'P1', 'P1', 'P1', 'P1', 'P1'],
+    },
+    'blank_and_none_coaches': {
+        'employee_id': ['P1', 'E1', 'E2', 'E3', 'E4'],
+        'name': ['Pat', 'Ann', 'Bob', 'Cy', 'Di'],
+        'coach_id': [None, '', None, 'nan', ' '],
+        'level': ['Partner', 'Manager', 'Analyst', 'Analyst', 'Analyst'],
+        'partner_relationship_id': ['P1', 'P1', 'P1', 'P1', 'P1'],
+    },
+    'unknown_coach_ids': {
+        'employee_id': ['P1', 'E1', 'E2', 'E3'],
+        'name': ['Pat', 'Ann', 'Bob', 'Cy'],
+        'coach_id': [None, 'P1', 'X9', 'E2'],
+        'level': ['Partner', 'Manager', 'Analyst', 'Analyst'],
+        'partner_relationship_id': ['P1', 'P1', 'P1', 'P1'],
+    },
+    'padded_and_mixed_case_levels': {
+        'employee_id': ['P1', 'P2', 'P3', 'E1', 'E2'],
+        'name': ['Pat', 'Sam', 'Lee', 'Ann', 'Bob'],
+        'coach_id': [None, None, None, 'P2', 'P3'],
+        'level': ['Partner', ' Partner ', 'partner', 'Manager', ' manager'],
+        'partner_relationship_id': ['P1', 'P2', 'P1', 'P2', 'P3'],
+    },
+    'missing_levels': {
+        'employee_id': ['P1', 'E1', 'E2'],
+        'name': ['Pat', 'Ann', 'Bob'],
+        'coach_id': [None, 'P1', 'P1'],
+        'level': ['Partner', None, 'Manager'],
+        'partner_relationship_id': ['P1', 'P1', None],
+    },
+    'unknown_and_non_partner_pod_ids': {
+        'employee_id': ['P1', 'E1', 'E2', 'E3', 'E4', 'E5'],
+        'name': ['Pat', 'Ann', 'Bob', 'Cy', 'Di', 'Ed'],
+        'coach_id': [None, 'P1', 'E1', 'E1', 'P1', 'P1'],
+        'level': ['Partner', 'Manager', 'Analyst', 'Analyst', 'Analyst', 'Analyst'],
+        'partner_relationship_id': ['P1', 'X9', 'E1', None, '', 'P1'],
+    },
+    'coaching_cycle': {
+        'employee_id': ['P1', 'E1', 'E2', 'E3'],
+        'name': ['Pat', 'Ann', 'Bob', 'Cy'],
+        'coach_id': [None, 'E3', 'E1', 'E2'],
+        'level': ['Partner', 'Manager', 'Analyst', 'Analyst'],
+        'partner_relationship_id': ['P1', 'P1', 'P1', 'P1'],
+    },
+    'no_pod_column': {
+        'employee_id': ['P1', 'E1'],
+        'name': ['Pat', 'Ann'],
+        'coach_id': [None, 'P1'],
+        'level': ['Partner', 'Manager'],
+    },
+}
+
+def validate_both(df):
+    rows_df, rows_summary = validate_data(df.copy(), mode='rows')
+    vectorized_df, vectorized_summary = validate_data(df.copy(), mode='vectorized')
+    return (rows_df, rows_summary), (vectorized_df, vectorized_summary)
+
+def assert_parity(df):
+    (rows_df, rows_summary), (vectorized_df, vectorized_summary) = validate_both(df)
+    assert vectorized_summary == rows_summary
+    if rows_df is None:
+        assert vectorized_df is None
+    else:
+        pd.testing.assert_frame_equal(vectorized_df, rows_df)
+    return rows_summary
+
+@pytest.mark.parametrize('case', sorted(EDGE_CASES))
+def test_vectorized_validation_matches_rows(case):
+    assert_parity(pd.DataFrame(EDGE_CASES[case]))
+
+@pytest.mark.parametrize('case', sorted(EDGE_CASES))
+def test_vectorized_validation_matches_rows_on_categoricals(case):
+    df = pd.DataFrame(EDGE_CASES[case])
+    categorize_columns(df, max_unique_ratio=1.0)
+    assert isinstance(df['level'].dtype, pd.CategoricalDtype)
+    assert_parity(df)
+
+def test_edge_cases_are_reported():
+    duplicate_summary = assert_parity(pd.DataFrame(EDGE_CASES['duplicate_ids']))
+    assert sorted(duplicate_summary['duplicate_ids']) == ['E1', 'E2']
+    blank_summary = assert_parity(pd.DataFrame(EDGE_CASES['blank_and_none_coaches']))
+    assert blank_summary['critical_errors']
+    unknown_summary = assert_parity(pd.DataFrame(EDGE_CASES['unknown_coach_ids']))
+    assert unknown_summary['orphan_coach_ids'] == ["Non-Partner Employee 'E2' has unknown coach 'X9'"]
+    cycle_summary = assert_parity(pd.DataFrame(EDGE_CASES['coaching_cycle']))
+    assert cycle_summary['cycle_members'] and cycle_summary['critical_errors']
+
+    (validated_df, _), _ = validate_both(pd.DataFrame(EDGE_CASES['unknown_and_non_partner_pod_ids']))
+    assert validated_df['pod_relationship_status'].tolist() == [
+        'valid', 'error_invalid_id', 'error_invalid_id', 'error_invalid_id', 'error_invalid_id', 'valid']
+
+def test_parity_after_loading_a_file(tmp_path):
+    # Numeric IDs read as floats, blank cells and padded levels, through the real loader
+    source = pd.DataFrame({
+        COLUMN_MAPPING['employee_id']: [100, 101, 102, 103, 104, 104],
+        COLUMN_MAPPING['name']: ['Pat', 'Ann', 'Bob', 'Cy', 'Di', 'Di again'],
+        COLUMN_MAPPING['coach_id']: [None, 100.0, 101, 999, 100, 101],
+        COLUMN_MAPPING['coach_name']: [None, 'Pat', 'Ann', 'Nobody', 'Pat', 'Ann'],
+        COLUMN_MAPPING['level']: ['Partner', 'Manager', ' Analyst ', 'Analyst', 'analyst', 'Analyst'],
+        COLUMN_MAPPING['partner_relationship_id']: [100, 100, 101, None, 555, 100],
+        COLUMN_MAPPING['partner_relationship_name']: ['Pat', 'Pat', 'Ann', None, 'Ghost', 'Pat'],
+        COLUMN_MAPPING['talent_group']: ['Tax'] * 6,
+    })
+    path = tmp_path / 'input.csv'
+    source.to_csv(path, index=False)
+    loaded = load_employee_data(str(path))
+    assert loaded is not None
+    summary = assert_parity(loaded)
+    assert summary['duplicate_ids'] == ['104']